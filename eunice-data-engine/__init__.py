@@ -2,16 +2,19 @@
 
 __version__ = "1.0.0"
 
-from .gitlab_client import EuniceGitLabClient
-from .cost_calculator import (
-    EuniceConfig,
-    calculate_annual_velocity_cost,
-    calculate_time_savings_only,
-    calculate_carbon_footprint,
-    calculate_roi,
-    estimate_fix_effort
-)
-from .fingerprint import generate_fingerprint, deduplicate_findings
+# loaded on first access (pep 562) so pure-math callers never import
+# python-gitlab, requests or yaml
+_LAZY = {
+    'EuniceGitLabClient': 'gitlab_client',
+    'EuniceConfig': 'cost_calculator',
+    'calculate_annual_velocity_cost': 'cost_calculator',
+    'calculate_time_savings_only': 'cost_calculator',
+    'calculate_carbon_footprint': 'cost_calculator',
+    'calculate_roi': 'cost_calculator',
+    'estimate_fix_effort': 'cost_calculator',
+    'generate_fingerprint': 'fingerprint',
+    'deduplicate_findings': 'fingerprint',
+}
 
 __all__ = [
     'EuniceGitLabClient',
@@ -24,3 +27,18 @@ __all__ = [
     'generate_fingerprint',
     'deduplicate_findings',
 ]
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    from importlib import import_module
+    value = getattr(import_module(f'.eunice.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
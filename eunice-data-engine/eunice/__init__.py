@@ -0,0 +1,102 @@
+"""
+eunice data engine - real gitlab data analysis for technical debt
+
+reality check: agent tool calls start a fresh interpreter each step, so
+nothing is imported here up front. public names resolve on first
+access (pep 562): `from eunice import calculate_roi` loads the cost
+calculator only, never python-gitlab, requests or yaml.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+__version__ = "1.0.0"
+
+# public name → submodule that defines it
+_LAZY = {
+    # cost math
+    'EuniceConfig': 'cost_calculator',
+    'CompiledConfig': 'cost_calculator',
+    'load_config': 'cost_calculator',
+    'calculate_annual_velocity_cost': 'cost_calculator',
+    'calculate_time_savings_only': 'cost_calculator',
+    'calculate_carbon_footprint': 'cost_calculator',
+    'calculate_roi': 'cost_calculator',
+    'estimate_fix_effort': 'cost_calculator',
+    'PortfolioCostEngine': 'portfolio',
+    'SensitivityAnalysis': 'sensitivity',
+    # findings
+    'generate_fingerprint': 'fingerprint',
+    'deduplicate_findings': 'fingerprint',
+    'FingerprintStore': 'fingerprint_store',
+    'CodeQualityIndex': 'code_quality',
+    # gitlab
+    'EuniceGitLabClient': 'gitlab_client',
+    'create_client': 'gitlab_client',
+    'EuniceGraphQLClient': 'graphql_client',
+    'AsyncEuniceGitLabClient': 'async_client',
+    'ResponseCache': 'cache',
+    'TokenBucket': 'rate_limit',
+    'FileTokenBucket': 'rate_limit',
+    'Transport': 'transport',
+    'Instrumentation': 'instrumentation',
+    # audits and reviews
+    'GitHistory': 'git_history',
+    'IncrementalReviewEngine': 'incremental',
+    'AuditSnapshot': 'snapshot',
+    'BugIssueIndex': 'issue_index',
+    'MetricsStore': 'metrics_store',
+    'ColumnarResults': 'columnar',
+    'WebhookIngestor': 'ingest',
+    'TopKRanker': 'ranking',
+    'run_audit': 'audit',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(import_module(f'.{module}', __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+if TYPE_CHECKING:  # static analysis sees the eager imports
+    from .audit import run_audit
+    from .async_client import AsyncEuniceGitLabClient
+    from .cache import ResponseCache
+    from .code_quality import CodeQualityIndex
+    from .columnar import ColumnarResults
+    from .cost_calculator import (
+        CompiledConfig,
+        EuniceConfig,
+        calculate_annual_velocity_cost,
+        calculate_carbon_footprint,
+        calculate_roi,
+        calculate_time_savings_only,
+        estimate_fix_effort,
+        load_config
+    )
+    from .fingerprint import deduplicate_findings, generate_fingerprint
+    from .fingerprint_store import FingerprintStore
+    from .git_history import GitHistory
+    from .gitlab_client import EuniceGitLabClient, create_client
+    from .graphql_client import EuniceGraphQLClient
+    from .incremental import IncrementalReviewEngine
+    from .ingest import WebhookIngestor
+    from .instrumentation import Instrumentation
+    from .issue_index import BugIssueIndex
+    from .metrics_store import MetricsStore
+    from .portfolio import PortfolioCostEngine
+    from .ranking import TopKRanker
+    from .rate_limit import FileTokenBucket, TokenBucket
+    from .sensitivity import SensitivityAnalysis
+    from .snapshot import AuditSnapshot
+    from .transport import Transport
@@ -0,0 +1,307 @@
+"""asyncio gitlab client for eunice - concurrent commit → mr / pipeline fan-out"""
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency: pip install eunice-data-engine[async]
+    aiohttp = None
+
+from .gitlab_client import EuniceGitLabClient, GitLabRecord
+from .instrumentation import Instrumentation, endpoint_template, instrumented
+from .rate_limit import TokenBucket, parse_retry_after
+from .transport import Transport
+
+
+class AsyncEuniceGitLabClient:
+    """
+    asyncio counterpart of EuniceGitLabClient
+
+    reality check: the sync client makes one or two blocking calls per
+    commit. here those fan-outs run concurrently over one pooled
+    keep-alive session, capped at max_concurrency requests in flight.
+    method names, arguments and results match the sync client (objects
+    expose the same attributes; mr/pipeline order may differ).
+
+        async with AsyncEuniceGitLabClient(url, token) as client:
+            mrs = await client.get_mrs_with_file_changes(project_id, 'auth.py')
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        max_concurrency: int = 16,
+        max_retries: Optional[int] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        transport: Optional[Transport] = None
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                'AsyncEuniceGitLabClient needs aiohttp: pip install eunice-data-engine[async]'
+            )
+
+        self.api_url = url.rstrip('/') + '/api/v4'
+        self.token = token
+        self.max_concurrency = max_concurrency
+        # timeouts and backoff come from the transport; the pool is the concurrency cap
+        self.transport = transport or Transport(pool_size=max_concurrency)
+        self.max_retries = self.transport.retries if max_retries is None else max_retries
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.instrumentation = instrumentation or Instrumentation()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional['aiohttp.ClientSession'] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            # created lazily so both bind to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'PRIVATE-TOKEN': self.token},
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.transport.connect_timeout,
+                    sock_read=self.transport.read_timeout
+                )
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, path: str, params: Optional[Dict] = None):
+        """
+        GET one api path, bounded by the concurrency cap
+
+        reality check: 429 responses carry Retry-After - the shared bucket
+        blocks every task for exactly that long before the retry. 5xx
+        responses, timeouts and dropped connections are retried with the
+        transport's jittered backoff
+        """
+        session = self._get_session()
+        transport = self.transport
+
+        for attempt in range(self.max_retries + 1):
+            # wait for budget outside the semaphore so sleepers hold no slot
+            self.instrumentation.record_rate_limit(await self.rate_limiter.acquire_async())
+            retry_after = None
+
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session.get(self.api_url + path, params=params) as resp:
+                        self.rate_limiter.update_from_headers(resp.headers)
+
+                        if resp.status not in transport.retry_statuses or attempt == self.max_retries:
+                            body = await resp.read()
+                            self._record(resp, started, len(body))
+                            resp.raise_for_status()
+                            return json.loads(body), resp.headers
+
+                        self._record(resp, started, resp.content_length or 0)
+                        reason = str(resp.status)
+                        retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    reason = type(e).__name__
+
+            # sleep outside the semaphore too
+            delay = transport.delay(attempt, retry_after)
+            self.instrumentation.record_retry(reason, delay)
+            await asyncio.sleep(delay)
+
+    def _record(self, resp, started: float, received: int):
+        self.instrumentation.record_request(
+            endpoint_template(str(resp.url)),
+            resp.status,
+            time.perf_counter() - started,
+            received=received
+        )
+
+    async def _list(self, path: str, params: Optional[Dict] = None, max_pages: int = 100) -> List[GitLabRecord]:
+        """
+        fetch every page of a list endpoint
+
+        reality check: page 1 tells us X-Total-Pages, so the remaining pages
+        are fetched concurrently. gitlab omits the header above 10k rows -
+        then fall back to following X-Next-Page one at a time
+        """
+        params = dict(params or {}, per_page=100)
+
+        first, headers = await self._request(path, dict(params, page=1))
+        rows = list(first)
+
+        total_pages = headers.get('X-Total-Pages')
+        if total_pages:
+            last = min(int(total_pages), max_pages)
+            pages = await asyncio.gather(*[
+                self._request(path, dict(params, page=page))
+                for page in range(2, last + 1)
+            ])
+            for batch, _ in pages:
+                rows.extend(batch)
+        else:
+            page = 1
+            while headers.get('X-Next-Page') and page < max_pages:
+                page += 1
+                batch, headers = await self._request(path, dict(params, page=page))
+                rows.extend(batch)
+
+        return [GitLabRecord(**row) for row in rows]
+
+    @staticmethod
+    def _project_path(project_id: str) -> str:
+        return '/projects/' + quote(str(project_id), safe='')
+
+    @instrumented
+    async def get_file_commits(self, project_id: str, file_path: str, since_days: int = 30) -> List:
+        """get commits touching a specific file"""
+        since = datetime.now() - timedelta(days=since_days)
+
+        return await self._list(
+            self._project_path(project_id) + '/repository/commits',
+            {'path': file_path, 'since': since.isoformat()}
+        )
+
+    @instrumented
+    async def _merged_mr_iids(self, project_id: str, sha: str) -> List[int]:
+        mrs, _ = await self._request(
+            self._project_path(project_id) + f'/repository/commits/{sha}/merge_requests'
+        )
+        return [mr['iid'] for mr in mrs if mr['state'] == 'merged']
+
+    @instrumented
+    async def _get_mr(self, project_id: str, mr_iid: int) -> GitLabRecord:
+        mr, _ = await self._request(
+            self._project_path(project_id) + f'/merge_requests/{mr_iid}'
+        )
+        return GitLabRecord(**mr)
+
+    @instrumented
+    async def get_mrs_with_file_changes(
+        self,
+        project_id: str,
+        file_path: str,
+        since_days: int = 30
+    ) -> List:
+        """
+        get merge requests that modified a file
+
+        reality check: commit → mr lookups and mr fetches run concurrently;
+        failed lookups are skipped, as in the sync client
+        """
+        commits = await self.get_file_commits(project_id, file_path, since_days)
+
+        if not commits:
+            return []
+
+        mappings = await asyncio.gather(
+            *[self._merged_mr_iids(project_id, c.id) for c in commits],
+            return_exceptions=True
+        )
+
+        mr_iids = {}  # ordered set
+        for iids in mappings:
+            if isinstance(iids, Exception):
+                self.instrumentation.record_dropped('commit_mrs', iids)
+                continue
+            for iid in iids:
+                mr_iids[iid] = None
+
+        mrs = await asyncio.gather(
+            *[self._get_mr(project_id, iid) for iid in mr_iids],
+            return_exceptions=True
+        )
+
+        for mr in mrs:
+            if isinstance(mr, Exception):
+                self.instrumentation.record_dropped('mr', mr)
+        return [mr for mr in mrs if not isinstance(mr, Exception)]
+
+    @instrumented
+    async def get_bug_issues_with_time_tracking(
+        self,
+        project_id: str,
+        file_path: str,
+        since_days: int = 30
+    ) -> List[Dict]:
+        """
+        get bug issues mentioning file with time spent
+
+        reality check: time_stats.total_time_spent is in SECONDS
+        """
+        updated_after = (datetime.now() - timedelta(days=since_days)).isoformat()
+        issues = await self._list(
+            self._project_path(project_id) + '/issues',
+            {'labels': 'bug', 'search': file_path, 'updated_after': updated_after}
+        )
+
+        issues_with_time = []
+        for issue in issues:
+            time_stats = getattr(issue, 'time_stats', {})
+            total_time_spent = time_stats.get('total_time_spent', 0)
+
+            if total_time_spent and total_time_spent > 0:
+                issues_with_time.append({
+                    'issue': issue,
+                    'issue_id': issue.iid,
+                    'hours_spent': total_time_spent / 3600,
+                    'title': issue.title,
+                    'web_url': issue.web_url
+                })
+
+        return issues_with_time
+
+    @instrumented
+    async def get_pipelines_touching_file(
+        self,
+        project_id: str,
+        file_path: str,
+        since_days: int = 30
+    ) -> List:
+        """get pipelines for every commit that changed a file, fetched concurrently"""
+        commits = await self.get_file_commits(project_id, file_path, since_days)
+
+        if not commits:
+            return []
+
+        # first page only, like project.pipelines.list(sha=...) in the sync client
+        results = await asyncio.gather(
+            *[
+                self._request(self._project_path(project_id) + '/pipelines', {'sha': c.id})
+                for c in commits
+            ],
+            return_exceptions=True
+        )
+
+        pipelines = {}  # deduplicate by id
+        for result in results:
+            if isinstance(result, Exception):
+                self.instrumentation.record_dropped('commit_pipelines', result)
+                continue
+            for pipeline in result[0]:
+                pipelines[pipeline['id']] = GitLabRecord(**pipeline)
+
+        return list(pipelines.values())
+
+    # pure calculations are shared with the sync client
+    calculate_mr_review_time = EuniceGitLabClient.calculate_mr_review_time
+    calculate_pipeline_stats = EuniceGitLabClient.calculate_pipeline_stats
@@ -0,0 +1,375 @@
+"""parallel audit runner - file list split across processes, resumable from a checkpoint"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .cache import DEFAULT_CACHE_PATH, ResponseCache
+from .cost_calculator import EuniceConfig, calculate_annual_velocity_cost, calculate_roi, estimate_fix_effort
+from .instrumentation import Instrumentation, merge_snapshots
+from .rate_limit import FileTokenBucket
+
+
+DEFAULT_CHECKPOINT_PATH = '.eunice/cache/audit-checkpoint.sqlite'
+DEFAULT_BUCKET_PATH = '.eunice/cache/rate-limit.bucket'
+
+
+class AuditCheckpoint:
+    """
+    per-file audit results, written as each chunk of files finishes
+
+    reality check: a run that crashes or stalls on the rate limit keeps
+    every finished chunk. rerunning with the same run id skips those files.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # autocommit: every worker process writes its own chunks
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=60)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                project_id TEXT NOT NULL,
+                since_days REAL NOT NULL,
+                started_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                run_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                finished_at TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (run_id, path)
+            );
+        """)
+
+    def start(self, run_id: str, project_id: str, since_days: float, fresh: bool = False):
+        """register a run; fresh=True drops anything checkpointed under the same id"""
+        with self._lock:
+            if fresh:
+                self._db.execute('DELETE FROM results WHERE run_id = ?', (run_id,))
+                self._db.execute('DELETE FROM runs WHERE run_id = ?', (run_id,))
+            self._db.execute(
+                'INSERT OR IGNORE INTO runs VALUES (?, ?, ?, ?)',
+                (run_id, str(project_id), since_days, datetime.now().isoformat())
+            )
+
+    def done(self, run_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._db.execute('SELECT path FROM results WHERE run_id = ?', (run_id,)).fetchall()
+        return {r[0] for r in rows}
+
+    def save(self, run_id: str, results: Dict[str, Dict]):
+        """store a finished chunk (one transaction)"""
+        finished_at = datetime.now().isoformat()
+        rows = [(run_id, path, finished_at, json.dumps(result, default=str)) for path, result in results.items()]
+
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', rows)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def results(self, run_id: str) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._db.execute('SELECT path, result FROM results WHERE run_id = ?', (run_id,)).fetchall()
+        return {path: json.loads(result) for path, result in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def default_run_id(project_id: str, since_days: float) -> str:
+    """same project, window and day → same run, so a plain rerun resumes"""
+    return f"{str(project_id).replace('/', '_')}-{since_days:g}d-{date.today().isoformat()}"
+
+
+def file_velocity_cost(file_metrics: Dict, since_days: float, config) -> Dict:
+    """annual velocity cost of one analyze_files result (counts over since_days, scaled to a month)"""
+    per_month = 30 / since_days
+    return calculate_annual_velocity_cost(
+        commit_count_monthly=file_metrics['commit_count'] * per_month,
+        avg_review_time_minutes=file_metrics['avg_review_minutes'],
+        bug_hours_tracked=file_metrics['bug_hours'],
+        ci_failure_count_monthly=file_metrics['ci_failure_count'] * per_month,
+        config=config,
+        bug_hours_window_days=since_days
+    )
+
+
+def _add_roi(results: Dict[str, Dict], lines_of_code: Optional[Dict[str, int]], config_path: str):
+    if not lines_of_code:
+        return
+
+    config = EuniceConfig(config_path)
+    for path, result in results.items():
+        if path in lines_of_code:
+            result['lines_of_code'] = lines_of_code[path]
+            result['roi'] = calculate_roi(
+                result['velocity_cost']['annual_cost_usd'],
+                estimate_fix_effort(lines_of_code[path], config),
+                config
+            )
+
+
+def _ingested_audit(
+    project_id: str,
+    paths: List[str],
+    since_days: float,
+    run_id: str,
+    config_path: str,
+    metrics_path: str,
+    progress: Optional[Callable[[int, int], None]]
+) -> Optional[Dict]:
+    """the audit summary straight from a webhook-fed MetricsStore, or None if it does not cover the window"""
+    from .metrics_store import MetricsStore
+
+    store = MetricsStore(metrics_path)
+    try:
+        if not store.ingest_covers(since_days):
+            return None
+        metrics = store.file_metrics(project_id, paths, since_days, source='webhooks')
+    finally:
+        store.close()
+
+    config = EuniceConfig(config_path)
+    results = {
+        path: dict(file_metrics, velocity_cost=file_velocity_cost(file_metrics, since_days, config))
+        for path, file_metrics in metrics.items()
+    }
+    if progress:
+        progress(len(paths), len(paths))
+
+    return {
+        'run_id': run_id,
+        'project_id': project_id,
+        'since_days': since_days,
+        'source': 'webhooks',
+        'files': len(paths),
+        'resumed': 0,
+        'completed': len(results),
+        'failed_chunks': [],
+        'workers': 0,
+        'elapsed_seconds': 0.0,
+        'instrumentation': merge_snapshots([]),
+        'results': results
+    }
+
+
+# per-process state, set up once by the pool initializer
+_worker: Dict = {}
+
+
+def _create_client(settings: Dict):
+    # python-gitlab loads here, not when the cli builds its parser
+    from .gitlab_client import create_client
+
+    cache = ResponseCache(settings['cache_path']) if settings['cache_path'] else None
+    # one budget for every process: the bucket lives in a locked file
+    rate_limiter = FileTokenBucket(settings['bucket_path'], settings['rate_per_minute'])
+
+    return create_client(
+        settings['url'],
+        settings['token'],
+        backend=settings['backend'],
+        cache=cache,
+        rate_limiter=rate_limiter,
+        instrumentation=Instrumentation(profile=settings['profile'])
+    )
+
+
+def _build_indexes(settings: Dict, project_id: str, since_days: float) -> Tuple[Dict, Dict]:
+    """commit and bug issue indexes built once, in plain form for the workers, plus the build's instrumentation"""
+    client = _create_client(settings)
+    client.build_commit_index(project_id, since_days)
+    client.build_bug_issue_index(project_id, since_days)
+
+    indexes = client.export_indexes(project_id)
+    if client.cache is not None:
+        client.cache.close()
+    return indexes, client.instrumentation.to_dict()
+
+
+def _init_worker(settings: Dict):
+    client = _create_client(settings)
+    if settings.get('indexes'):
+        client.load_indexes(settings['project_id'], settings['indexes'])
+
+    _worker.update(
+        settings=settings,
+        client=client,
+        config=EuniceConfig(settings['config_path']),
+        checkpoint=AuditCheckpoint(settings['checkpoint_path'])
+    )
+
+
+def _audit_chunk(run_id: str, project_id: str, paths: List[str], since_days: float) -> Tuple[int, int, Dict]:
+    """
+    analyze one chunk of files and checkpoint it
+
+    returns the number of files, the worker pid and the worker's
+    instrumentation so far (cumulative - the latest one per pid wins)
+    """
+    client, config = _worker['client'], _worker['config']
+    # indexes come built from run_audit; one that does not cover the window
+    # falls back to per-file queries rather than a rebuild in every worker
+    metrics = client.analyze_files(project_id, paths, since_days)
+
+    results = {}
+    with client.instrumentation.span('velocity_cost'):
+        for path, file_metrics in metrics.items():
+            results[path] = dict(file_metrics, velocity_cost=file_velocity_cost(file_metrics, since_days, config))
+
+    _worker['checkpoint'].save(run_id, results)
+    return len(results), os.getpid(), client.instrumentation.to_dict()
+
+
+def run_audit(
+    project_id: str,
+    paths: Iterable[str],
+    url: str,
+    token: str,
+    since_days: float = 30,
+    workers: Optional[int] = None,
+    chunk_size: int = 20,
+    run_id: Optional[str] = None,
+    fresh: bool = False,
+    backend: str = 'rest',
+    config_path: str = 'eunice.yml',
+    cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+    checkpoint_path: str = DEFAULT_CHECKPOINT_PATH,
+    bucket_path: str = DEFAULT_BUCKET_PATH,
+    rate_per_minute: float = 1900,
+    profile: bool = False,
+    build_index: bool = False,
+    lines_of_code: Optional[Dict[str, int]] = None,
+    metrics_path: Optional[str] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict:
+    """
+    audit every path across a process pool
+
+    reality check: files are split into chunks of chunk_size, so commits,
+    mrs and pipelines shared inside a chunk are resolved once
+    (analyze_files), and across chunks through the shared response cache.
+    all workers draw from one FileTokenBucket, so throughput grows with
+    workers until the gitlab budget is the limit - then it holds there
+    instead of tripping 429s. finished chunks are checkpointed; files
+    already in the checkpoint for run_id are skipped.
+
+    the summary carries the workers' merged instrumentation (see
+    eunice.instrumentation); profile=True adds cProfile's top functions.
+    build_index=True builds the commit and bug issue indexes once, in
+    this process, and hands them to every worker to answer its chunks
+    from - fewer requests once the audit runs into hundreds of files,
+    however many workers there are.
+    given lines_of_code (e.g. GitHistory.lines_of_code from a local
+    clone), each result also gets fix effort and roi.
+    given metrics_path, a MetricsStore that a webhook ingestion service
+    (eunice.ingest) has kept up to date for the whole window answers the
+    audit without any api calls - otherwise the audit runs as usual.
+    """
+    started = time.perf_counter()
+    paths = list(dict.fromkeys(paths))
+    run_id = run_id or default_run_id(project_id, since_days)
+
+    if metrics_path:
+        summary = _ingested_audit(project_id, paths, since_days, run_id, config_path, metrics_path, progress)
+        if summary is not None:
+            _add_roi(summary['results'], lines_of_code, config_path)
+            summary['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+            return summary
+
+    checkpoint = AuditCheckpoint(checkpoint_path)
+    checkpoint.start(run_id, project_id, since_days, fresh=fresh)
+    already_done = checkpoint.done(run_id)
+
+    pending = [path for path in paths if path not in already_done]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks) or 1))
+
+    settings = {
+        'url': url,
+        'token': token,
+        'backend': backend,
+        'config_path': config_path,
+        'cache_path': cache_path,
+        'checkpoint_path': checkpoint_path,
+        'bucket_path': bucket_path,
+        'rate_per_minute': rate_per_minute,
+        'profile': profile,
+        'project_id': project_id,
+        'indexes': None
+    }
+
+    completed = len(paths) - len(pending)
+    failures = []
+    snapshots: Dict[int, Dict] = {}  # worker pid (0 for the index build) → instrumentation
+
+    if progress:
+        progress(completed, len(paths))
+
+    if build_index and chunks:
+        settings['indexes'], snapshots[0] = _build_indexes(settings, project_id, since_days)
+
+    if workers == 1:
+        # no pool for a single worker - same code path, easier to debug
+        _init_worker(settings)
+        for chunk in chunks:
+            try:
+                count, pid, snapshots[pid] = _audit_chunk(run_id, project_id, chunk, since_days)
+                completed += count
+            except Exception as e:
+                failures.append({'paths': chunk, 'error': repr(e)})
+            if progress:
+                progress(completed, len(paths))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed  # pulls in multiprocessing
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings,)) as pool:
+            futures = {
+                pool.submit(_audit_chunk, run_id, project_id, chunk, since_days): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                try:
+                    count, pid, snapshot = future.result()
+                    completed += count
+                    snapshots[pid] = snapshot
+                except Exception as e:
+                    failures.append({'paths': futures[future], 'error': repr(e)})
+                if progress:
+                    progress(completed, len(paths))
+
+    results = checkpoint.results(run_id)
+    checkpoint.close()
+    _add_roi(results, lines_of_code, config_path)
+
+    return {
+        'run_id': run_id,
+        'project_id': project_id,
+        'since_days': since_days,
+        'source': 'api',
+        'files': len(paths),
+        'resumed': len(already_done & set(paths)),
+        'completed': completed,
+        'failed_chunks': failures,
+        'workers': workers,
+        'elapsed_seconds': round(time.perf_counter() - started, 2),
+        'instrumentation': merge_snapshots(snapshots.values()),
+        'results': {path: results[path] for path in paths if path in results}
+    }
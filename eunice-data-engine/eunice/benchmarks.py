@@ -0,0 +1,1101 @@
+"""
+benchmarks for eunice internals
+
+    python -m eunice.benchmarks [name ...] [option=value ...]
+
+options apply to every benchmark that takes them, e.g.
+    python -m eunice.benchmarks gitlab_api files=500 latency_ms=20 throttle_rate=0.02
+"""
+import ast
+import inspect
+import json
+import multiprocessing
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from .fingerprint import SourceIndex, anchor_findings, generate_fingerprint, reanchor_findings
+
+try:
+    import resource
+except ImportError:  # not on windows
+    resource = None
+
+
+def _synthetic_file(rng: random.Random, blocks: int) -> List[List[str]]:
+    """a file as a header (imports) followed by code blocks (functions), each a list of lines"""
+    return [['import os', '']] + [
+        [f'def f{b}_{rng.randrange(10**6)}(x):'] + [
+            f'    y{i} = x * {rng.randrange(1000)} + {rng.randrange(1000)}'
+            for i in range(rng.randint(3, 30))
+        ] + ['    return y0', '']
+        for b in range(blocks)
+    ]
+
+
+def _render(blocks: List[List[str]]) -> str:
+    return '\n'.join(line for block in blocks for line in block)
+
+
+def _block_ranges(blocks: List[List[str]]) -> List[str]:
+    """line range of every function; the header and trailing blank lines are not part of a finding"""
+    ranges, line = [], 1 + len(blocks[0])
+    for block in blocks[1:]:
+        ranges.append(f'{line}-{line + len(block) - 2}')
+        line += len(block)
+    return ranges
+
+
+def _edit(rng: random.Random, blocks: List[List[str]]) -> int:
+    """
+    one commit's worth of edits; returns the index of the block whose code
+    actually changed (or -1). the rest only move: lines inserted above,
+    blank lines and comments added, re-indentation.
+    """
+    kind = rng.random()
+    b = rng.randrange(1, len(blocks))
+
+    if kind < 0.35:
+        # new imports at the top shift everything below
+        blocks[0][0:0] = [f'import mod{rng.randrange(10**6)}' for _ in range(rng.randint(1, 5))]
+        return -1
+    if kind < 0.55:
+        body = blocks[b]
+        body.insert(rng.randint(1, len(body) - 2), f'    # note {rng.randrange(10**6)}')
+        return -1
+    if kind < 0.70:
+        body = blocks[b]
+        body.insert(rng.randint(1, len(body) - 2), '')
+        return -1
+    if kind < 0.80:
+        blocks[b] = [line.replace('    ', '\t', 1) for line in blocks[b]]
+        return -1
+
+    # real change: edit a line of code in one block
+    body = blocks[b]
+    i = rng.randint(1, len(body) - 3)
+    while not body[i].strip() or body[i].lstrip().startswith('#'):
+        i += 1
+    body[i] = body[i] + f' + {rng.randrange(1, 1000)}'
+    return b - 1
+
+
+def fingerprint_churn(files: int = 50, blocks_per_file: int = 20, revisions: int = 30, seed: int = 0) -> Dict:
+    """
+    churn of line-based vs content-anchored fingerprints over a synthetic
+    edit history
+
+    every block of every file is a finding. after each revision a
+    fingerprint that changed for a block whose code did not change is
+    false churn - work an audit redoes for nothing. changed code should
+    change the content fingerprint (detection rate).
+    """
+    rng = random.Random(seed)
+    history = {f'src/mod{n}.py': _synthetic_file(rng, blocks_per_file) for n in range(files)}
+
+    def findings_for(path, blocks):
+        return [
+            {'type': 'high_complexity', 'file': path, 'lines': lines, 'rule_id': 'cyclomatic_complexity', 'block': b}
+            for b, lines in enumerate(_block_ranges(blocks))
+        ]
+
+    def fingerprints(path, blocks):
+        index = SourceIndex(_render(blocks), path)
+        findings = findings_for(path, blocks)
+        return (
+            [generate_fingerprint(f) for f in findings],
+            [generate_fingerprint(f, 'content', index) for f in findings]
+        )
+
+    previous = {path: fingerprints(path, blocks) for path, blocks in history.items()}
+    stored = {
+        path: anchor_findings(findings_for(path, blocks), {path: _render(blocks)})
+        for path, blocks in history.items()
+    }
+
+    totals = {'stable': 0, 'edited': 0, 'lines_churn': 0, 'content_churn': 0,
+              'lines_detected': 0, 'content_detected': 0, 'reevaluated': 0}
+    fingerprint_seconds = reanchor_seconds = 0.0
+
+    for _ in range(revisions):
+        for path, blocks in history.items():
+            edited = _edit(rng, blocks)
+
+            started = time.perf_counter()
+            current = fingerprints(path, blocks)
+            fingerprint_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            unchanged, changed = reanchor_findings(stored[path], {path: _render(blocks)})
+            reanchor_seconds += time.perf_counter() - started
+            totals['reevaluated'] += len(changed)
+
+            for b in range(len(blocks) - 1):
+                lines_changed = current[0][b] != previous[path][0][b]
+                content_changed = current[1][b] != previous[path][1][b]
+
+                if b == edited:
+                    totals['edited'] += 1
+                    totals['lines_detected'] += lines_changed
+                    totals['content_detected'] += content_changed
+                else:
+                    totals['stable'] += 1
+                    totals['lines_churn'] += lines_changed
+                    totals['content_churn'] += content_changed
+
+            previous[path] = current
+            stored[path] = anchor_findings(findings_for(path, blocks), {path: _render(blocks)})
+
+    findings = files * blocks_per_file * revisions
+    stable = totals['stable'] or 1
+    edited = totals['edited'] or 1
+
+    return {
+        'findings_evaluated': findings,
+        'unchanged_findings': totals['stable'],
+        'edited_findings': totals['edited'],
+        'lines_false_churn_rate': round(totals['lines_churn'] / stable, 4),
+        'content_false_churn_rate': round(totals['content_churn'] / stable, 4),
+        'lines_detection_rate': round(totals['lines_detected'] / edited, 4),
+        'content_detection_rate': round(totals['content_detected'] / edited, 4),
+        'reevaluated_share': round(totals['reevaluated'] / findings, 4),
+        'fingerprint_us_per_finding': round(fingerprint_seconds / findings * 1e6, 2),
+        'reanchor_us_per_finding': round(reanchor_seconds / findings * 1e6, 2)
+    }
+
+
+GITLAB_CASES = (
+    'get_file_commits',
+    'get_mrs_with_file_changes',
+    'get_bug_issues_with_time_tracking',
+    'bug_issue_index',
+    'get_pipelines_touching_file',
+    'per_file_analysis',
+    'analyze_files',
+    'analyze_files_indexed',
+    'analyze_files_graphql',
+    'code_quality_index',
+)
+
+
+def _rss_kb() -> Optional[int]:
+    """current resident set size (linux), for the baseline before a case runs"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _run_gitlab_case(case: str, url: str, project_id: int, paths: List[str], mr_iid: int) -> Dict:
+    """one case in a fresh process, so peak rss belongs to this case alone"""
+    from .cache import FAILED_PIPELINE_STATUSES
+    from .cost_calculator import EuniceConfig, calculate_annual_velocity_cost
+    from .gitlab_client import create_client
+    from .rate_limit import TokenBucket
+
+    # the simulator decides about throttling; the client bucket must not
+    client = create_client(
+        url,
+        'benchmark-token',
+        backend='graphql' if case == 'analyze_files_graphql' else 'rest',
+        rate_limiter=TokenBucket(rate_per_minute=10 ** 9, capacity=10 ** 6)
+    )
+    config = EuniceConfig('/nonexistent/eunice.yml')
+    baseline = _rss_kb()
+    started = time.perf_counter()
+
+    if case == 'per_file_analysis':
+        # what the flows do: four queries and a cost per file
+        for path in paths:
+            commits = client.get_file_commits(project_id, path, 30)
+            mrs = client.get_mrs_with_file_changes(project_id, path, 30)
+            bugs = client.get_bug_issues_with_time_tracking(project_id, path, 30)
+            pipelines = client.get_pipelines_touching_file(project_id, path, 30)
+            calculate_annual_velocity_cost(
+                commit_count_monthly=len(commits),
+                avg_review_time_minutes=client.calculate_avg_review_time(mrs) or 0,
+                bug_hours_tracked=sum(b['hours_spent'] for b in bugs),
+                ci_failure_count_monthly=len([p for p in pipelines if p.status in FAILED_PIPELINE_STATUSES]),
+                config=config,
+                bug_hours_window_days=30
+            )
+    elif case in ('analyze_files', 'analyze_files_graphql'):
+        client.analyze_files(project_id, paths, 30)
+    elif case == 'analyze_files_indexed':
+        client.analyze_files(project_id, paths, 30, build_index=True)
+    elif case == 'bug_issue_index':
+        # same answers as per-file get_bug_issues_with_time_tracking, plus mr-linked bugs
+        client.build_bug_issue_index(project_id, 30)
+        for path in paths:
+            client.get_bug_issues_with_time_tracking(project_id, path, 30)
+    elif case == 'code_quality_index':
+        client.get_code_quality_index(project_id, mr_iid)
+    else:
+        method = getattr(client, case)
+        for path in paths:
+            method(project_id, path, 30)
+
+    seconds = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+    if peak is not None and sys.platform == 'darwin':
+        peak //= 1024  # bytes there, kb on linux
+
+    return {
+        'wall_seconds': round(seconds, 3),
+        'rss_baseline_kb': baseline,
+        'peak_rss_kb': peak,
+        'client_sleep_seconds': round(client.rate_limiter.slept_seconds, 3)
+    }
+
+
+def gitlab_api(
+    files: int = 200,
+    commits: int = 3000,
+    issues: int = 300,
+    sample: int = 20,
+    latency_ms: float = 0,
+    jitter_ms: float = 0,
+    throttle_rate: float = 0.0,
+    rate_limit_per_minute: Optional[int] = None,
+    cases: Optional[Sequence[str]] = None,
+    seed: int = 0
+) -> Dict:
+    """
+    api calls, wall time and peak rss of the gitlab client's main methods
+    and of end-to-end per-file analysis, against a local GitLabSimulator
+
+    every case runs in a freshly spawned process (cold caches, own rss)
+    on the same `sample` files, spread over hot and cold paths.
+    """
+    from .simulator import GitLabSimulator, SyntheticRepo
+
+    repo = SyntheticRepo(files=files, commits=commits, issues=issues, seed=seed)
+    paths = repo.paths[::max(1, files // sample)][:sample]
+    cases = list(cases or GITLAB_CASES)
+    results = {
+        'repo': {'files': files, 'commits': commits, 'merge_requests': len(repo.merge_requests), 'issues': issues},
+        'sample_files': len(paths),
+        'latency_ms': latency_ms,
+        'throttle_rate': throttle_rate,
+        'cases': {}
+    }
+
+    simulator = GitLabSimulator(
+        repo,
+        latency_ms=latency_ms,
+        jitter_ms=jitter_ms,
+        throttle_rate=throttle_rate,
+        retry_after=1,
+        rate_limit_per_minute=rate_limit_per_minute,
+        seed=seed
+    )
+    spawn = multiprocessing.get_context('spawn')
+
+    with simulator:
+        for case in cases:
+            if case not in GITLAB_CASES:
+                raise ValueError(f'unknown gitlab case: {case}')
+
+            simulator.reset_counters()
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                measured = pool.submit(_run_gitlab_case, case, simulator.url, repo.project_id, paths, 1).result()
+
+            calls = dict(simulator.calls)
+            throttled = calls.pop('throttled', 0)
+            measured.update(
+                api_calls=sum(calls.values()),
+                throttled_calls=throttled,
+                calls_by_endpoint=calls,
+                bytes_received=simulator.bytes_sent
+            )
+            results['cases'][case] = measured
+
+    return results
+
+
+def graphql_parity(files: int = 200, commits: int = 3000, issues: int = 300, sample: int = 20, seed: int = 0) -> Dict:
+    """
+    rest vs graphql backend on one GitLabSimulator project: _get_mrs for
+    every mr, _pipelines_for_shas for every commit of the sample files and
+    _fetch_bug_issues per sample file (and for all bug issues), compared
+    on the fields eunice reads. mismatched must be 0 for every lookup
+    """
+    from datetime import datetime, timedelta
+    from .gitlab_client import create_client
+    from .rate_limit import TokenBucket
+    from .records import IssueRecord, MergeRequestRecord, PipelineRecord
+    from .simulator import GitLabSimulator, SyntheticRepo
+
+    repo = SyntheticRepo(files=files, commits=commits, issues=issues, seed=seed)
+    paths = repo.paths[::max(1, files // sample)][:sample]
+    shas = list(dict.fromkeys(
+        repo.commits[position]['id'] for path in paths for position in repo.commits_by_path.get(path, [])
+    ))
+    since = datetime.now() - timedelta(days=30)
+
+    def mr_fields(client, mr):
+        head = getattr(mr, 'head_pipeline', None) or {}
+        return (
+            MergeRequestRecord.from_object(mr),
+            mr.title,
+            mr.web_url,
+            client.calculate_mr_review_time(mr),
+            tuple(head.get(k) for k in ('id', 'sha', 'status', 'duration'))
+        )
+
+    def issue_fields(issue):
+        return IssueRecord.from_object(issue), issue.state, issue.description, issue.created_at
+
+    lookups = {
+        'merge_requests': lambda client, project: {
+            iid: mr_fields(client, mr)
+            for iid, mr in client._get_mrs(project, repo.project_id, list(repo.merge_requests)).items()
+        },
+        'pipelines': lambda client, project: {
+            sha: sorted(PipelineRecord.from_object(p) for p in pipelines)
+            for sha, pipelines in client._pipelines_for_shas(project, repo.project_id, shas).items()
+        },
+        'bug_issues': lambda client, project: {
+            path: sorted(issue_fields(issue) for issue in client._fetch_bug_issues(project, repo.project_id, path, since))
+            for path in [None] + paths
+        },
+    }
+
+    results = {
+        'repo': {'files': files, 'commits': commits, 'merge_requests': len(repo.merge_requests), 'issues': issues},
+        'sample_files': len(paths)
+    }
+    answers: Dict[str, Dict] = {}
+    calls: Dict[str, Dict] = {}
+
+    with GitLabSimulator(repo) as simulator:
+        for backend in ('rest', 'graphql'):
+            client = create_client(
+                simulator.url,
+                'benchmark-token',
+                backend=backend,
+                rate_limiter=TokenBucket(rate_per_minute=10 ** 9, capacity=10 ** 6)
+            )
+            project = client._get_project(repo.project_id)
+
+            for name, lookup in lookups.items():
+                simulator.reset_counters()
+                answers.setdefault(name, {})[backend] = lookup(client, project)
+                calls.setdefault(name, {})[backend] = sum(
+                    count for endpoint, count in simulator.calls.items() if endpoint != 'throttled'
+                )
+
+    for name in lookups:
+        rest, graphql = answers[name]['rest'], answers[name]['graphql']
+        keys = rest.keys() | graphql.keys()
+        results[name] = {
+            'compared': len(keys),
+            'mismatched': sum(rest.get(key) != graphql.get(key) for key in keys),
+            'rest_api_calls': calls[name]['rest'],
+            'graphql_api_calls': calls[name]['graphql']
+        }
+
+    return results
+
+
+def cost_calculator(files: int = 100_000, dev_hourly_rate: float = 85, seed: int = 0) -> Dict:
+    """
+    scalar cost functions per file vs the vectorized portfolio engine
+
+    matches_scalar counts the files whose rounded annual cost, roi,
+    payback and priority score are identical on both paths. every other
+    file has whole review minutes and bug hours in cents of an hour, as
+    tracked time usually is: at rates like 85 or 120.5 their costs land
+    on half cents far more often than random floats do
+    """
+    from .cost_calculator import EuniceConfig, calculate_annual_velocity_cost, calculate_roi, estimate_fix_effort
+
+    rng = random.Random(seed)
+    config = EuniceConfig('/nonexistent/eunice.yml')
+    config.config['cost_assumptions']['dev_hourly_rate'] = dev_hourly_rate
+    config.recompile()
+    inputs = [
+        (
+            rng.randint(0, 60),
+            rng.randint(0, 600) if i % 2 else rng.uniform(0, 600),
+            round(rng.uniform(0, 40), 2) if i % 2 else rng.uniform(0, 40),
+            rng.randint(0, 10),
+            rng.randint(10, 5000)
+        )
+        for i in range(files)
+    ]
+
+    scalar = []
+    started = time.perf_counter()
+    for commits_monthly, review, bugs, failures, loc in inputs:
+        velocity_cost = calculate_annual_velocity_cost(commits_monthly, review, bugs, failures, config)
+        roi = calculate_roi(velocity_cost['annual_cost_usd'], estimate_fix_effort(loc, config), config)
+        scalar.append((velocity_cost['annual_cost_usd'], roi['roi'], roi['payback_days'], roi['priority_score']))
+    scalar_seconds = time.perf_counter() - started
+
+    result = {
+        'files': files,
+        'dev_hourly_rate': dev_hourly_rate,
+        'scalar_seconds': round(scalar_seconds, 3),
+        'scalar_us_per_file': round(scalar_seconds / files * 1e6, 2)
+    }
+
+    try:
+        from .portfolio import PortfolioCostEngine
+        engine = PortfolioCostEngine(config)
+    except ImportError:
+        return result  # numpy not installed
+
+    columns = list(zip(*inputs))
+    started = time.perf_counter()
+    scores = engine.score(*columns)
+    vectorized_seconds = time.perf_counter() - started
+
+    vectorized = zip(
+        scores.annual_cost.tolist(), scores.roi.tolist(), scores.payback_days.tolist(), scores.priority_score.tolist()
+    )
+    matches = sum(
+        (round(cost, 2), round(roi, 1), round(payback, 1), priority) == expected
+        for (cost, roi, payback, priority), expected in zip(vectorized, scalar)
+    )
+
+    result.update(
+        vectorized_seconds=round(vectorized_seconds, 3),
+        vectorized_us_per_file=round(vectorized_seconds / files * 1e6, 3),
+        matches_scalar=matches
+    )
+    return result
+
+
+def _write_fast_import(repo, rng: random.Random, out):
+    """write SyntheticRepo's history as a `git fast-import` stream, oldest commit first"""
+    from .commit_index import parse_gitlab_datetime
+
+    contents: Dict[str, List[bytes]] = {}
+
+    for mark, commit in enumerate(reversed(repo.commits), 1):
+        when = int(parse_gitlab_datetime(commit['committed_date']).timestamp())
+        author = f"{commit['author_name']} <{commit['author_name']}@example.com> {when} +0000"
+        message = commit['message'].encode()
+        out.write(f'commit refs/heads/main\nmark :{mark}\nauthor {author}\ncommitter {author}\n'.encode())
+        out.write(b'data %d\n%s\n' % (len(message), message))
+        if mark > 1:
+            out.write(b'from :%d\n' % (mark - 1))
+
+        for path in repo.paths_by_commit[commit['id']]:
+            lines = contents.setdefault(path, [])
+            # files drift around a few hundred lines instead of growing forever
+            for _ in range(min(rng.randint(0, 20) + len(lines) // 50, len(lines))):
+                del lines[rng.randrange(len(lines))]
+            for _ in range(rng.randint(1, 20)):
+                lines.insert(rng.randint(0, len(lines)), b'x = %d\n' % rng.getrandbits(32))
+            data = b''.join(lines)
+            out.write(b'M 100644 inline %s\ndata %d\n%s\n' % (path.encode(), len(data), data))
+
+
+def _synthetic_clone(repo, clone: str, seed: int = 0):
+    """materialize a SyntheticRepo as a git repository with a checked-out main"""
+    import subprocess
+
+    subprocess.run(['git', 'init', '-q', '-b', 'main', clone], check=True)
+    with subprocess.Popen(['git', '-C', clone, 'fast-import', '--quiet'], stdin=subprocess.PIPE) as fast_import:
+        _write_fast_import(repo, random.Random(seed), fast_import.stdin)
+        fast_import.stdin.close()
+    if fast_import.returncode:
+        raise RuntimeError('git fast-import failed')
+    subprocess.run(['git', '-C', clone, 'checkout', '-q', '-f', 'main'], check=True)
+
+
+def git_history(files: int = 2000, commits: int = 20_000, days: int = 90, top: int = 20, seed: int = 0) -> Dict:
+    """
+    local churn/hotspot analysis over a synthetic clone (built with git
+    fast-import) vs the per-file commits.list requests the api route needs
+    """
+    import math
+    import tempfile
+
+    from .cost_calculator import EuniceConfig
+    from .git_history import GitHistory
+    from .simulator import SyntheticRepo
+
+    repo = SyntheticRepo(files=files, commits=commits, issues=0, days=days, seed=seed)
+
+    with tempfile.TemporaryDirectory() as clone:
+        started = time.perf_counter()
+        _synthetic_clone(repo, clone, seed)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        history = GitHistory.analyze(clone, since_days=days)
+        analyze_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        hotspots = history.hotspots(top, EuniceConfig('/nonexistent/eunice.yml'))
+        rank_seconds = time.perf_counter() - started
+
+    # one commits.list(path=...) walk per file, 100 per page
+    api_requests = sum(max(1, math.ceil(len(repo.commits_by_path.get(path, ())) / 100)) for path in repo.paths)
+
+    return {
+        'repo': {'files': files, 'commits': commits, 'days': days},
+        'build_seconds': round(build_seconds, 2),
+        'analyze_seconds': round(analyze_seconds, 3),
+        'commits_per_second': round(history.commit_count / analyze_seconds),
+        'rank_ms': round(rank_seconds * 1000, 2),
+        'files_changed': len(history.paths),
+        'api_requests_replaced': api_requests,
+        'top': [(row['file'], row['commits'], row['lines_of_code'], row['hotspot_score']) for row in hotspots[:5]]
+    }
+
+
+def top_k_roi(
+    files: int = 500,
+    commits: int = 5000,
+    issues: int = 300,
+    days: int = 30,
+    k: int = 20,
+    batch_size: int = 10,
+    latency_ms: float = 0,
+    seed: int = 0
+) -> Dict:
+    """
+    top k files by roi: measure every changed file and sort, vs TopKRanker
+    (local upper bounds, best-first refinement) - api calls, wall time and
+    whether both return the same files in the same order
+    """
+    import tempfile
+
+    from .audit import file_velocity_cost
+    from .cost_calculator import EuniceConfig, calculate_roi, estimate_fix_effort
+    from .git_history import GitHistory
+    from .gitlab_client import create_client
+    from .ranking import TopKRanker
+    from .rate_limit import TokenBucket
+    from .simulator import GitLabSimulator, SyntheticRepo
+
+    repo = SyntheticRepo(files=files, commits=commits, issues=issues, days=days, seed=seed)
+    config = EuniceConfig('/nonexistent/eunice.yml')
+    results = {'repo': {'files': files, 'commits': commits, 'issues': issues, 'days': days}, 'k': k}
+
+    def client(url):
+        return create_client(url, 'benchmark-token', rate_limiter=TokenBucket(rate_per_minute=10 ** 9, capacity=10 ** 6))
+
+    with tempfile.TemporaryDirectory() as clone:
+        _synthetic_clone(repo, clone, seed)
+        history = GitHistory.analyze(clone, since_days=days)
+
+    with GitLabSimulator(repo, latency_ms=latency_ms, seed=seed) as simulator:
+        # everything measured, then sorted
+        started = time.perf_counter()
+        measured = client(simulator.url).analyze_files(repo.project_id, history.paths, days, build_index=True)
+        scored = []
+        for path, file_metrics in measured.items():
+            loc = history.lines_of_code.get(path)
+            if loc:
+                annual_cost = file_velocity_cost(file_metrics, days, config)['annual_cost_usd']
+                scored.append((calculate_roi(annual_cost, estimate_fix_effort(loc, config), config)['roi'], path))
+        full_top = sorted(scored, reverse=True)[:k]
+        results['measure_all'] = {
+            'wall_seconds': round(time.perf_counter() - started, 3),
+            'api_calls': sum(simulator.calls.values()),
+            'files_measured': len(measured)
+        }
+
+        simulator.reset_counters()
+        started = time.perf_counter()
+        ranked = TopKRanker(client(simulator.url), repo.project_id, history, config, since_days=days).top(k, batch_size)
+        results['top_k_ranker'] = {
+            'wall_seconds': round(time.perf_counter() - started, 3),
+            'api_calls': sum(simulator.calls.values()),
+            'files_measured': ranked['measured'],
+            'files_pruned': ranked['pruned'],
+            'bound_violations': ranked['bound_violations'],
+            'calls_by_endpoint': dict(simulator.calls)
+        }
+
+    ranker_top = [(row['roi']['roi'], row['file']) for row in ranked['results']]
+    results['same_top_k'] = ranker_top == full_top
+    # equal roi values may swap places; the values themselves must match
+    results['same_top_k_values'] = [v for v, _ in ranker_top] == [v for v, _ in full_top]
+    return results
+
+
+_CONFIG_LOAD = """
+import sys, time
+started = time.perf_counter()
+from eunice.cost_calculator import EuniceConfig
+EuniceConfig({path!r})
+print(time.perf_counter() - started, 'yaml' in sys.modules)
+"""
+
+
+def _audit_rows(files: int, seed: int) -> Dict[str, Dict]:
+    """run_audit-shaped results: analyze_files metrics, velocity cost and, for most files, roi"""
+    from .cost_calculator import EuniceConfig, calculate_annual_velocity_cost, calculate_roi, estimate_fix_effort
+
+    rng = random.Random(seed)
+    config = EuniceConfig('/nonexistent/eunice.yml')
+    rows = {}
+    for i in range(files):
+        review_times = [rng.uniform(5, 2000) for _ in range(rng.randint(0, 4))]
+        pipelines = rng.randint(0, 12)
+        failed = rng.randint(0, pipelines)
+        metrics = {
+            'commit_count': rng.randint(0, 40),
+            'mr_iids': [rng.randint(1, 5000) for _ in review_times],
+            'review_times_minutes': review_times,
+            'avg_review_minutes': sum(review_times) / len(review_times) if review_times else 0,
+            'bug_hours': rng.choice((0, 0, 0.5, 1.0, 2.0, 4.0)),
+            'bug_issue_ids': [rng.randint(1, 900) for _ in range(rng.randint(0, 2))],
+            'pipeline_stats': {
+                'avg_duration_minutes': rng.uniform(2, 30) if pipelines else 0,
+                'failure_rate': failed / pipelines if pipelines else 0,
+                'failed_count': failed,
+                'total_count': pipelines
+            },
+            'ci_failure_count': failed,
+            'dropped_lookups': 0
+        }
+        metrics['velocity_cost'] = calculate_annual_velocity_cost(
+            metrics['commit_count'], metrics['avg_review_minutes'], metrics['bug_hours'], failed, config
+        )
+        if rng.random() < 0.9:
+            metrics['lines_of_code'] = rng.randint(10, 5000)
+            metrics['roi'] = calculate_roi(
+                metrics['velocity_cost']['annual_cost_usd'], estimate_fix_effort(metrics['lines_of_code'], config), config
+            )
+        rows[f'src/pkg{i % 50}/module_{i}.py'] = metrics
+    return rows
+
+
+def columnar_results(files: int = 20_000, top: int = 20, seed: int = 0) -> Dict:
+    """
+    an audit summary handed to the next stage as json vs a ColumnarResults
+    file: bytes, write time, and the time to read back the top rows by
+    annual cost (and every row, for the round trip)
+    """
+    import os
+    import tempfile
+
+    from .columnar import ColumnarResults
+
+    summary = {'run_id': 'benchmark', 'project_id': '1', 'since_days': 30, 'results': _audit_rows(files, seed)}
+    by = 'velocity_cost.annual_cost_usd'
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = f'{directory}/audit.json'
+        columnar_path = f'{directory}/audit.eunr'
+
+        started = time.perf_counter()
+        with open(json_path, 'w') as f:
+            json.dump(summary, f)
+        json_write = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with open(json_path) as f:
+            loaded = json.load(f)
+        ranked = sorted(loaded['results'], key=lambda p: loaded['results'][p]['velocity_cost']['annual_cost_usd'],
+                        reverse=True)[:top]
+        json_top = {path: loaded['results'][path] for path in ranked}
+        json_read_top = time.perf_counter() - started
+
+        started = time.perf_counter()
+        columnar_bytes = ColumnarResults.from_report(summary).save(columnar_path)
+        columnar_write = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ColumnarResults.open(columnar_path) as results:
+            columnar_top = results.to_report(results.top(top, by=by))['results']
+        columnar_read_top = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ColumnarResults.open(columnar_path) as results:
+            round_trip = results.to_report()
+        columnar_read_all = time.perf_counter() - started
+
+        json_bytes = os.path.getsize(json_path)
+
+    return {
+        'files': files,
+        'json': {
+            'bytes': json_bytes,
+            'write_seconds': round(json_write, 3),
+            'read_top_seconds': round(json_read_top, 3)
+        },
+        'columnar': {
+            'bytes': columnar_bytes,
+            'write_seconds': round(columnar_write, 3),
+            'read_top_seconds': round(columnar_read_top, 4),
+            'read_all_seconds': round(columnar_read_all, 3)
+        },
+        'size_ratio': round(columnar_bytes / json_bytes, 3),
+        'same_top_rows': list(columnar_top) == list(json_top) and columnar_top == json_top,
+        'round_trip_exact': json.dumps(round_trip) == json.dumps(summary)
+    }
+
+
+def config_load(config: Optional[str] = None, runs: int = 5) -> Dict:
+    """
+    EuniceConfig construction in a fresh interpreter: yaml parse vs the
+    pre-parsed mtime-keyed copy, plus repeat loads inside one process
+    """
+    import os
+    import shutil
+    import subprocess
+    import tempfile
+
+    from .cost_calculator import EuniceConfig
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = config or os.path.join(package_root, '..', 'config', 'eunice.yml.template')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')])))
+
+    def fresh_process(workdir: str):
+        out = subprocess.run(
+            [sys.executable, '-c', _CONFIG_LOAD.format(path='eunice.yml')],
+            cwd=workdir, env=env, capture_output=True, text=True, check=True
+        ).stdout.split()
+        return float(out[0]), out[1] == 'True'
+
+    parsed, cached = [], []
+    imported_yaml = None
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp()
+        try:
+            shutil.copy(config, os.path.join(workdir, 'eunice.yml'))
+            parsed.append(fresh_process(workdir)[0])  # no pre-parsed copy yet
+            seconds, imported_yaml = fresh_process(workdir)
+            cached.append(seconds)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    EuniceConfig(config)
+    started = time.perf_counter()
+    for _ in range(1000):
+        EuniceConfig(config)
+    in_process = (time.perf_counter() - started) / 1000
+
+    return {
+        'yaml_parse_ms': round(min(parsed) * 1000, 2),
+        'preparsed_ms': round(min(cached) * 1000, 2),
+        'preparsed_imports_yaml': imported_yaml,
+        'in_process_reload_us': round(in_process * 1e6, 2)
+    }
+
+
+_IMPORT_TIME = """
+import sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(elapsed, *(name in sys.modules for name in ('gitlab', 'requests', 'yaml')))
+"""
+
+# what the outer package __init__ used to import eagerly (yaml came
+# with cost_calculator before the config was pre-parsed)
+_EAGER_IMPORTS = (
+    'import yaml, eunice.gitlab_client, eunice.cost_calculator, eunice.fingerprint'
+)
+
+IMPORT_CASES = {
+    'eager_package_init': _EAGER_IMPORTS,
+    'import_eunice': 'import eunice',
+    'cost_calculator': 'from eunice import calculate_roi, EuniceConfig',
+    'fingerprint': 'from eunice import generate_fingerprint, deduplicate_findings',
+    'gitlab_client': 'from eunice import EuniceGitLabClient',
+    'cli_parser': 'from eunice.cli import build_parser; build_parser()',
+}
+
+
+def import_time(runs: int = 7, cases: Optional[Sequence[str]] = None) -> Dict:
+    """
+    wall time of typical imports in a fresh interpreter (best of runs),
+    and whether each pulled in python-gitlab, requests or yaml
+    """
+    import os
+    import subprocess
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get('PYTHONPATH')])))
+
+    results = {}
+    for case in cases or IMPORT_CASES:
+        code = _IMPORT_TIME.format(statement=IMPORT_CASES[case])
+        timings = []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True
+            ).stdout.split()
+            timings.append(float(out[0]))
+
+        results[case] = {
+            'statement': IMPORT_CASES[case],
+            'best_ms': round(min(timings) * 1000, 2),
+            'imports': [name for name, loaded in zip(('gitlab', 'requests', 'yaml'), out[1:]) if loaded == 'True']
+        }
+    return results
+
+
+def _flaky_run(url: str, project_id: int, paths: List[str], transport) -> Dict:
+    from .gitlab_client import create_client
+    from .rate_limit import TokenBucket
+
+    client = create_client(
+        url,
+        'benchmark-token',
+        rate_limiter=TokenBucket(rate_per_minute=10 ** 9, capacity=10 ** 6),
+        transport=transport
+    )
+    started = time.perf_counter()
+    try:
+        results, error = client.analyze_files(project_id, paths, 30), None
+    except Exception as e:
+        results, error = None, f'{type(e).__name__}: {e}'
+
+    snapshot = client.instrumentation.to_dict()
+    return {
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'results': results,
+        'error': error,
+        'retries': snapshot['retries']['by_reason'],
+        'dropped': snapshot['dropped']
+    }
+
+
+def flaky_transport(
+    files: int = 200,
+    commits: int = 3000,
+    issues: int = 300,
+    sample: int = 20,
+    error_rate: float = 0.05,
+    stall_rate: float = 0.01,
+    stall_ms: float = 1500,
+    read_timeout: float = 0.5,
+    seed: int = 0
+) -> Dict:
+    """
+    analyze_files against a GitLabSimulator injecting 5xx answers and
+    stalled responses (past the read timeout): retries=0 vs the retrying
+    transport, each compared to a clean run. also reports response bytes
+    with and without gzip.
+    """
+    from .simulator import GitLabSimulator, SyntheticRepo
+    from .transport import Transport
+
+    repo = SyntheticRepo(files=files, commits=commits, issues=issues, seed=seed)
+    paths = repo.paths[::max(1, files // sample)][:sample]
+
+    def strip(results):
+        if results is None:
+            return None
+        return {path: {k: v for k, v in row.items() if k != 'dropped_lookups'} for path, row in results.items()}
+
+    def transport(retries: int) -> Transport:
+        return Transport(timeout=(1.0, read_timeout), retries=retries, backoff=0.05, backoff_max=1.0, seed=seed)
+
+    results = {'sample_files': len(paths), 'error_rate': error_rate, 'stall_rate': stall_rate, 'runs': {}}
+
+    # clean baseline, plain then gzip
+    for compress in (False, True):
+        with GitLabSimulator(repo, compress=compress, seed=seed) as simulator:
+            run = _flaky_run(simulator.url, repo.project_id, paths, transport(0))
+            results['bytes_received_gzip' if compress else 'bytes_received'] = simulator.bytes_sent
+        if not compress:
+            clean = strip(run['results'])
+            results['clean_wall_seconds'] = run['wall_seconds']
+
+    for name, retries in (('no_retries', 0), ('retrying_transport', 5)):
+        simulator = GitLabSimulator(
+            repo,
+            error_rate=error_rate,
+            stall_rate=stall_rate,
+            stall_ms=stall_ms,
+            compress=True,
+            seed=seed
+        )
+        with simulator:
+            run = _flaky_run(simulator.url, repo.project_id, paths, transport(retries))
+            calls = dict(simulator.calls)
+
+        results['runs'][name] = {
+            'wall_seconds': run['wall_seconds'],
+            'api_calls': sum(calls.values()),
+            'injected_errors': calls.get('errors', 0),
+            'injected_stalls': calls.get('stalled', 0),
+            'retries': run['retries'],
+            'dropped': run['dropped'],
+            'error': run['error'],
+            'matches_clean_run': strip(run['results']) == clean
+        }
+
+    return results
+
+
+def _post_events(events, batch_size: int) -> Dict:
+    """the same events through webhook_app on a local port, posted by replay()"""
+    import asyncio
+    import socket
+
+    from aiohttp import web
+
+    from .ingest import WebhookIngestor, replay, webhook_app
+    from .metrics_store import MetricsStore
+
+    async def run():
+        ingestor = WebhookIngestor(MetricsStore(':memory:'), batch_size=batch_size, flush_interval=0.05)
+        runner = web.AppRunner(webhook_app(ingestor, secret='benchmark'))
+        await runner.setup()
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        site = web.TCPSite(runner, '127.0.0.1', port)
+        await site.start()
+        try:
+            report = await replay(f'http://127.0.0.1:{port}', events, secret='benchmark')
+        finally:
+            await runner.cleanup()  # drains the queue
+        report['processed'] = sum(ingestor.stats[event] for event in ('Push Hook', 'Merge Request Hook',
+                                                                      'Pipeline Hook', 'Issue Hook'))
+        return report
+
+    return asyncio.run(run())
+
+
+def webhook_ingest(
+    files: int = 200,
+    commits: int = 3000,
+    issues: int = 300,
+    days: int = 30,
+    batch_size: int = 500,
+    http: bool = True,
+    seed: int = 0
+) -> Dict:
+    """
+    a synthetic project's webhook deliveries through WebhookIngestor: events
+    per second via the queue (and over http when aiohttp is installed),
+    then MetricsStore.file_metrics for every file against
+    analyze_files(build_index=True) on the GitLabSimulator
+    """
+    import asyncio
+
+    from .gitlab_client import create_client
+    from .ingest import WebhookIngestor, web
+    from .metrics_store import MetricsStore
+    from .rate_limit import TokenBucket
+    from .simulator import GitLabSimulator, SyntheticRepo
+
+    repo = SyntheticRepo(files=files, commits=commits, issues=issues, days=days, seed=seed)
+    events = repo.webhook_events()
+    store = MetricsStore(':memory:')
+    ingestor = WebhookIngestor(store, batch_size=batch_size, flush_interval=0.05)
+
+    async def feed():
+        await ingestor.start()
+        for event, payload in events:
+            while not ingestor.submit(event, payload):
+                await asyncio.sleep(0.001)  # queue full: what a 503 asks gitlab to do
+            await asyncio.sleep(0)
+        await ingestor.stop()
+
+    started = time.perf_counter()
+    asyncio.run(feed())
+    queue_seconds = time.perf_counter() - started
+
+    results = {
+        'events': len(events),
+        'queue': {
+            'seconds': round(queue_seconds, 3),
+            'events_per_second': round(len(events) / queue_seconds),
+            'batches': ingestor.stats['batches'],
+            'failed': ingestor.stats['failed']
+        }
+    }
+    if http and web is not None:
+        report = _post_events(events, batch_size)
+        results['http'] = dict(report, events_per_second=round(report['sent'] / report['seconds']))
+
+    # every event is older than the window start, so the run "covers" it
+    since_days = days + 1
+    started = time.perf_counter()
+    ingested = store.file_metrics(repo.project_id, repo.paths, since_days, source='webhooks')
+    read_seconds = time.perf_counter() - started
+
+    with GitLabSimulator(repo, seed=seed) as simulator:
+        client = create_client(
+            simulator.url, 'benchmark-token', rate_limiter=TokenBucket(rate_per_minute=10 ** 9, capacity=10 ** 6)
+        )
+        started = time.perf_counter()
+        measured = client.analyze_files(repo.project_id, repo.paths, since_days, build_index=True)
+        api_seconds = time.perf_counter() - started
+        api_calls = sum(simulator.calls.values())
+
+    keys = ('commit_count', 'review_count', 'avg_review_minutes', 'bug_hours', 'ci_failure_count')
+
+    def same(a, b):
+        return abs(a - b) <= 0.005 + 1e-9  # the store rounds averages and hours to 2 places
+
+    matching = {
+        key: sum(same(ingested[path][key], measured[path][key]) for path in repo.paths) / len(repo.paths)
+        for key in keys
+        if key in measured[repo.paths[0]]
+    }
+
+    results.update(
+        files=len(repo.paths),
+        store_read_seconds=round(read_seconds, 4),
+        api_seconds=round(api_seconds, 3),
+        api_calls=api_calls,
+        matching_share=matching
+    )
+    return results
+
+
+BENCHMARKS = {
+    'fingerprint_churn': fingerprint_churn,
+    'gitlab_api': gitlab_api,
+    'graphql_parity': graphql_parity,
+    'cost_calculator': cost_calculator,
+    'config_load': config_load,
+    'import_time': import_time,
+    'git_history': git_history,
+    'flaky_transport': flaky_transport,
+    'top_k_roi': top_k_roi,
+    'webhook_ingest': webhook_ingest,
+    'columnar_results': columnar_results,
+}
+
+
+def _option(value: str):
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def main(argv=None):
+    args = argv if argv is not None else sys.argv[1:]
+    names = [a for a in args if '=' not in a] or list(BENCHMARKS)
+    options = dict(a.split('=', 1) for a in args if '=' in a)
+
+    report = {}
+    for name in names:
+        if name not in BENCHMARKS:
+            raise SystemExit(f'unknown benchmark: {name} (available: {", ".join(BENCHMARKS)})')
+
+        benchmark = BENCHMARKS[name]
+        accepted = inspect.signature(benchmark).parameters
+        kwargs = {k: _option(v) for k, v in options.items() if k in accepted}
+        report[name] = benchmark(**kwargs)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
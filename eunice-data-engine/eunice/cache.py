@@ -0,0 +1,235 @@
+"""persistent single-file cache for gitlab api responses"""
+import json
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_CACHE_PATH = '.eunice/cache/gitlab.sqlite'
+
+# gitlab statuses that never change again
+TERMINAL_PIPELINE_STATUSES = {'success', 'failed', 'canceled', 'skipped'}
+
+# statuses counted as ci failures, everywhere pipelines are counted
+FAILED_PIPELINE_STATUSES = {'failed', 'canceled'}
+
+# incremental lists re-fetch a little before their watermark to catch
+# commits pushed late and issues updated while the last run was in flight
+WATERMARK_OVERLAP = timedelta(hours=24)
+
+# commits are listed by commit date, so one committed before the watermark
+# but merged after it is never in a delta - commit lists are fetched in
+# full again once this old
+FULL_RELIST_INTERVAL = timedelta(days=7)
+
+# finished pipelines can still be retried, and new ones can run for the
+# same sha, so they are re-checked after this long
+FINISHED_PIPELINE_TTL_SECONDS = 3 * 24 * 3600
+
+# incremental lists must outlive the gap between weekly audits
+INCREMENTAL_TTL_SECONDS = 14 * 24 * 3600
+
+# the cap is checked every EVICT_EVERY writes, and eviction goes down to
+# EVICT_TO of it, so a full cache is not re-counted and trimmed per write
+EVICT_EVERY = 500
+EVICT_TO = 0.9
+
+# last_access updates from hits are written in batches
+TOUCH_BATCH = 500
+
+# audit workers write the same file concurrently: wait this long for
+# another writer's lock instead of failing with "database is locked"
+BUSY_TIMEOUT_SECONDS = 30
+
+
+class ResponseCache:
+    """
+    sqlite-backed cache shared by every run of the eunice flows
+
+    reality check: merged mrs and commit diffs never change, so they are
+    kept indefinitely. everything else (open mrs, pipelines, issue lists)
+    gets a ttl - finished pipelines a longer one and is evicted least
+    recently used once the cache grows past max_entries (checked every
+    EVICT_EVERY writes; recency is recorded in batches). watermarks
+    record when a list was last refreshed so the next run only asks
+    gitlab for the delta (since= / updated_after=).
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: int = 6 * 3600,
+        max_entries: int = 50000
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lookups: Dict[str, List[int]] = {}  # key kind → [hits, misses]
+        self._touched: Dict[str, float] = {}  # key → last hit, not yet written
+        self._writes = 0  # since the last cap check
+
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # autocommit: never hold a write lock between calls (workers share the file)
+        self._db = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                immutable INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_lru
+                ON entries (immutable, last_access);
+            CREATE TABLE IF NOT EXISTS watermarks (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+
+    def get(self, key: str) -> Optional[Any]:
+        """return cached value or None (counts a hit or miss)"""
+        now = time.time()
+
+        with self._lock:
+            # keys look like mr:<project>:<iid> - count per kind
+            lookups = self._lookups.setdefault(key.split(':', 1)[0], [0, 0])
+            row = self._db.execute(
+                'SELECT value, expires_at FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses += 1
+                lookups[1] += 1
+                return None
+
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched()
+            self.hits += 1
+            lookups[0] += 1
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, immutable: bool = False, ttl_seconds: Optional[int] = None):
+        """store a json-serializable value; immutable entries never expire"""
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = None if immutable else now + ttl
+
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                (key, json.dumps(value, default=str), int(immutable), expires_at, now)
+            )
+            self._touched.pop(key, None)
+
+            if not immutable:
+                self._writes += 1
+                # at most 10% of the cap between checks
+                if self._writes >= max(1, min(EVICT_EVERY, self.max_entries // 10)):
+                    self._evict()
+
+    def get_watermark(self, key: str) -> Optional[str]:
+        """last refresh timestamp (iso) recorded for an incremental list"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM watermarks WHERE key = ?', (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, key: str, value: str):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO watermarks VALUES (?, ?)', (key, value)
+            )
+
+    def _flush_touched(self):
+        """write buffered last_access times (caller holds the lock)"""
+        if self._touched:
+            self._db.executemany(
+                'UPDATE entries SET last_access = ? WHERE key = ?',
+                [(at, key) for key, at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        """
+        over the cap: drop expired mutable entries, then least recently
+        used ones down to EVICT_TO of the cap (caller holds the lock)
+        """
+        self._writes = 0
+        count = self._db.execute(
+            'SELECT COUNT(*) FROM entries WHERE immutable = 0'
+        ).fetchone()[0]
+
+        if count <= self.max_entries:
+            return
+
+        self._flush_touched()
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            count -= self._db.execute(
+                'DELETE FROM entries WHERE immutable = 0 AND expires_at < ?',
+                (time.time(),)
+            ).rowcount
+            excess = count - int(self.max_entries * EVICT_TO)
+            if excess > 0:
+                self._db.execute("""
+                    DELETE FROM entries WHERE key IN (
+                        SELECT key FROM entries WHERE immutable = 0
+                        ORDER BY last_access ASC
+                        LIMIT ?
+                    )
+                """, (excess,))
+            self._db.execute('COMMIT')
+        except Exception:
+            self._db.execute('ROLLBACK')
+            raise
+
+    def stats(self) -> Dict:
+        """hit/miss counters for this process plus on-disk entry counts"""
+        with self._lock:
+            immutable, mutable = self._db.execute(
+                'SELECT COALESCE(SUM(immutable), 0), COALESCE(SUM(1 - immutable), 0) FROM entries'
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0,
+            'immutable_entries': immutable,
+            'mutable_entries': mutable
+        }
+
+    def stats_by_kind(self) -> Dict[str, Dict]:
+        """hit/miss counters for this process per key kind (mr, pipelines, file_commits, ...)"""
+        with self._lock:
+            lookups = {kind: list(counts) for kind, counts in self._lookups.items()}
+
+        return {
+            kind: {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else 0
+            }
+            for kind, (hits, misses) in sorted(lookups.items())
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.close()
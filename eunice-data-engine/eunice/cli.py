@@ -0,0 +1,375 @@
+"""eunice command line - `eunice audit ...`, `eunice rank ...`, `eunice hotspots ...`, `eunice ingest ...`, `eunice results ...`"""
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from .audit import DEFAULT_BUCKET_PATH, DEFAULT_CHECKPOINT_PATH, run_audit
+from .cache import DEFAULT_CACHE_PATH, ResponseCache
+from .cost_calculator import EuniceConfig
+from .instrumentation import prometheus_text
+from .metrics_store import DEFAULT_METRICS_PATH
+
+
+def _read_paths(args) -> List[str]:
+    paths = list(args.paths)
+    if args.files:
+        stream = sys.stdin if args.files == '-' else open(args.files)
+        with stream:
+            paths.extend(line.strip() for line in stream if line.strip())
+    return paths
+
+
+def _hotspots(args, config: EuniceConfig, since_days: float):
+    from .git_history import GitHistory  # runs git, not the gitlab api
+
+    history = GitHistory.analyze(args.repo, since_days=since_days, max_changeset_files=args.max_changeset_files)
+    return history, history.to_dict(args.top, config)
+
+
+def _gitlab_target(args, config: EuniceConfig):
+    """url, token, project id and window from flags, then the environment, then eunice.yml"""
+    gitlab_config = config.config.get('gitlab_config') or {}
+
+    url = args.url or os.getenv('GITLAB_URL') or gitlab_config.get('url')
+    token = os.getenv('GITLAB_TOKEN')
+    project_id = args.project or os.getenv('CI_PROJECT_ID') or gitlab_config.get('project_id')
+    since_days = args.since_days or gitlab_config.get('time_window_days') or 30
+    return url, token, project_id, since_days
+
+
+def _write_output(args, report: dict):
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+def _ingest_covers(metrics_path: Optional[str], since_days: float) -> bool:
+    if not metrics_path or not os.path.exists(metrics_path):
+        return False
+
+    from .metrics_store import MetricsStore
+
+    store = MetricsStore(metrics_path)
+    try:
+        return store.ingest_covers(since_days)
+    finally:
+        store.close()
+
+
+def _audit(args) -> int:
+    config = EuniceConfig(args.config)
+    url, token, project_id, since_days = _gitlab_target(args, config)
+
+    # a webhook-fed metrics store needs no gitlab access at all
+    if not project_id or (not (url and token) and not _ingest_covers(args.metrics_store, since_days)):
+        print('eunice audit: need a gitlab url, GITLAB_TOKEN and a project id', file=sys.stderr)
+        return 2
+
+    if args.format == 'columnar' and not args.output:
+        print('eunice audit: --format columnar writes a binary file, pass --output', file=sys.stderr)
+        return 2
+
+    paths = _read_paths(args)
+    history = hotspots = None
+    if not paths and args.repo:
+        # only the local top-k hotspots go to the api
+        try:
+            history, hotspots = _hotspots(args, config, since_days)
+        except RuntimeError as e:
+            print(f'eunice audit: {e}', file=sys.stderr)
+            return 2
+        paths = [row['file'] for row in hotspots['hotspots']]
+    if not paths:
+        print('eunice audit: no files to audit (pass paths, --files or --repo)', file=sys.stderr)
+        return 2
+
+    def progress(done, total):
+        if not args.quiet:
+            print(f'\r{done}/{total} files', end='' if done < total else '\n', file=sys.stderr, flush=True)
+
+    summary = run_audit(
+        project_id,
+        paths,
+        url=url,
+        token=token,
+        since_days=since_days,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        run_id=args.run_id,
+        fresh=args.fresh,
+        backend=args.backend or config.gitlab_backend,
+        config_path=args.config,
+        cache_path=None if args.no_cache else args.cache,
+        checkpoint_path=args.checkpoint,
+        bucket_path=args.rate_limit_bucket,
+        rate_per_minute=args.rate_per_minute,
+        profile=args.profile,
+        build_index=args.build_index,
+        lines_of_code=history.lines_of_code if history else None,
+        metrics_path=args.metrics_store,
+        progress=progress
+    )
+    if hotspots:
+        summary['hotspots'] = hotspots
+
+    if args.prometheus:
+        with open(args.prometheus, 'w') as f:
+            f.write(prometheus_text(summary['instrumentation']))
+
+    if args.format == 'columnar':
+        from .columnar import ColumnarResults
+
+        ColumnarResults.from_report(summary).save(args.output)
+    else:
+        _write_output(args, summary)
+
+    if summary['failed_chunks']:
+        print(
+            f"eunice audit: {len(summary['failed_chunks'])} chunk(s) failed - "
+            f"rerun with --run-id {summary['run_id']} to resume",
+            file=sys.stderr
+        )
+        return 1
+    return 0
+
+
+def _rank(args) -> int:
+    config = EuniceConfig(args.config)
+    url, token, project_id, since_days = _gitlab_target(args, config)
+
+    if not url or not token or not project_id:
+        print('eunice rank: need a gitlab url, GITLAB_TOKEN and a project id', file=sys.stderr)
+        return 2
+
+    try:
+        history, _ = _hotspots(args, config, since_days)
+    except RuntimeError as e:
+        print(f'eunice rank: {e}', file=sys.stderr)
+        return 2
+
+    from .gitlab_client import create_client
+    from .ranking import TopKRanker
+    from .rate_limit import TokenBucket
+
+    client = create_client(
+        url,
+        token,
+        backend=args.backend or config.gitlab_backend,
+        cache=None if args.no_cache else ResponseCache(args.cache),
+        rate_limiter=TokenBucket(rate_per_minute=args.rate_per_minute)
+    )
+    ranker = TopKRanker(client, project_id, history, config, since_days=since_days, by=args.by)
+    report = ranker.top(args.top, batch_size=args.batch_size)
+    report['instrumentation'] = client.instrumentation.to_dict()
+
+    _write_output(args, report)
+    if report['bound_violations']:
+        print(
+            f"eunice rank: {report['bound_violations']} file(s) had more commits on gitlab than in {args.repo} - "
+            'pull the clone, the top files may be incomplete',
+            file=sys.stderr
+        )
+    return 0
+
+
+def _ingest(args) -> int:
+    from .ingest import serve, web
+    from .metrics_store import MetricsStore
+
+    if web is None:
+        print('eunice ingest: the webhook service needs aiohttp: pip install eunice-data-engine[async]', file=sys.stderr)
+        return 2
+
+    secret = os.getenv('EUNICE_WEBHOOK_SECRET')
+    if not secret:
+        print('eunice ingest: EUNICE_WEBHOOK_SECRET is not set - accepting unauthenticated deliveries', file=sys.stderr)
+
+    serve(
+        MetricsStore(args.metrics_store),
+        host=args.host,
+        port=args.port,
+        secret=secret,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        max_queue=args.max_queue
+    )
+    return 0
+
+
+def _replay(args) -> int:
+    import asyncio
+
+    from .ingest import aiohttp, dump_events, load_events, replay
+
+    if args.synthetic:
+        from .simulator import SyntheticRepo
+
+        events = SyntheticRepo(files=args.synthetic, seed=args.seed).webhook_events()
+    elif args.events:
+        events = list(load_events(args.events))
+    else:
+        print('eunice replay: pass a recorded events file or --synthetic N', file=sys.stderr)
+        return 2
+
+    if args.save:
+        dump_events(events, args.save)
+        if not args.url:
+            return 0
+    if aiohttp is None:
+        print('eunice replay: needs aiohttp: pip install eunice-data-engine[async]', file=sys.stderr)
+        return 2
+
+    report = asyncio.run(replay(args.url or 'http://localhost:8090', events, secret=os.getenv('EUNICE_WEBHOOK_SECRET')))
+    _write_output(args, report)
+    return 0
+
+
+def _results(args) -> int:
+    from .columnar import ColumnarResults
+
+    try:
+        results = ColumnarResults.open(args.file)
+    except (OSError, ValueError) as e:
+        print(f'eunice results: {e}', file=sys.stderr)
+        return 2
+
+    with results:
+        paths = _read_paths(args)
+        missing = [path for path in paths if path not in results]
+        if missing:
+            print(f"eunice results: not in {args.file}: {', '.join(missing)}", file=sys.stderr)
+            return 2
+
+        if not paths and args.top:
+            try:
+                paths = results.top(args.top, by=args.by)
+            except (KeyError, ValueError) as e:
+                print(f'eunice results: cannot rank by {args.by}: {e}', file=sys.stderr)
+                return 2
+        _write_output(args, results.to_report(paths or None))
+    return 0
+
+
+def _hotspots_command(args) -> int:
+    config = EuniceConfig(args.config)
+    gitlab_config = config.config.get('gitlab_config') or {}
+    since_days = args.since_days or gitlab_config.get('time_window_days') or 30
+
+    try:
+        _, report = _hotspots(args, config, since_days)
+    except RuntimeError as e:
+        print(f'eunice hotspots: {e}', file=sys.stderr)
+        return 2
+
+    _write_output(args, report)
+    return 0
+
+
+def _add_history_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--top', type=int, default=20, help='hotspots to keep')
+    parser.add_argument('--max-changeset-files', type=int, default=30,
+                        help='larger commits are ignored for co-change coupling')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='eunice', description='technical debt analysis using real gitlab data')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    audit = commands.add_parser('audit', help='metrics and annual cost for many files, in parallel')
+    audit.add_argument('paths', nargs='*', help='files to audit')
+    audit.add_argument('--files', help='file with one path per line (- for stdin)')
+    audit.add_argument('--repo', help='local clone: with no paths, audit its top --top hotspots from git history')
+    audit.add_argument('--project', help='project id or path (default: CI_PROJECT_ID, then eunice.yml)')
+    audit.add_argument('--url', help='gitlab url (default: GITLAB_URL, then eunice.yml); token comes from GITLAB_TOKEN')
+    audit.add_argument('--config', default='eunice.yml')
+    audit.add_argument('--since-days', type=float, help='window (default: gitlab_config.time_window_days)')
+    audit.add_argument('--backend', choices=('rest', 'graphql'), help='default: gitlab_config.backend')
+    audit.add_argument('--workers', type=int, help='processes (default: cpu count)')
+    audit.add_argument('--chunk-size', type=int, default=20, help='files per work unit')
+    audit.add_argument('--run-id', help='checkpoint key; reruns with the same id resume (default: project-window-date)')
+    audit.add_argument('--fresh', action='store_true', help='ignore an existing checkpoint for this run id')
+    audit.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH)
+    audit.add_argument('--cache', default=DEFAULT_CACHE_PATH)
+    audit.add_argument('--no-cache', action='store_true')
+    audit.add_argument('--rate-limit-bucket', default=DEFAULT_BUCKET_PATH, help='file holding the shared rate limit budget')
+    audit.add_argument('--rate-per-minute', type=float, default=1900)
+    audit.add_argument('--output', '-o', help='write the json summary here instead of stdout')
+    audit.add_argument('--format', choices=('json', 'columnar'), default='json',
+                       help='columnar: a compact binary file for `eunice results` and ColumnarResults.open')
+    audit.add_argument('--prometheus', help='also write the instrumentation here as prometheus text (textfile collector)')
+    audit.add_argument('--profile', action='store_true', help='run cProfile in each worker; top functions go in the summary')
+    audit.add_argument('--build-index', action='store_true',
+                       help='list commits and bug issues once, shared by every worker, instead of querying per file')
+    audit.add_argument('--metrics-store',
+                       help='metrics store fed by `eunice ingest`; used instead of the api when it covers the window')
+    audit.add_argument('--quiet', '-q', action='store_true')
+    _add_history_arguments(audit)
+    audit.set_defaults(handler=_audit)
+
+    rank = commands.add_parser('rank', help='top files by roi or annual cost, measuring only files that can make the cut')
+    rank.add_argument('--repo', default='.', help='local clone for churn and loc bounds (default: current directory)')
+    rank.add_argument('--by', choices=('roi', 'annual_cost'), default='roi')
+    rank.add_argument('--batch-size', type=int, default=10, help='files measured per round')
+    rank.add_argument('--project', help='project id or path (default: CI_PROJECT_ID, then eunice.yml)')
+    rank.add_argument('--url', help='gitlab url (default: GITLAB_URL, then eunice.yml); token comes from GITLAB_TOKEN')
+    rank.add_argument('--config', default='eunice.yml')
+    rank.add_argument('--since-days', type=float, help='window (default: gitlab_config.time_window_days)')
+    rank.add_argument('--backend', choices=('rest', 'graphql'), help='default: gitlab_config.backend')
+    rank.add_argument('--cache', default=DEFAULT_CACHE_PATH)
+    rank.add_argument('--no-cache', action='store_true')
+    rank.add_argument('--rate-per-minute', type=float, default=1900)
+    rank.add_argument('--output', '-o', help='write the json here instead of stdout')
+    _add_history_arguments(rank)
+    rank.set_defaults(handler=_rank)
+
+    hotspots = commands.add_parser('hotspots', help='churn, authors, coupling and loc per file from local git history')
+    hotspots.add_argument('--repo', default='.', help='local clone (default: current directory)')
+    hotspots.add_argument('--config', default='eunice.yml')
+    hotspots.add_argument('--since-days', type=float, help='window (default: gitlab_config.time_window_days)')
+    hotspots.add_argument('--output', '-o', help='write the json here instead of stdout')
+    _add_history_arguments(hotspots)
+    hotspots.set_defaults(handler=_hotspots_command)
+
+    ingest = commands.add_parser('ingest', help='webhook service: push, mr, pipeline and issue events into the metrics store')
+    ingest.add_argument('--host', default='0.0.0.0')
+    ingest.add_argument('--port', type=int, default=8090)
+    ingest.add_argument('--metrics-store', default=DEFAULT_METRICS_PATH)
+    ingest.add_argument('--batch-size', type=int, default=500, help='events per store transaction')
+    ingest.add_argument('--flush-interval', type=float, default=1.0, help='seconds before a partial batch is written')
+    ingest.add_argument('--max-queue', type=int, default=10_000, help='queued events before deliveries get 503')
+    ingest.set_defaults(handler=_ingest)
+
+    replay_parser = commands.add_parser('replay', help='post recorded webhook deliveries to a running `eunice ingest`')
+    replay_parser.add_argument('events', nargs='?', help='jsonl file of {"event", "payload"} records')
+    replay_parser.add_argument('--url', help='service to post to (default: http://localhost:8090)')
+    replay_parser.add_argument('--synthetic', type=int, metavar='FILES',
+                               help='replay the simulator project of this many files instead')
+    replay_parser.add_argument('--seed', type=int, default=0)
+    replay_parser.add_argument('--save', help='also write the events here as jsonl (without --url: only write)')
+    replay_parser.add_argument('--output', '-o', help='write the json report here instead of stdout')
+    replay_parser.set_defaults(handler=_replay)
+
+    results = commands.add_parser('results', help='rows of a columnar audit or impact file, as json')
+    results.add_argument('file', help='written by `eunice audit --format columnar` or ColumnarResults.save')
+    results.add_argument('paths', nargs='*', help='rows to expand (default: all, or the --top rows)')
+    results.add_argument('--files', help='file with one path per line (- for stdin)')
+    results.add_argument('--top', type=int, help='only the top rows by --by')
+    results.add_argument('--by', default='velocity_cost.annual_cost_usd', help='numeric column to rank by')
+    results.add_argument('--output', '-o', help='write the json here instead of stdout')
+    results.set_defaults(handler=_results)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""gitlab code quality (code climate json) reports - streamed, indexed by file and fingerprint"""
+import codecs
+import json
+import re
+from typing import IO, Dict, Iterator, List, Optional
+
+from .fingerprint import parse_lines
+
+
+# artifact path used by gitlab's Code-Quality.gitlab-ci.yml template
+CODE_QUALITY_REPORT = 'gl-code-quality-report.json'
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\r\n'
+# what can follow the part of a number raw_decode accepted when the
+# rest was cut off ('-2.5' of '-2.5e+10' leaves at most 'e+')
+_NUMBER_TAIL = '.eE+-0123456789'
+_NUMBER_TAIL_LENGTH = 2
+_COMPLEXITY = re.compile(r'complexity (?:of|is|=)?\s*(\d+)', re.IGNORECASE)
+
+
+def iter_json_array(stream: IO, chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """
+    yield the elements of a top-level json array one by one
+
+    reality check: reports reach tens of mb, json.load would hold all of
+    it plus every parsed issue. the buffer here only ever holds one chunk
+    plus the element being decoded.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        # read at least as much as is pending, so an element larger than a
+        # chunk is re-scanned O(log size) times rather than once per chunk
+        chunk = stream.read(max(chunk_size, len(buffer) - pos))
+        eof = not chunk
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk, final=eof)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+
+        if pos == len(buffer):
+            if eof:
+                if not started:
+                    return  # empty file - no report
+                raise ValueError('code quality report ended inside the array')
+            fill()
+            continue
+
+        char = buffer[pos]
+
+        if not started:
+            if char == '\ufeff':
+                pos += 1
+                continue
+            if char != '[':
+                raise ValueError(f'code quality report is not a json array (starts with {char!r})')
+            started = True
+            pos += 1
+            continue
+
+        if char == ']':
+            return
+        if char == ',':
+            pos += 1
+            continue
+
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+
+        # a number cut off at the chunk boundary decodes "successfully":
+        # '12' of '1234', or '-2.5' of '-2.5e10' (raw_decode stops at the 'e')
+        if (
+            not eof
+            and isinstance(element, (int, float)) and not isinstance(element, bool)
+            and (end == len(buffer) or (buffer[end] in _NUMBER_TAIL and len(buffer) - end <= _NUMBER_TAIL_LENGTH))
+        ):
+            fill()
+            continue
+
+        pos = end
+        yield element
+
+
+def _issue_lines(location: Dict) -> str:
+    """'begin-end' from either code climate location form"""
+    lines = location.get('lines')
+    if lines:
+        begin = lines.get('begin')
+        end = lines.get('end', begin)
+    else:
+        positions = location.get('positions') or {}
+        begin = (positions.get('begin') or {}).get('line')
+        end = (positions.get('end') or {}).get('line', begin)
+
+    if begin is None:
+        return ''
+    return f'{begin}-{end if end is not None else begin}'
+
+
+def issue_to_finding(issue: Dict) -> Optional[Dict]:
+    """code climate issue → eunice finding (None for non-issue entries)"""
+    if issue.get('type', 'issue').lower() != 'issue':
+        return None
+
+    location = issue.get('location') or {}
+    description = issue.get('description') or ''
+    complexity = _COMPLEXITY.search(description)
+
+    return {
+        'type': 'code_quality',
+        'file': location.get('path', ''),
+        'lines': _issue_lines(location),
+        'rule_id': issue.get('check_name', ''),
+        'severity': issue.get('severity', 'info'),
+        'categories': issue.get('categories') or [],
+        'description': description,
+        'complexity': int(complexity.group(1)) if complexity else None,
+        'code_quality_fingerprint': issue.get('fingerprint')
+    }
+
+
+class CodeQualityIndex:
+    """
+    code quality findings keyed by file path and by fingerprint
+
+    findings carry 'code_quality_fingerprint', so generate_fingerprint
+    reuses gitlab's fingerprint for them as is.
+    """
+
+    def __init__(self, job_id: Optional[int] = None):
+        self.job_id = job_id
+        self.by_fingerprint: Dict[str, Dict] = {}
+        self.by_path: Dict[str, List[Dict]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(findings) for findings in self.by_path.values())
+
+    def add(self, finding: Dict):
+        fingerprint = finding.get('code_quality_fingerprint')
+        if fingerprint:
+            if fingerprint in self.by_fingerprint:
+                return  # reports list some issues once per engine
+            self.by_fingerprint[fingerprint] = finding
+        self.by_path.setdefault(finding['file'], []).append(finding)
+
+    def paths(self) -> List[str]:
+        return list(self.by_path)
+
+    def findings(self, path: Optional[str] = None) -> List[Dict]:
+        if path is not None:
+            return list(self.by_path.get(path, ()))
+        return [finding for findings in self.by_path.values() for finding in findings]
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        return self.by_fingerprint.get(fingerprint)
+
+    def match(self, finding: Dict) -> Optional[Dict]:
+        """code quality issue in the same file overlapping most of a finding's lines"""
+        span = parse_lines(finding.get('lines'))
+        best, best_overlap = None, 0
+
+        for candidate in self.by_path.get(finding.get('file'), ()):
+            other = parse_lines(candidate['lines'])
+            if span is None or other is None:
+                continue
+
+            overlap = min(span[1], other[1]) - max(span[0], other[0]) + 1
+            if overlap > best_overlap:
+                best, best_overlap = candidate, overlap
+
+        return best
+
+    def attach(self, findings: List[Dict]) -> List[Dict]:
+        """
+        copies of findings with gitlab's fingerprint filled in where a code
+        quality issue covers them - generate_fingerprint then reuses it
+        """
+        attached = []
+        for finding in findings:
+            match = None if finding.get('code_quality_fingerprint') else self.match(finding)
+            if match and match.get('code_quality_fingerprint'):
+                finding = dict(finding, code_quality_fingerprint=match['code_quality_fingerprint'])
+            attached.append(finding)
+        return attached
+
+    def file_summary(self, path: str) -> Dict:
+        findings = self.by_path.get(path, ())
+        complexities = [f['complexity'] for f in findings if f['complexity'] is not None]
+        severities: Dict[str, int] = {}
+        for finding in findings:
+            severities[finding['severity']] = severities.get(finding['severity'], 0) + 1
+
+        return {
+            'issue_count': len(findings),
+            'complexity_issues': len(complexities),
+            'max_complexity': max(complexities) if complexities else None,
+            'severities': severities
+        }
+
+    def to_dict(self) -> Dict:
+        return {'job_id': self.job_id, 'findings': self.findings()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CodeQualityIndex':
+        index = cls(data.get('job_id'))
+        for finding in data.get('findings', ()):
+            index.add(finding)
+        return index
+
+
+def parse_code_quality_report(stream: IO, job_id: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> CodeQualityIndex:
+    """stream a code climate json report (text or binary file) into an index"""
+    index = CodeQualityIndex(job_id)
+
+    for issue in iter_json_array(stream, chunk_size):
+        finding = issue_to_finding(issue) if isinstance(issue, dict) else None
+        if finding is not None:
+            index.add(finding)
+
+    return index
@@ -0,0 +1,420 @@
+"""columnar result files - audit and impact rows as typed arrays, assumptions stored once, rows expanded on demand"""
+import heapq
+import json
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from copy import deepcopy
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pip install eunice-data-engine[numpy]
+    np = None
+
+
+MAGIC = b'EUNR'
+VERSION = 1
+_PREAMBLE = struct.Struct('<4sIQ')  # magic, version, header bytes
+_ALIGN = 8
+
+# per-row state, stored only for columns that need it
+_PRESENT, _ABSENT, _NONE, _INT = 0, 1, 2, 3  # _INT: an int kept in a float column
+
+# kind → typecode of its values buffer
+_TYPECODES = {
+    'int': 'q',
+    'float': 'd',
+    'bool': 'b',
+    'str': 'I',     # codes into the column's dictionary
+    'json': 'I',    # codes into a dictionary of json texts
+    'ints': 'q',    # list values, sliced by an offsets buffer
+    'floats': 'd'
+}
+_NUMPY_DTYPES = {'q': 'int64', 'd': 'float64', 'b': 'int8', 'I': 'uint32', 'Q': 'uint64', 'B': 'uint8'}
+
+_MISSING = object()
+
+
+def _flatten(row: Dict, prefix: Tuple = ()) -> Iterator[Tuple[Tuple, object]]:
+    """(key path, leaf value) pairs; empty dicts are leaves"""
+    for key, value in row.items():
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, prefix + (key,))
+        else:
+            yield prefix + (key,), value
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+
+
+def _fits_float(value) -> bool:
+    """an int a float64 holds exactly (beyond 2**53 not every int does)"""
+    return _is_int(value) and -2 ** 53 <= value <= 2 ** 53
+
+
+def _kind(values: List) -> str:
+    """
+    narrowest kind holding every present, non-None value of a column exactly
+
+    ints mixed with floats make a 'float' column only while each int fits
+    a float64 exactly; a larger one sends the column to 'json'
+    """
+    present = [v for v in values if v is not _MISSING and v is not None]
+    if not present:
+        return 'json'
+    if all(isinstance(v, bool) for v in present):
+        return 'bool'
+    if all(_is_int(v) for v in present):
+        return 'int'
+    if all(_fits_float(v) or isinstance(v, float) for v in present):
+        return 'float'
+    if all(isinstance(v, str) for v in present):
+        return 'str'
+    if all(isinstance(v, list) for v in present):
+        if all(_is_int(x) for v in present for x in v):
+            return 'ints'
+        if all(isinstance(x, float) for v in present for x in v):
+            return 'floats'
+    return 'json'
+
+
+class _Column:
+    """one flattened key: its buffers, or a single constant for every row"""
+
+    __slots__ = ('path', 'kind', 'constant', 'dictionary', 'values', 'states', 'offsets')
+
+    def __init__(self, path: Tuple, kind: str, constant=_MISSING, dictionary=None, values=None, states=None,
+                 offsets=None):
+        self.path = path
+        self.kind = kind
+        self.constant = constant
+        self.dictionary = dictionary
+        self.values = values
+        self.states = states
+        self.offsets = offsets
+
+    @property
+    def name(self) -> str:
+        return '.'.join(map(str, self.path))
+
+    @classmethod
+    def build(cls, path: Tuple, values: List) -> '_Column':
+        kind = _kind(values)
+        states = array('B', (
+            _ABSENT if v is _MISSING else _NONE if v is None else _INT if kind == 'float' and _is_int(v) else _PRESENT
+            for v in values
+        ))
+        present = [v for v, state in zip(values, states) if state in (_PRESENT, _INT)]
+        has_states = any(states)
+
+        # the same value on every row (config assumptions, window, source) is kept once
+        if not has_states and values and kind in ('int', 'float', 'bool', 'str') and len(set(present)) == 1:
+            return cls(path, kind, constant=present[0])
+
+        if kind in ('str', 'json'):
+            texts = present if kind == 'str' else [json.dumps(v, separators=(',', ':')) for v in present]
+            codes: Dict[str, int] = {}
+            for text in texts:
+                codes.setdefault(text, len(codes))
+            if not has_states and len(codes) == 1:
+                return cls(path, kind, constant=present[0])
+
+            encoded = iter(texts)
+            buffer = array('I', (codes[next(encoded)] if state == _PRESENT else 0 for state in states))
+            return cls(path, kind, dictionary=list(codes), values=buffer, states=states if has_states else None)
+
+        typecode = _TYPECODES[kind]
+        if kind in ('ints', 'floats'):
+            flat, offsets = array(typecode), array('Q', [0])
+            for v, state in zip(values, states):
+                if state == _PRESENT:
+                    flat.extend(v)
+                offsets.append(len(flat))
+            return cls(path, kind, values=flat, states=states if has_states else None, offsets=offsets)
+
+        zero = 0.0 if kind == 'float' else 0
+        buffer = array(typecode, (v if state in (_PRESENT, _INT) else zero for v, state in zip(values, states)))
+        return cls(path, kind, values=buffer, states=states if has_states else None)
+
+    def value(self, i: int):
+        """row i's value, _MISSING when the row has no such key"""
+        if self.constant is not _MISSING:
+            return deepcopy(self.constant) if isinstance(self.constant, (list, dict)) else self.constant
+
+        state = self.states[i] if self.states is not None else _PRESENT
+        if state == _ABSENT:
+            return _MISSING
+        if state == _NONE:
+            return None
+
+        kind = self.kind
+        if kind in ('ints', 'floats'):
+            return self.values[self.offsets[i]:self.offsets[i + 1]].tolist()
+        value = self.values[i]
+        if kind == 'str':
+            return self.dictionary[value]
+        if kind == 'json':
+            return json.loads(self.dictionary[value])
+        if kind == 'bool':
+            return bool(value)
+        if state == _INT:
+            return int(value)
+        return value
+
+
+class ColumnarResults(Mapping):
+    """
+    per-file results (audit results, impact files) as typed columns
+
+    reality check: every audited file carries the same assumptions_used
+    block and a dozen nested numbers, so an audit of thousands of files
+    is mostly repeated json - slow to write, slow to parse again in the
+    next flow stage, which then reports 20 rows of it. here each nested
+    key becomes one column: numbers in typed arrays, strings and odd
+    values dictionary-encoded, lists as flat arrays plus offsets, and a
+    key with the same value on every row (the assumptions, the window)
+    is stored once.
+
+    save() writes one binary file; open() memory-maps it, so columns are
+    read in place (column() hands out zero-copy memoryviews, or numpy
+    arrays with numpy installed) and a row is only expanded - to exactly
+    the dict it was built from - when it is looked up. the container is
+    a read-only mapping of path → row; meta keeps the rest of the report
+    (run id, window, instrumentation) as plain json.
+    """
+
+    def __init__(self, index: List[str], columns: List[_Column], meta: Optional[Dict] = None,
+                 rows_key: str = 'results', rows_position: Optional[int] = None, buffer=None,
+                 data: Optional[memoryview] = None):
+        self.index = index
+        self.meta = meta or {}
+        self.rows_key = rows_key
+        self.rows_position = len(self.meta) if rows_position is None else rows_position
+        self._columns = columns
+        self._by_name = {column.name: column for column in columns}
+        self._positions: Optional[Dict[str, int]] = None
+        self._buffer = buffer  # the mmap of an opened file
+        self._data = data      # and the view its columns are cut from
+
+    @classmethod
+    def from_rows(cls, rows: Dict[str, Dict], meta: Optional[Dict] = None, rows_key: str = 'results'
+                  ) -> 'ColumnarResults':
+        """columns from {key: nested dict of json values}, e.g. run_audit()['results']"""
+        index = list(rows)
+        values_by_path: Dict[Tuple, List] = {}  # first appearance order = key order on expansion
+
+        for i, row in enumerate(rows.values()):
+            for path, value in _flatten(row):
+                column = values_by_path.get(path)
+                if column is None:
+                    column = values_by_path[path] = [_MISSING] * len(index)
+                column[i] = value
+
+        columns = [_Column.build(path, values) for path, values in values_by_path.items()]
+        return cls(index, columns, meta, rows_key)
+
+    @classmethod
+    def from_report(cls, report: Dict, rows_key: Optional[str] = None) -> 'ColumnarResults':
+        """
+        a run_audit summary (rows under 'results') or a MetricsStore.impact
+        report (rows under 'files'); everything else goes to meta
+        """
+        if rows_key is None:
+            rows_key = 'results' if 'results' in report else 'files'
+        meta = {key: value for key, value in report.items() if key != rows_key}
+        results = cls.from_rows(report[rows_key], meta, rows_key)
+        results.rows_position = list(report).index(rows_key)
+        return results
+
+    # reading
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def __getitem__(self, key: str) -> Dict:
+        if self._positions is None:
+            self._positions = {k: i for i, k in enumerate(self.index)}
+        return self.row(self._positions[key])
+
+    def row(self, i: int) -> Dict:
+        """row i, expanded to its original nested dict"""
+        row: Dict = {}
+        for column in self._columns:
+            value = column.value(i)
+            if value is _MISSING:
+                continue
+            target = row
+            for key in column.path[:-1]:
+                target = target.setdefault(key, {})
+            target[column.path[-1]] = value
+        return row
+
+    @property
+    def columns(self) -> List[str]:
+        """flattened key names, e.g. velocity_cost.annual_cost_usd"""
+        return list(self._by_name)
+
+    def constants(self) -> Dict[str, object]:
+        """keys stored once for every row, e.g. velocity_cost.assumptions_used.dev_hourly_rate_usd"""
+        return {c.name: c.constant for c in self._columns if c.constant is not _MISSING}
+
+    def column(self, name: str, numpy: bool = False):
+        """
+        a numeric column without copying: a memoryview over the array or
+        the mapped file (numpy=True: a numpy array over the same memory).
+        rows without the key, or with None, read as 0 - see present().
+        constant columns are the one exception: they are filled in here
+        """
+        column = self._by_name[name]
+        if column.kind not in ('int', 'float', 'bool'):
+            raise ValueError(f'{name} is a {column.kind} column, not numeric')
+
+        if column.constant is not _MISSING:
+            values = array(_TYPECODES[column.kind], [column.constant]) * len(self)
+        else:
+            values = column.values
+        if numpy:
+            if np is None:
+                raise ImportError('numpy columns need numpy: pip install eunice-data-engine[numpy]')
+            return np.frombuffer(values, dtype=_NUMPY_DTYPES[_TYPECODES[column.kind]], count=len(self))
+        return memoryview(values)
+
+    def present(self, name: str) -> List[bool]:
+        """which rows have a (non-None) value for a column"""
+        column = self._by_name[name]
+        if column.states is None:
+            return [True] * len(self)
+        return [state in (_PRESENT, _INT) for state in column.states]
+
+    def top(self, k: int, by: str = 'velocity_cost.annual_cost_usd') -> List[str]:
+        """keys of the k rows with the largest values of a numeric column, largest first"""
+        values = self.column(by)
+        present = self.present(by)
+        return [self.index[i] for i in heapq.nlargest(k, (i for i in range(len(self)) if present[i]),
+                                                      key=values.__getitem__)]
+
+    def to_report(self, keys: Optional[List[str]] = None) -> Dict:
+        """the original report (meta plus expanded rows), for every row or only keys"""
+        keys = self.index if keys is None else keys
+        items = list(self.meta.items())
+        items.insert(self.rows_position, (self.rows_key, {key: self[key] for key in keys}))
+        return dict(items)
+
+    # files
+
+    def save(self, path: str) -> int:
+        """write one binary file; returns its size in bytes"""
+        descriptors = []
+        buffers = []
+        offset = 0
+
+        for column in self._columns:
+            descriptor = {'path': list(column.path), 'kind': column.kind}
+            if column.constant is not _MISSING:
+                descriptor['constant'] = column.constant
+            if column.dictionary is not None:
+                descriptor['dictionary'] = column.dictionary
+
+            for name in ('values', 'states', 'offsets'):
+                buffer = getattr(column, name)
+                if buffer is None:
+                    continue
+                data = memoryview(buffer).cast('B')
+                descriptor[name] = [offset, len(buffer), buffer.typecode if isinstance(buffer, array) else buffer.format]
+                buffers.append(data)
+                offset += len(data) + (-len(data) % _ALIGN)
+            descriptors.append(descriptor)
+
+        header = json.dumps({
+            'byteorder': sys.byteorder,
+            'rows_key': self.rows_key,
+            'rows_position': self.rows_position,
+            'index': self.index,
+            'meta': self.meta,
+            'columns': descriptors
+        }, separators=(',', ':'), default=str).encode()
+        header += b' ' * (-(_PREAMBLE.size + len(header)) % _ALIGN)
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            for data in buffers:
+                f.write(data)
+                f.write(b'\0' * (-len(data) % _ALIGN))
+            return f.tell()
+
+    @classmethod
+    def open(cls, path: str) -> 'ColumnarResults':
+        """map a saved file; columns stay on disk until read"""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if Path(path).stat().st_size else b''
+
+        magic, version, header_size = _PREAMBLE.unpack_from(buffer) if len(buffer) >= _PREAMBLE.size else (b'', 0, 0)
+        if magic != MAGIC or version > VERSION:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+            if magic != MAGIC:
+                raise ValueError(f'{path} is not a columnar result file')
+            raise ValueError(f'{path} is format version {version}; this eunice reads up to {VERSION}')
+
+        header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + header_size]))
+        data = memoryview(buffer)[_PREAMBLE.size + header_size:]
+        swap = header['byteorder'] != sys.byteorder
+
+        def view(spec):
+            if spec is None:
+                return None
+            offset, length, typecode = spec
+            size = array(typecode).itemsize * length
+            if swap:  # written on the other endianness: copy once
+                values = array(typecode, data[offset:offset + size])
+                values.byteswap()
+                return values
+            return data[offset:offset + size].cast(typecode)
+
+        columns = [
+            _Column(
+                tuple(descriptor['path']),
+                descriptor['kind'],
+                constant=descriptor.get('constant', _MISSING),
+                dictionary=descriptor.get('dictionary'),
+                values=view(descriptor.get('values')),
+                states=view(descriptor.get('states')),
+                offsets=view(descriptor.get('offsets'))
+            )
+            for descriptor in header['columns']
+        ]
+        return cls(header['index'], columns, header['meta'], header['rows_key'], header['rows_position'],
+                   buffer=buffer, data=data)
+
+    def close(self):
+        """unmap an opened file (views handed out by column() must be released first)"""
+        if not isinstance(self._buffer, mmap.mmap):
+            return
+        for column in self._columns:
+            for name in ('values', 'states', 'offsets'):
+                buffer = getattr(column, name)
+                if isinstance(buffer, memoryview):
+                    buffer.release()
+                setattr(column, name, None)
+        self._data.release()
+        try:
+            self._buffer.close()
+        except BufferError:
+            pass  # a caller still holds a view; the map goes when it does
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
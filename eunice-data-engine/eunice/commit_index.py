@@ -0,0 +1,123 @@
+"""project-wide commit index - fetch history once, answer per-file queries locally"""
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+def parse_gitlab_datetime(value: str) -> datetime:
+    """parse gitlab iso timestamps (trailing Z) into timezone-aware datetimes"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def as_aware(value: datetime) -> datetime:
+    """treat naive datetimes as local time so they compare with gitlab timestamps"""
+    return value if value.tzinfo else value.astimezone()
+
+
+def commit_date(commit) -> datetime:
+    """committed date of a commit - what commits.list(since=...) filters on"""
+    return parse_gitlab_datetime(getattr(commit, 'committed_date', None) or commit.created_at)
+
+
+class CommitIndex:
+    """
+    map file path → commits for one project over a time window
+
+    reality check: commits.list(path=...) per file re-downloads the same
+    commits for every file in an audit. the index pages through the
+    project history once, records the paths each commit changed, and
+    answers per-file queries from memory. commit → mr and commit → pipeline
+    lookups are memoized here too, so a commit shared by many files is
+    only resolved once.
+    """
+
+    def __init__(self, project_id: str, since: datetime):
+        self.project_id = str(project_id)
+        self.since = as_aware(since)
+        self.commits: Dict[str, object] = {}               # sha → commit (newest first)
+        self.paths_by_commit: Dict[str, Set[str]] = {}     # sha → changed paths
+        self.commits_by_path: Dict[str, List[str]] = {}    # path → shas (newest first)
+        self.mr_iids_by_commit: Dict[str, List[int]] = {}  # sha → merged mr iids
+        self.pipelines_by_commit: Dict[str, List] = {}     # sha → pipelines
+        self.failed_commits: Dict[str, datetime] = {}      # sha → date, paths unknown
+
+    def __len__(self) -> int:
+        return len(self.commits)
+
+    def add(self, commit, paths: Iterable[str]):
+        """record a commit and every path it touched (old and new paths on renames)"""
+        sha = commit.id
+        if sha in self.commits:
+            return
+
+        self.commits[sha] = commit
+        touched = set(p for p in paths if p)
+        self.paths_by_commit[sha] = touched
+
+        for path in touched:
+            self.commits_by_path.setdefault(path, []).append(sha)
+
+    def add_failed(self, commit):
+        """
+        record a commit whose changed paths could not be fetched
+
+        reality check: leaving it out would drop it from every file it
+        touched, so a window holding it is not covered (per-file queries
+        fall back to the api)
+        """
+        self.failed_commits[commit.id] = commit_date(commit)
+
+    def covers(self, since: datetime) -> bool:
+        """true if the index window reaches back at least to `since`, with every commit since then indexed"""
+        since = as_aware(since)
+        return self.since <= since and not any(date >= since for date in self.failed_commits.values())
+
+    def truncate_to(self, oldest: datetime):
+        """
+        narrow the window after hitting the pagination cap
+
+        reality check: a capped index is only complete back to its oldest commit
+        """
+        self.since = max(self.since, as_aware(oldest))
+
+    def commits_for(self, file_path: str, since: Optional[datetime] = None) -> List:
+        """commits touching a file, newest first, optionally narrowed to `since`"""
+        shas = self.commits_by_path.get(file_path, [])
+        commits = [self.commits[sha] for sha in shas]
+
+        if since is None or as_aware(since) <= self.since:
+            return commits
+
+        cutoff = as_aware(since)
+        return [c for c in commits if commit_date(c) >= cutoff]
+
+    def paths(self) -> List[str]:
+        """every path touched in the window"""
+        return list(self.commits_by_path)
+
+    def to_dict(self) -> Dict:
+        """
+        plain (picklable) form, to hand a built index to another process
+
+        commits go as their attributes; memoized pipelines are left out
+        """
+        return {
+            'project_id': self.project_id,
+            'since': self.since.isoformat(),
+            'commits': [commit.attributes for commit in self.commits.values()],
+            'paths_by_commit': {sha: sorted(paths) for sha, paths in self.paths_by_commit.items()},
+            'mr_iids_by_commit': dict(self.mr_iids_by_commit),
+            'failed_commits': {sha: date.isoformat() for sha, date in self.failed_commits.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, restore: Callable[[Dict], object]) -> 'CommitIndex':
+        """rebuild an index from to_dict(); restore turns commit attributes back into objects"""
+        index = cls(data['project_id'], datetime.fromisoformat(data['since']))
+        for attrs in data['commits']:
+            index.add(restore(attrs), data['paths_by_commit'][attrs['id']])
+
+        index.mr_iids_by_commit.update(data['mr_iids_by_commit'])
+        index.failed_commits.update(
+            (sha, datetime.fromisoformat(date)) for sha, date in data['failed_commits'].items()
+        )
+        return index
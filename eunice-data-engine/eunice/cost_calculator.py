@@ -1,77 +1,281 @@
 """cost calculations with transparent assumptions"""
-import yaml
+import copy
+import hashlib
+import json
+import os
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple, Union
+
+
+# pre-parsed eunice.yml, keyed by path and mtime, so fresh processes skip yaml.
+# in the user cache dir, not the working directory: any checkout can load a config
+CONFIG_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'eunice', 'config')
+
+# assumptions the cost functions need, as (section, key)
+NUMERIC_ASSUMPTIONS = (
+    ('cost_assumptions', 'dev_hourly_rate'),
+    ('cost_assumptions', 'compute_cost_per_minute'),
+    ('cost_assumptions', 'kwh_per_compute_minute'),
+    ('cost_assumptions', 'co2_per_kwh'),
+    ('effort_assumptions', 'avg_bug_fix_hours'),
+    ('effort_assumptions', 'avg_ci_failure_debug_hours'),
+    ('effort_assumptions', 'avg_refactor_hours_per_100_loc'),
+    ('thresholds', 'create_issue_annual_cost'),
+    ('thresholds', 'create_issue_roi'),
+    ('thresholds', 'severity_threshold'),
+)
+
+
+def default_config() -> Dict:
+    """default configuration if file missing"""
+    return {
+        'cost_assumptions': {
+            'dev_hourly_rate': 75,
+            'source': 'industry average',
+            'compute_cost_per_minute': 0.02,
+            'runner_type': 'gitlab-saas-linux',
+            'kwh_per_compute_minute': 0.000195,
+            'co2_per_kwh': 0.475,
+            'grid_region': 'us-east'
+        },
+        'effort_assumptions': {
+            'avg_bug_fix_hours': 3,
+            'avg_ci_failure_debug_hours': 1,
+            'avg_refactor_hours_per_100_loc': 2,
+            'source': 'industry benchmarks'
+        },
+        'thresholds': {
+            'create_issue_annual_cost': 5000,
+            'create_issue_roi': 50,
+            'severity_threshold': 7
+        }
+    }
+
+
+class CompiledConfig:
+    """
+    validated, immutable form of eunice.yml for the cost functions
+    
+    reality check: EuniceConfig properties walk nested dicts on every
+    access and the cost functions run per file, per audit. here every
+    assumption is a slot, checked once at load. rate products are not
+    multiplied out up front: regrouping the formulas changes how they
+    round, and the reported cents must not move.
+    `config` keeps the parsed file for sections the engine does not
+    compile (gitlab_config, reporting, sensitivity).
+    """
+    
+    __slots__ = (
+        'path',
+        'config',
+        # assumptions
+        'dev_rate',
+        'compute_cost_per_min',
+        'kwh_per_compute_minute',
+        'co2_per_kwh',
+        'grid_region',
+        'cost_source',
+        'avg_bug_fix_hours',
+        'avg_ci_failure_hours',
+        'refactor_hours_per_100_loc',
+        'effort_source',
+        'issue_cost_threshold',
+        'issue_roi_threshold',
+        'severity_threshold',
+        'gitlab_backend',
+    )
+    
+    def __init__(self, config: Dict, path: Optional[str] = None):
+        if not isinstance(config, dict):
+            raise ValueError(f'{path or "eunice config"}: expected a mapping, got {type(config).__name__}')
+        
+        values = {}
+        for section, key in NUMERIC_ASSUMPTIONS:
+            value = (config.get(section) or {}).get(key)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                raise ValueError(f'{path or "eunice config"}: {section}.{key} must be a number >= 0, got {value!r}')
+            values[key] = value
+        
+        cost = config['cost_assumptions']
+        effort = config['effort_assumptions']
+        rate = values['dev_hourly_rate']
+        
+        assign = super().__setattr__
+        assign('path', path)
+        assign('config', config)
+        
+        assign('dev_rate', rate)
+        assign('compute_cost_per_min', values['compute_cost_per_minute'])
+        assign('kwh_per_compute_minute', values['kwh_per_compute_minute'])
+        assign('co2_per_kwh', values['co2_per_kwh'])
+        assign('grid_region', cost.get('grid_region'))
+        assign('cost_source', cost.get('source'))
+        assign('avg_bug_fix_hours', values['avg_bug_fix_hours'])
+        assign('avg_ci_failure_hours', values['avg_ci_failure_debug_hours'])
+        assign('refactor_hours_per_100_loc', values['avg_refactor_hours_per_100_loc'])
+        assign('effort_source', effort.get('source'))
+        assign('issue_cost_threshold', values['create_issue_annual_cost'])
+        assign('issue_roi_threshold', values['create_issue_roi'])
+        assign('severity_threshold', values['severity_threshold'])
+        assign('gitlab_backend', (config.get('gitlab_config') or {}).get('backend', 'rest'))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError(f'CompiledConfig is immutable (tried to set {name})')
+    
+    def __delattr__(self, name):
+        raise AttributeError(f'CompiledConfig is immutable (tried to delete {name})')
+    
+    def __reduce__(self):
+        # slots + a blocked __setattr__: pickle by recompiling (process pools)
+        return CompiledConfig, (self.config, self.path)
+    
+    @property
+    def compiled(self) -> 'CompiledConfig':
+        return self
+    
+    @property
+    def assumptions_metadata(self) -> Dict:
+        """return all assumptions with sources"""
+        return {
+            'cost_assumptions': self.config['cost_assumptions'],
+            'effort_assumptions': self.config['effort_assumptions']
+        }
+    
+    def should_create_issue(self, annual_cost: float, roi: float) -> bool:
+        """check if issue should be created based on thresholds"""
+        return annual_cost >= self.issue_cost_threshold or roi >= self.issue_roi_threshold
+
+
+# path → (mtime_ns, size, compiled) for this process
+_compiled_configs: Dict[str, Tuple[int, int, CompiledConfig]] = {}
+
+
+def _cache_file(path: Path) -> Path:
+    digest = hashlib.blake2b(str(path).encode(), digest_size=8).hexdigest()
+    return Path(CONFIG_CACHE_DIR) / f'{digest}.json'
+
+
+def _parse_config(path: Path, mtime_ns: int, size: int) -> Dict:
+    """
+    parsed eunice.yml, from the pre-parsed json copy when it is current
+    
+    reality check: yaml.safe_load (and importing yaml) costs more than
+    the rest of a cost calculation; json of the same data loads in
+    microseconds. the copy is keyed by mtime and size, so an edited
+    file is parsed again
+    """
+    cache_file = _cache_file(path)
+    try:
+        cached = json.loads(cache_file.read_text())
+        if cached['mtime_ns'] == mtime_ns and cached['size'] == size:
+            return cached['config']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    import yaml  # only when the file changed
+    
+    with open(path) as f:
+        config = yaml.safe_load(f)
+    
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+        temp.write_text(json.dumps({'mtime_ns': mtime_ns, 'size': size, 'config': config}))
+        os.replace(temp, cache_file)
+    except (OSError, TypeError, ValueError):
+        pass  # read-only checkout, or values json cannot hold: parse next time
+    
+    return config
+
+
+def load_config(config_path: str = 'eunice.yml') -> CompiledConfig:
+    """
+    compiled config for a path (defaults when the file is missing)
+    
+    reality check: compiled once per file version per process, and
+    parsed once per file version across processes (see _parse_config)
+    """
+    path = Path(config_path).resolve()
+    try:
+        stat = path.stat()
+    except OSError:
+        return _default_compiled()
+    
+    cached = _compiled_configs.get(str(path))
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    
+    compiled = CompiledConfig(_parse_config(path, stat.st_mtime_ns, stat.st_size), str(config_path))
+    _compiled_configs[str(path)] = (stat.st_mtime_ns, stat.st_size, compiled)
+    return compiled
+
+
+def _default_compiled() -> CompiledConfig:
+    cached = _compiled_configs.get('')
+    if cached is None:
+        cached = _compiled_configs[''] = (0, 0, CompiledConfig(default_config()))
+    return cached[2]
 
 
 class EuniceConfig:
-    """load and expose configuration assumptions"""
+    """
+    load and expose configuration assumptions
+    
+    reality check: compiled once, and the compiled config is shared per
+    file version. treat `config` as read-only - it is this instance's own
+    copy, and edits to it (sensitivity runs, tests) only take effect after
+    recompile()
+    """
     
     def __init__(self, config_path: str = "eunice.yml"):
         self.config_path = config_path
         
-        if Path(config_path).exists():
-            with open(config_path) as f:
-                self.config = yaml.safe_load(f)
-        else:
-            # use defaults if config missing
-            self.config = self._get_defaults()
+        # validated and precomputed once; defaults if config missing
+        self.compiled = load_config(config_path)
+        self.config = copy.deepcopy(self.compiled.config)
+    
+    def recompile(self) -> CompiledConfig:
+        """validate and precompute `config` again after editing it"""
+        self.compiled = CompiledConfig(copy.deepcopy(self.config), self.config_path)
+        return self.compiled
     
     def _get_defaults(self) -> Dict:
         """default configuration if file missing"""
-        return {
-            'cost_assumptions': {
-                'dev_hourly_rate': 75,
-                'source': 'industry average',
-                'compute_cost_per_minute': 0.02,
-                'runner_type': 'gitlab-saas-linux',
-                'kwh_per_compute_minute': 0.000195,
-                'co2_per_kwh': 0.475,
-                'grid_region': 'us-east'
-            },
-            'effort_assumptions': {
-                'avg_bug_fix_hours': 3,
-                'avg_ci_failure_debug_hours': 1,
-                'avg_refactor_hours_per_100_loc': 2,
-                'source': 'industry benchmarks'
-            },
-            'thresholds': {
-                'create_issue_annual_cost': 5000,
-                'create_issue_roi': 50,
-                'severity_threshold': 7
-            }
-        }
+        return default_config()
     
     @property
     def dev_rate(self) -> float:
-        return self.config['cost_assumptions']['dev_hourly_rate']
+        return self.compiled.dev_rate
     
     @property
     def compute_cost_per_min(self) -> float:
-        return self.config['cost_assumptions']['compute_cost_per_minute']
+        return self.compiled.compute_cost_per_min
     
     @property
     def avg_bug_fix_hours(self) -> float:
-        return self.config['effort_assumptions']['avg_bug_fix_hours']
+        return self.compiled.avg_bug_fix_hours
     
     @property
     def avg_ci_failure_hours(self) -> float:
-        return self.config['effort_assumptions']['avg_ci_failure_debug_hours']
+        return self.compiled.avg_ci_failure_hours
+    
+    @property
+    def gitlab_backend(self) -> str:
+        """'rest' (default) or 'graphql' - see create_client"""
+        return self.compiled.gitlab_backend
     
     @property
     def assumptions_metadata(self) -> Dict:
         """return all assumptions with sources"""
-        return {
-            'cost_assumptions': self.config['cost_assumptions'],
-            'effort_assumptions': self.config['effort_assumptions']
-        }
+        return self.compiled.assumptions_metadata
     
     def should_create_issue(self, annual_cost: float, roi: float) -> bool:
         """check if issue should be created based on thresholds"""
-        cost_threshold = self.config['thresholds']['create_issue_annual_cost']
-        roi_threshold = self.config['thresholds']['create_issue_roi']
-        
-        return annual_cost >= cost_threshold or roi >= roi_threshold
+        return self.compiled.should_create_issue(annual_cost, roi)
+
+
+# the cost functions accept either; both expose .compiled
+Config = Union[EuniceConfig, CompiledConfig]
 
 
 def calculate_annual_velocity_cost(
@@ -79,7 +283,7 @@ def calculate_annual_velocity_cost(
     avg_review_time_minutes: float,
     bug_hours_tracked: float,
     ci_failure_count_monthly: int,
-    config: EuniceConfig,
+    config: Config,
     bug_hours_window_days: int = 30
 ) -> Dict:
     """
@@ -94,35 +298,35 @@ def calculate_annual_velocity_cost(
     assumptions (config):
     - dev_hourly_rate: from eunice.yml
     - avg_ci_failure_debug_hours: from eunice.yml
+    
+    config is an EuniceConfig or a CompiledConfig (assumptions are read
+    from the compiled form). keep the order of operations: it decides
+    the rounding of every reported cent
     """
+    compiled = config.compiled
     
     # review overhead (measured activity × config rate)
     monthly_review_hours = (commit_count_monthly * avg_review_time_minutes) / 60
-    monthly_review_cost = monthly_review_hours * config.dev_rate
+    annual_review_cost = (monthly_review_hours * compiled.dev_rate) * 12
     
     # bug fix cost (annualize measured window to match annualized review/ci metrics)
     if bug_hours_window_days <= 0:
         bug_hours_window_days = 30
-    annualized_bug_hours = bug_hours_tracked * (365 / bug_hours_window_days)
-    annual_bug_cost = annualized_bug_hours * config.dev_rate
+    annual_bug_cost = (bug_hours_tracked * (365 / bug_hours_window_days)) * compiled.dev_rate
     
     # ci failure debugging (measured failures × config estimate × rate)
-    monthly_ci_hours = ci_failure_count_monthly * config.avg_ci_failure_hours
-    monthly_ci_cost = monthly_ci_hours * config.dev_rate
+    monthly_ci_hours = ci_failure_count_monthly * compiled.avg_ci_failure_hours
+    annual_ci_cost = (monthly_ci_hours * compiled.dev_rate) * 12
     
     # totals
-    annual_cost = (
-        (monthly_review_cost * 12) +
-        annual_bug_cost +
-        (monthly_ci_cost * 12)
-    )
+    annual_cost = annual_review_cost + annual_bug_cost + annual_ci_cost
     
     return {
         'annual_cost_usd': round(annual_cost, 2),
         'breakdown_usd': {
-            'review_overhead': round(monthly_review_cost * 12, 2),
+            'review_overhead': round(annual_review_cost, 2),
             'bug_fixes': round(annual_bug_cost, 2),
-            'ci_failures': round(monthly_ci_cost * 12, 2)
+            'ci_failures': round(annual_ci_cost, 2)
         },
         'measured_inputs': {
             'commits_per_month': commit_count_monthly,
@@ -131,10 +335,10 @@ def calculate_annual_velocity_cost(
             'ci_failures_per_month': ci_failure_count_monthly
         },
         'assumptions_used': {
-            'dev_hourly_rate_usd': config.dev_rate,
-            'avg_ci_failure_debug_hours': config.avg_ci_failure_hours,
+            'dev_hourly_rate_usd': compiled.dev_rate,
+            'avg_ci_failure_debug_hours': compiled.avg_ci_failure_hours,
             'bug_hours_window_days': bug_hours_window_days,
-            'source': config.config['cost_assumptions']['source']
+            'source': compiled.cost_source
         }
     }
 
@@ -144,7 +348,7 @@ def calculate_time_savings_only(
     avg_review_time_minutes: float,
     bug_hours_tracked: float,
     ci_failure_count_monthly: int,
-    config: EuniceConfig,
+    config: Config,
     bug_hours_window_days: int = 30
 ) -> Dict:
     """
@@ -153,7 +357,7 @@ def calculate_time_savings_only(
     """
     
     monthly_review_hours = (commit_count_monthly * avg_review_time_minutes) / 60
-    monthly_ci_hours = ci_failure_count_monthly * config.avg_ci_failure_hours
+    monthly_ci_hours = ci_failure_count_monthly * config.compiled.avg_ci_failure_hours
     
     if bug_hours_window_days <= 0:
         bug_hours_window_days = 30
@@ -187,7 +391,7 @@ def calculate_time_savings_only(
 def calculate_carbon_footprint(
     avg_pipeline_duration_minutes: float,
     monthly_pipeline_count: int,
-    config: EuniceConfig
+    config: Config
 ) -> Dict:
     """
     calculate carbon footprint
@@ -201,10 +405,11 @@ def calculate_carbon_footprint(
     - co2_per_kwh: from grid region
     """
     
+    compiled = config.compiled
     monthly_compute_minutes = avg_pipeline_duration_minutes * monthly_pipeline_count
     
-    kwh_per_min = config.config['cost_assumptions']['kwh_per_compute_minute']
-    co2_per_kwh = config.config['cost_assumptions']['co2_per_kwh']
+    kwh_per_min = compiled.kwh_per_compute_minute
+    co2_per_kwh = compiled.co2_per_kwh
     
     monthly_kwh = monthly_compute_minutes * kwh_per_min
     monthly_co2_kg = monthly_kwh * co2_per_kwh
@@ -220,8 +425,8 @@ def calculate_carbon_footprint(
         'carbon_model_used': {
             'kwh_per_minute': kwh_per_min,
             'co2_per_kwh': co2_per_kwh,
-            'grid_region': config.config['cost_assumptions']['grid_region'],
-            'source': config.config['cost_assumptions']['source']
+            'grid_region': compiled.grid_region,
+            'source': compiled.cost_source
         },
         'note': 'carbon is modeled conversion, not direct measurement'
     }
@@ -230,11 +435,11 @@ def calculate_carbon_footprint(
 def calculate_roi(
     annual_savings: float,
     effort_hours: float,
-    config: EuniceConfig
+    config: Config
 ) -> Dict:
     """calculate return on investment"""
     
-    effort_cost = effort_hours * config.dev_rate
+    effort_cost = effort_hours * config.compiled.dev_rate
     roi = annual_savings / effort_cost if effort_cost > 0 else 0
     payback_days = (effort_cost / annual_savings * 365) if annual_savings > 0 else 999
     
@@ -248,7 +453,6 @@ def calculate_roi(
     }
 
 
-def estimate_fix_effort(lines_of_code: int, config: EuniceConfig) -> float:
+def estimate_fix_effort(lines_of_code: int, config: Config) -> float:
     """estimate fix effort based on lines of code"""
-    hours_per_100_loc = config.config['effort_assumptions']['avg_refactor_hours_per_100_loc']
-    return (lines_of_code / 100) * hours_per_100_loc
+    return (lines_of_code / 100) * config.compiled.refactor_hours_per_100_loc
@@ -1,20 +1,215 @@
 """fingerprint technical debt items for deduplication"""
 import hashlib
-from typing import List, Dict
+import re
+from bisect import bisect_left, bisect_right
+from pathlib import PurePosixPath
+from typing import List, Dict, Optional, Tuple
 
 
-def generate_fingerprint(finding: Dict) -> str:
+# polynomial rolling hash over per-line hashes, mod the mersenne prime 2^61 - 1
+_MOD = (1 << 61) - 1
+_BASE = 1_000_003
+
+_WHITESPACE = re.compile(r'\s+')
+
+# comment syntax by file extension: (line comment markers, has /* */ blocks).
+# a marker only counts in languages that use it - '#include', '*p = x;' and
+# '--i;' are code in c, and unknown extensions strip nothing
+_HASH = ('#',), False
+_SLASH = ('//',), True
+_DASH = ('--',), False
+_COMMENT_SYNTAX = {
+    **dict.fromkeys(('py', 'pyi', 'rb', 'sh', 'bash', 'zsh', 'pl', 'pm', 'r', 'yaml', 'yml',
+                     'toml', 'cfg', 'conf', 'tf', 'ps1', 'mk', 'dockerfile', 'makefile'), _HASH),
+    **dict.fromkeys(('c', 'h', 'cc', 'cpp', 'cxx', 'hpp', 'hh', 'm', 'mm', 'java', 'js', 'jsx',
+                     'mjs', 'cjs', 'ts', 'tsx', 'go', 'rs', 'swift', 'kt', 'kts', 'scala', 'cs',
+                     'dart', 'groovy', 'gradle', 'php'), _SLASH),
+    **dict.fromkeys(('lua', 'hs', 'ada', 'adb', 'ads'), _DASH),
+    'sql': (('--',), True),
+    'css': ((), True),
+    'scss': (('//',), True),
+    'less': (('//',), True),
+}
+_NO_COMMENTS = (), False
+
+
+def comment_syntax(path: Optional[str]) -> Tuple[Tuple[str, ...], bool]:
+    """(line comment markers, has /* */ blocks) for a file path"""
+    if not path:
+        return _NO_COMMENTS
+    name = PurePosixPath(path).name.lower()
+    extension = name.rpartition('.')[2] if '.' in name else name
+    return _COMMENT_SYNTAX.get(extension, _NO_COMMENTS)
+
+
+def normalize_line(line: str, line_comments: Tuple[str, ...] = ()) -> str:
+    """
+    line as the content fingerprint sees it: whitespace collapsed,
+    blank lines and lines starting with one of line_comments dropped
+    (returned as '')
+    """
+    line = _WHITESPACE.sub(' ', line).strip()
+    if not line or (line_comments and line.startswith(line_comments)):
+        return ''
+    return line
+
+
+def _normalize_source(source: str, path: Optional[str]):
+    """(1-based line number, normalized line) for every significant line"""
+    line_comments, block_comments = comment_syntax(path)
+    in_block = False
+
+    for number, line in enumerate(source.splitlines(), start=1):
+        if block_comments:
+            stripped = line.lstrip()
+            if in_block or stripped.startswith('/*'):
+                end = stripped.find('*/', 0 if in_block else 2)
+                in_block = end < 0
+                if in_block:
+                    continue
+                line = stripped[end + 2:]
+
+        normalized = normalize_line(line, line_comments)
+        if normalized:
+            yield number, normalized
+
+
+def _line_hash(line: str) -> int:
+    return int.from_bytes(hashlib.blake2b(line.encode(), digest_size=8).digest(), 'big') % _MOD
+
+
+def parse_lines(lines) -> Optional[Tuple[int, int]]:
+    """'45-120' / '45' / (45, 120) → (45, 120), 1-based and inclusive"""
+    if not lines and lines != 0:
+        return None
+    if isinstance(lines, (tuple, list)):
+        return int(lines[0]), int(lines[-1])
+
+    start, _, end = str(lines).partition('-')
+    return int(start), int(end or start)
+
+
+class SourceIndex:
+    """
+    rolling-hash index over one file's normalized lines
+
+    reality check: one pass hashes every significant line and keeps prefix
+    hashes, so the hash of any line range is O(1), and finding a block
+    again only checks the lines that start the same way. moving a block (lines
+    inserted above it, re-indentation, blank lines or comments inside it)
+    leaves its hash unchanged; editing a line of code inside it does not.
+    comments are recognised by path's extension (see comment_syntax).
+    """
+
+    def __init__(self, source: str, path: Optional[str] = None):
+        self.line_numbers: List[int] = []    # original 1-based line of each significant line
+        hashes = []
+
+        for number, normalized in _normalize_source(source, path):
+            self.line_numbers.append(number)
+            hashes.append(_line_hash(normalized))
+
+        # significant-line positions by line hash: candidate block starts
+        self._starts: Dict[int, List[int]] = {}
+        self._prefix = [0] * (len(hashes) + 1)
+        self._powers = [1] * (len(hashes) + 1)
+
+        for i, h in enumerate(hashes):
+            self._starts.setdefault(h, []).append(i)
+            self._prefix[i + 1] = (self._prefix[i] * _BASE + h) % _MOD
+            self._powers[i + 1] = (self._powers[i] * _BASE) % _MOD
+
+        self._line_hashes = hashes
+
+    def __len__(self) -> int:
+        return len(self.line_numbers)
+
+    def _hash(self, i: int, j: int) -> int:
+        return (self._prefix[j] - self._prefix[i] * self._powers[j - i]) % _MOD
+
+    def _matches(self, first_line_hash: int, content_hash: int, length: int) -> List[int]:
+        """start positions of every block with this content"""
+        return [
+            i for i in self._starts.get(first_line_hash, ())
+            if i + length <= len(self) and self._hash(i, i + length) == content_hash
+        ]
+
+    def anchor(self, start_line: int, end_line: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        (content hash, first line hash, significant line count, occurrence)
+        of a line range
+
+        occurrence tells identical blocks in the same file apart
+        """
+        i = bisect_left(self.line_numbers, start_line)
+        j = bisect_right(self.line_numbers, end_line)
+        if i >= j:
+            return None
+
+        content_hash = self._hash(i, j)
+        first_line_hash = self._line_hashes[i]
+        occurrence = self._matches(first_line_hash, content_hash, j - i).index(i)
+        return content_hash, first_line_hash, j - i, occurrence
+
+    def locate(self, content_hash: int, first_line_hash: int, length: int, occurrence: int = 0) -> Optional[Tuple[int, int]]:
+        """current (start, end) lines of an anchored block, or None if its content changed"""
+        positions = self._matches(first_line_hash, content_hash, length)
+        if not positions:
+            return None
+
+        i = positions[min(occurrence, len(positions) - 1)]
+        return self.line_numbers[i], self.line_numbers[i + length - 1]
+
+
+def content_anchor(finding: Dict, source_index: Optional[SourceIndex] = None) -> Optional[str]:
+    """
+    hex content hash for a finding: from its 'snippet' if it has one,
+    otherwise from its line range in source_index
+    """
+    if finding.get('snippet'):
+        index = SourceIndex(finding['snippet'], finding.get('file'))
+        anchor = index.anchor(1, index.line_numbers[-1]) if len(index) else None
+    elif source_index is not None and parse_lines(finding.get('lines')):
+        anchor = source_index.anchor(*parse_lines(finding['lines']))
+    else:
+        return None
+
+    if anchor is None:
+        return None
+    return '{:016x}:{:016x}:{}:{}'.format(*anchor)
+
+
+def generate_fingerprint(finding: Dict, mode: str = 'lines', source_index: Optional[SourceIndex] = None) -> str:
     """
     create stable fingerprint for debt item
     
     reuses gitlab code quality fingerprint when available
     otherwise creates from file + location + rule
+    
+    mode='content' anchors on the normalized code instead of line numbers,
+    so a finding keeps its fingerprint when lines are added above it.
+    needs a 'snippet' on the finding or the file's SourceIndex; falls
+    back to line numbers when neither is there.
     """
     
     if finding.get('code_quality_fingerprint'):
         # reuse gitlab's fingerprint
         return finding['code_quality_fingerprint']
     
+    if mode == 'content':
+        anchor = finding.get('content_anchor') or content_anchor(finding, source_index)
+        if anchor:
+            components = [
+                finding.get('type', ''),
+                finding.get('file', ''),
+                anchor,
+                finding.get('rule_id', '')
+            ]
+            fingerprint_string = '|'.join(str(c) for c in components)
+            return hashlib.sha256(fingerprint_string.encode()).hexdigest()[:16]
+    elif mode != 'lines':
+        raise ValueError(f'unknown fingerprint mode: {mode!r}')
+    
     # create our own
     components = [
         finding.get('type', ''),           # e.g. "high_complexity"
@@ -27,16 +222,75 @@ def generate_fingerprint(finding: Dict) -> str:
     return hashlib.sha256(fingerprint_string.encode()).hexdigest()[:16]
 
 
-def deduplicate_findings(findings: List[Dict]) -> List[Dict]:
-    """remove duplicate findings based on fingerprint"""
+def _source_indexes(findings: List[Dict], sources: Optional[Dict[str, str]]) -> Dict[str, SourceIndex]:
+    """one SourceIndex per file that has findings"""
+    if not sources:
+        return {}
+    files = {f.get('file') for f in findings}
+    return {path: SourceIndex(sources[path], path) for path in files if path in sources}
+
+
+def deduplicate_findings(findings: List[Dict], mode: str = 'lines', sources: Optional[Dict[str, str]] = None) -> List[Dict]:
+    """
+    remove duplicate findings based on fingerprint
+    
+    returns copies with a 'fingerprint' key - the input dicts are left untouched
+    sources (path → file contents) feed mode='content'
+    """
+    indexes = _source_indexes(findings, sources)
     seen = set()
     unique = []
     
     for finding in findings:
-        fp = generate_fingerprint(finding)
+        fp = generate_fingerprint(finding, mode, indexes.get(finding.get('file')))
         if fp not in seen:
             seen.add(fp)
-            finding['fingerprint'] = fp
-            unique.append(finding)
+            unique.append(dict(finding, fingerprint=fp))
     
     return unique
+
+
+def anchor_findings(findings: List[Dict], sources: Dict[str, str]) -> List[Dict]:
+    """
+    copies of findings with a 'content_anchor' and content fingerprint,
+    for storing alongside an audit so the next one can reanchor them
+    """
+    indexes = _source_indexes(findings, sources)
+    anchored = []
+    
+    for finding in findings:
+        anchor = content_anchor(finding, indexes.get(finding.get('file')))
+        finding = dict(finding, content_anchor=anchor) if anchor else dict(finding)
+        finding['fingerprint'] = generate_fingerprint(finding, 'content')
+        anchored.append(finding)
+    
+    return anchored
+
+
+def reanchor_findings(findings: List[Dict], sources: Dict[str, str]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    split a previous audit's anchored findings into (unchanged, changed)
+
+    unchanged findings still match their code somewhere in the current
+    file - they come back with updated 'lines' and the same fingerprint,
+    and need no re-evaluation. changed findings (code edited, file gone,
+    or never anchored) are the only ones an audit has to look at again.
+    """
+    indexes = _source_indexes(findings, sources)
+    unchanged, changed = [], []
+    
+    for finding in findings:
+        index = indexes.get(finding.get('file'))
+        anchor = finding.get('content_anchor')
+        
+        location = None
+        if index is not None and anchor:
+            content_hash, first_line_hash, length, occurrence = anchor.split(':')
+            location = index.locate(int(content_hash, 16), int(first_line_hash, 16), int(length), int(occurrence))
+        
+        if location is None:
+            changed.append(finding)
+        else:
+            unchanged.append(dict(finding, lines=f'{location[0]}-{location[1]}'))
+    
+    return unchanged, changed
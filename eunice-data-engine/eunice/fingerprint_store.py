@@ -0,0 +1,228 @@
+"""persistent fingerprint index - tell new, recurring and resolved debt apart across audits"""
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .fingerprint import generate_fingerprint
+
+
+DEFAULT_STORE_PATH = '.eunice/cache/fingerprints.sqlite'
+
+
+class FingerprintStore:
+    """
+    sqlite-backed first-seen / last-seen index keyed by generate_fingerprint
+
+    reality check: every audit is a numbered run. a fingerprint keeps the
+    run it first appeared in and the last run it was seen in, both
+    indexed, so "new since run X" and "resolved since run X" are range
+    scans rather than set differences over whole audits. presence in a
+    given run is its own (fingerprint, run) row, so a finding that goes
+    away and comes back is not counted as present in the runs it missed.
+    "latest" means the latest run that was actually upserted - a run that
+    has started but not recorded anything yet does not resolve everything.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, store_findings: bool = True):
+        self.path = path
+        self.store_findings = store_findings
+
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT UNIQUE NOT NULL,
+                started_at TEXT NOT NULL,
+                upserted_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                fingerprint TEXT PRIMARY KEY,
+                first_seq INTEGER NOT NULL,
+                last_seq INTEGER NOT NULL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                finding TEXT
+            );
+            CREATE INDEX IF NOT EXISTS fingerprints_first ON fingerprints (first_seq);
+            CREATE INDEX IF NOT EXISTS fingerprints_last ON fingerprints (last_seq);
+        """)
+
+        # stores written before per-run presence existed: every run counts as
+        # upserted and presence is the old first..last range
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(runs)')}
+        if 'upserted_at' not in columns:
+            self._db.execute('ALTER TABLE runs ADD COLUMN upserted_at TEXT')
+            self._db.execute('UPDATE runs SET upserted_at = started_at')
+
+        has_sightings = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sightings'"
+        ).fetchone()
+        if not has_sightings:
+            self._db.execute("""
+                CREATE TABLE sightings (
+                    fingerprint TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    PRIMARY KEY (seq, fingerprint)
+                ) WITHOUT ROWID
+            """)
+            self._db.execute("""
+                INSERT INTO sightings
+                SELECT f.fingerprint, r.seq FROM fingerprints f
+                JOIN runs r ON r.seq BETWEEN f.first_seq AND f.last_seq
+            """)
+        self._db.commit()
+
+    def start_run(self, run_id: Optional[str] = None) -> str:
+        """register a new audit run; returns its id"""
+        run_id = run_id or uuid.uuid4().hex[:12]
+
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO runs (run_id, started_at) VALUES (?, ?)',
+                (run_id, datetime.now().isoformat())
+            )
+            self._db.commit()
+
+        return run_id
+
+    def _seq(self, run_id: str) -> int:
+        row = self._db.execute('SELECT seq FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f'unknown audit run: {run_id}')
+        return row[0]
+
+    def _latest_seq(self) -> int:
+        """newest run that has recorded its findings"""
+        return self._db.execute(
+            'SELECT COALESCE(MAX(seq), 0) FROM runs WHERE upserted_at IS NOT NULL'
+        ).fetchone()[0]
+
+    def upsert(self, run_id: str, findings: Iterable[Dict]) -> Dict:
+        """
+        record every finding seen in a run (one transaction)
+
+        findings without a 'fingerprint' key are fingerprinted here;
+        the input dicts are not modified. runs may be upserted out of
+        order - first/last sighting only ever widen
+        """
+        with self._lock:
+            seq = self._seq(run_id)
+            seen_at = datetime.now().isoformat()
+
+            rows = [
+                (
+                    finding.get('fingerprint') or generate_fingerprint(finding),
+                    seq,
+                    seq,
+                    seen_at,
+                    seen_at,
+                    json.dumps(finding, default=str) if self.store_findings else None
+                )
+                for finding in findings
+            ]
+
+            self._db.executemany("""
+                INSERT INTO fingerprints VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (fingerprint) DO UPDATE SET
+                    first_seen = CASE WHEN excluded.first_seq < first_seq
+                        THEN excluded.first_seen ELSE first_seen END,
+                    last_seen = CASE WHEN excluded.last_seq >= last_seq
+                        THEN excluded.last_seen ELSE last_seen END,
+                    finding = CASE WHEN excluded.last_seq >= last_seq
+                        THEN COALESCE(excluded.finding, finding) ELSE finding END,
+                    first_seq = MIN(first_seq, excluded.first_seq),
+                    last_seq = MAX(last_seq, excluded.last_seq)
+            """, rows)
+            self._db.executemany(
+                'INSERT OR IGNORE INTO sightings VALUES (?, ?)',
+                ((row[0], seq) for row in rows)
+            )
+            self._db.execute('UPDATE runs SET upserted_at = ? WHERE seq = ?', (seen_at, seq))
+            self._db.commit()
+
+            new, seen = self._db.execute("""
+                SELECT
+                    COALESCE(SUM(f.first_seq = s.seq), 0),
+                    COUNT(*)
+                FROM sightings s JOIN fingerprints f USING (fingerprint)
+                WHERE s.seq = ?
+            """, (seq,)).fetchone()
+
+        return {'run_id': run_id, 'seen': seen, 'new': new, 'recurring': seen - new}
+
+    def new_since(self, run_id: str) -> List[str]:
+        """fingerprints first seen after run X"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT fingerprint FROM fingerprints WHERE first_seq > ?',
+                (self._seq(run_id),)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def resolved_since(self, run_id: str) -> List[str]:
+        """fingerprints present in run X (or later) but missing from the latest upserted run"""
+        with self._lock:
+            seq = self._seq(run_id)
+            rows = self._db.execute(
+                'SELECT fingerprint FROM fingerprints WHERE last_seq >= ? AND last_seq < ?',
+                (seq, self._latest_seq())
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def diff(self, previous_run: str, current_run: str) -> Dict[str, List[str]]:
+        """new / recurring / resolved fingerprints between two runs"""
+        with self._lock:
+            prev, cur = self._seq(previous_run), self._seq(current_run)
+            rows = self._db.execute("""
+                SELECT fingerprint, MAX(seq = ?), MAX(seq = ?) FROM sightings
+                WHERE seq IN (?, ?)
+                GROUP BY fingerprint
+            """, (prev, cur, prev, cur)).fetchall()
+
+        result = {'new': [], 'recurring': [], 'resolved': []}
+        for fingerprint, in_prev, in_cur in rows:
+
+            if in_cur and not in_prev:
+                result['new'].append(fingerprint)
+            elif in_cur:
+                result['recurring'].append(fingerprint)
+            elif in_prev:
+                result['resolved'].append(fingerprint)
+
+        return result
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """first/last sighting of one fingerprint"""
+        with self._lock:
+            row = self._db.execute("""
+                SELECT f.fingerprint, f.first_seen, f.last_seen, a.run_id, b.run_id, f.finding
+                FROM fingerprints f
+                JOIN runs a ON a.seq = f.first_seq
+                JOIN runs b ON b.seq = f.last_seq
+                WHERE f.fingerprint = ?
+            """, (fingerprint,)).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'fingerprint': row[0],
+            'first_seen': row[1],
+            'last_seen': row[2],
+            'first_run': row[3],
+            'last_run': row[4],
+            'finding': json.loads(row[5]) if row[5] else None
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,337 @@
+"""local git history analyzer - churn, authors, co-change coupling and loc from one `git log` pass"""
+import heapq
+import math
+import os
+import subprocess
+import time
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .cost_calculator import Config, estimate_fix_effort
+
+
+# largest commit counted for coupling: mass renames, reformats and vendor
+# drops touch everything at once and say nothing about design coupling
+DEFAULT_MAX_CHANGESET_FILES = 30
+
+_COMMIT = b'\x1e'
+_FIELD = b'\x1f'
+_FORMAT = '--format=%x1e%H%x1f%at%x1f%aE'
+_READ_SIZE = 1 << 16
+
+
+class FileChange(NamedTuple):
+    added: int
+    deleted: int
+    path: str
+    old_path: Optional[str]  # set on renames
+
+
+class GitCommit(NamedTuple):
+    sha: str
+    timestamp: int  # author time, unix seconds
+    author: str
+    changes: List[FileChange]
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode('utf-8', 'surrogateescape')
+
+
+def iter_numstat(
+    repo_path: str = '.',
+    since: Optional[float] = None,
+    rev: str = 'HEAD'
+) -> Iterator[GitCommit]:
+    """
+    stream `git log --numstat` as commits, newest first
+
+    reality check: -z output is read in 64 KiB chunks and split on nul, so
+    a monorepo's history never sits in memory as one string and paths
+    with spaces, tabs or non-utf8 bytes come through unquoted. binary
+    files (numstat `-`) are skipped - they have no line counts.
+    """
+    command = ['git', '-C', repo_path, 'log', '--no-merges', '-M', '--numstat', '-z', _FORMAT]
+    if since is not None:
+        command.append(f'--since=@{int(since)}')
+    command += [rev, '--']
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    commit: Optional[GitCommit] = None
+    rename: Optional[Tuple[int, int, bool]] = None  # added, deleted, binary - waiting for old\0new
+    rename_from: Optional[str] = None
+    pending = b''
+
+    try:
+        while True:
+            chunk = process.stdout.read(_READ_SIZE)
+            if not chunk:
+                break
+
+            tokens = (pending + chunk).split(b'\0')
+            pending = tokens.pop()
+
+            for token in tokens:
+                if rename is not None:
+                    # rename entries are `added\tdeleted\t\0old\0new\0`
+                    if rename_from is None:
+                        rename_from = _decode(token)
+                    else:
+                        added, deleted, binary = rename
+                        if not binary:
+                            commit.changes.append(FileChange(added, deleted, _decode(token), rename_from))
+                        rename = rename_from = None
+                    continue
+
+                if token.startswith(_COMMIT):
+                    if commit is not None:
+                        yield commit
+                    sha, timestamp, author = token[1:].split(_FIELD)
+                    commit = GitCommit(sha.decode(), int(timestamp), _decode(author).lower(), [])
+                    continue
+
+                # the first numstat line of a commit starts after a newline
+                added, deleted, path = token.lstrip(b'\n').split(b'\t', 2)
+                binary = added == b'-'
+                if not path:
+                    rename = (0, 0, True) if binary else (int(added), int(deleted), False)
+                    continue
+                if binary:
+                    continue
+                commit.changes.append(FileChange(int(added), int(deleted), _decode(path), None))
+
+        if commit is not None:
+            yield commit
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise RuntimeError(f'git log failed in {repo_path}: {_decode(stderr).strip()}')
+
+
+def count_lines(file_path: str) -> Optional[int]:
+    """lines in a file on disk, or None if it is missing or binary"""
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if b'\0' in data[:8192]:
+        return None
+    return data.count(b'\n') + (1 if data and not data.endswith(b'\n') else 0)
+
+
+class GitHistory:
+    """
+    per-file change statistics for a local clone over a time window
+
+    reality check: the weekly audit used to find high-churn files by
+    asking the gitlab api about every file. a local clone already has the
+    answer: one `git log --numstat` pass gives commits, lines churned,
+    distinct authors and co-change coupling for every file at once, and
+    the working tree gives real lines of code. the api is then only needed
+    for the top files (reviews, bug hours, pipelines).
+
+    paths are interned to integer ids and per-file counters live in typed
+    arrays indexed by id. renames are followed: older commits to the old
+    path count toward the file's current name.
+    """
+
+    def __init__(self, repo_path: str = '.', since: Optional[float] = None,
+                 max_changeset_files: int = DEFAULT_MAX_CHANGESET_FILES):
+        self.repo_path = repo_path
+        self.since = since
+        self.oldest_commit_at: Optional[int] = None
+        self.max_changeset_files = max_changeset_files
+        self.commit_count = 0
+
+        self.paths: List[str] = []          # file id → current path
+        self._ids: Dict[str, int] = {}      # current path → file id
+        self._renamed: Dict[str, int] = {}  # old path → file id, for older commits
+        self._authors: Dict[str, int] = {}  # author email → author id
+
+        # per file id
+        self.commits = array('l')
+        self.added = array('q')
+        self.deleted = array('q')
+        self.last_commit_at = array('q')
+        self.file_authors: List[set] = []          # author ids
+        self.coupling: List[Dict[int, int]] = []   # other file id → shared commits
+        self.lines_of_code: Dict[str, int] = {}
+
+    @classmethod
+    def analyze(
+        cls,
+        repo_path: str = '.',
+        since_days: Optional[float] = 30,
+        rev: str = 'HEAD',
+        max_changeset_files: int = DEFAULT_MAX_CHANGESET_FILES,
+        count_loc: bool = True
+    ) -> 'GitHistory':
+        """read the window's history and (by default) count lines of the files still present"""
+        since = time.time() - since_days * 86400 if since_days else None
+        history = cls(repo_path, since, max_changeset_files)
+
+        for commit in iter_numstat(repo_path, since, rev):
+            history.add_commit(commit)
+
+        if count_loc:
+            history.count_loc()
+        return history
+
+    def _file_id(self, path: str) -> int:
+        file_id = self._renamed.get(path)
+        if file_id is None:
+            file_id = self._ids.get(path)
+        if file_id is None:
+            file_id = len(self.paths)
+            self._ids[path] = file_id
+            self.paths.append(path)
+            self.commits.append(0)
+            self.added.append(0)
+            self.deleted.append(0)
+            self.last_commit_at.append(0)
+            self.file_authors.append(set())
+            self.coupling.append({})
+        return file_id
+
+    def add_commit(self, commit: GitCommit):
+        """fold one commit in - commits must arrive newest first, like git log"""
+        self.commit_count += 1
+        self.oldest_commit_at = commit.timestamp
+
+        author = self._authors.setdefault(commit.author, len(self._authors))
+        touched = set()
+
+        for change in commit.changes:
+            file_id = self._file_id(change.path)
+            if change.old_path is not None:
+                # walking backwards: before this commit the file had its old name
+                self._renamed[change.old_path] = file_id
+            if file_id in touched:
+                continue
+            touched.add(file_id)
+
+            self.commits[file_id] += 1
+            self.added[file_id] += change.added
+            self.deleted[file_id] += change.deleted
+            if not self.last_commit_at[file_id]:
+                self.last_commit_at[file_id] = commit.timestamp
+            self.file_authors[file_id].add(author)
+
+        if 1 < len(touched) <= self.max_changeset_files:
+            for file_id in touched:
+                neighbours = self.coupling[file_id]
+                for other in touched:
+                    if other != file_id:
+                        neighbours[other] = neighbours.get(other, 0) + 1
+
+    def count_loc(self):
+        """lines of code for every changed file that still exists in the working tree"""
+        for path in self.paths:
+            lines = count_lines(os.path.join(self.repo_path, path))
+            if lines is not None:
+                self.lines_of_code[path] = lines
+
+    @property
+    def window_days(self) -> float:
+        """length of the window; without a since, the span back to the oldest commit"""
+        start = self.since if self.since is not None else self.oldest_commit_at
+        if start is None:
+            return 30.0
+        return max((time.time() - start) / 86400, 1.0)
+
+    def file_stats(self, path: str) -> Optional[Dict]:
+        """churn statistics for one file (current path), or None if untouched in the window"""
+        file_id = self._ids.get(path)
+        if file_id is None:
+            return None
+
+        per_month = 30 / self.window_days
+        return {
+            'file': path,
+            'commits': self.commits[file_id],
+            'commits_monthly': round(self.commits[file_id] * per_month, 2),
+            'lines_added': self.added[file_id],
+            'lines_deleted': self.deleted[file_id],
+            'churn': self.added[file_id] + self.deleted[file_id],
+            'authors': len(self.file_authors[file_id]),
+            'last_commit_at': self.last_commit_at[file_id],
+            'lines_of_code': self.lines_of_code.get(path)
+        }
+
+    def coupled_files(self, path: str, min_shared: int = 2, limit: int = 10) -> List[Dict]:
+        """
+        files that change together with `path`, strongest first
+
+        degree is shared commits over the pair's average commit count
+        (1.0 = they always change together)
+        """
+        file_id = self._ids.get(path)
+        if file_id is None:
+            return []
+
+        pairs = [
+            (shared / ((self.commits[file_id] + self.commits[other]) / 2), shared, other)
+            for other, shared in self.coupling[file_id].items()
+            if shared >= min_shared
+        ]
+
+        return [
+            {'file': self.paths[other], 'shared_commits': shared, 'degree': round(degree, 3)}
+            for degree, shared, other in heapq.nlargest(limit, pairs)
+        ]
+
+    def hotspots(self, k: int = 20, config: Optional[Config] = None, min_commits: int = 1) -> List[Dict]:
+        """
+        top k files by hotspot score, with fix effort from real loc
+
+        reality check: a hotspot is code that is both big and changed
+        often - the score is the geometric mean of change frequency and
+        size, each relative to the repo's maximum, scaled to 0-10. only
+        files that still exist as text are ranked.
+        """
+        candidates = [
+            (file_id, self.lines_of_code[path])
+            for file_id, path in enumerate(self.paths)
+            if self.commits[file_id] >= min_commits and self.lines_of_code.get(path)
+        ]
+        if not candidates:
+            return []
+
+        max_commits = max(self.commits[file_id] for file_id, _ in candidates)
+        max_loc = max(loc for _, loc in candidates)
+
+        def score(candidate) -> float:
+            file_id, loc = candidate
+            return 10 * math.sqrt(self.commits[file_id] / max_commits * loc / max_loc)
+
+        top = heapq.nlargest(k, candidates, key=score)
+
+        rows = []
+        for candidate in top:
+            row = self.file_stats(self.paths[candidate[0]])
+            row['hotspot_score'] = round(score(candidate), 2)
+            if config is not None:
+                row['effort_hours'] = round(estimate_fix_effort(row['lines_of_code'], config), 2)
+            rows.append(row)
+        return rows
+
+    def to_dict(self, k: int = 20, config: Optional[Config] = None, coupled: int = 3) -> Dict:
+        """summary for reports: window, totals and the top hotspots with their coupled files"""
+        hotspots = self.hotspots(k, config)
+        for row in hotspots:
+            row['coupled_files'] = self.coupled_files(row['file'], limit=coupled)
+
+        return {
+            'repo_path': self.repo_path,
+            'window_days': round(self.window_days, 1),
+            'commits': self.commit_count,
+            'files_changed': len(self.paths),
+            'authors': len(self._authors),
+            'hotspots': hotspots
+        }
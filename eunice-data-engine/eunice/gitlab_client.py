@@ -1,42 +1,188 @@
 """gitlab api client for eunice - real data extraction with rate limiting"""
 import gitlab
+import os
+import tempfile
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import time
+from itertools import islice
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cache import (
+    FAILED_PIPELINE_STATUSES,
+    FINISHED_PIPELINE_TTL_SECONDS,
+    FULL_RELIST_INTERVAL,
+    INCREMENTAL_TTL_SECONDS,
+    TERMINAL_PIPELINE_STATUSES,
+    WATERMARK_OVERLAP,
+    ResponseCache
+)
+from .code_quality import CODE_QUALITY_REPORT, CodeQualityIndex, parse_code_quality_report
+from .commit_index import CommitIndex, as_aware, commit_date, parse_gitlab_datetime
+from .instrumentation import Instrumentation, instrumented
+from .issue_index import BugIssueIndex
+from .rate_limit import TokenBucket
+from .transport import Transport
+from .records import (
+    CommitRecord,
+    IssueRecord,
+    MergeRequestRecord,
+    PipelineRecord,
+    issue_time_stats,
+    pipeline_attrs
+)
+
+
+def _restore(manager, attrs: Dict):
+    """rebuild a python-gitlab object from cached attributes (no api call)"""
+    return manager._obj_cls(manager, attrs)
+
+
+class _Gitlab(gitlab.Gitlab):
+    """
+    python-gitlab without its own retry loop
+
+    reality check: python-gitlab retries every 429 up to 10 times by
+    default, on top of the Transport's retries, so one throttled request
+    could be sent (retries + 1) * 11 times. here the Transport is the only
+    one that retries
+    """
+    
+    def http_request(self, *args, **kwargs):
+        kwargs.setdefault('obey_rate_limit', False)
+        kwargs.setdefault('retry_transient_errors', False)
+        kwargs.setdefault('max_retries', 0)
+        return super().http_request(*args, **kwargs)
+
+
+class GitLabRecord(SimpleNamespace):
+    """attribute access over a gitlab json object, like python-gitlab's RESTObject"""
+    
+    @property
+    def attributes(self) -> Dict:
+        return dict(vars(self))
 
 
 class EuniceGitLabClient:
     """wrapper around python-gitlab with eunice-specific methods"""
     
-    def __init__(self, url: str, token: str):
-        self.gl = gitlab.Gitlab(url, private_token=token)
-        self.rate_limit_window = []
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        transport: Optional[Transport] = None
+    ):
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.cache = cache
+        # per-method / per-endpoint timings, rate limit sleeps, retries,
+        # dropped items, cache hit ratios
+        self.instrumentation = instrumentation or Instrumentation()
+        self.instrumentation.track_cache(cache)
         
-    def get_file_commits(self, project_id: str, file_path: str, since_days: int = 30) -> List:
+        # pooled keep-alive connections, timeouts, jittered retries on
+        # 429/5xx - every resend takes a rate limit token like a first send
+        self.transport = transport or Transport()
+        session = self.transport.session(
+            on_response=self._on_response,
+            before_retry=self._check_rate_limit,
+            on_retry=self.instrumentation.record_retry
+        )
+        self.gl = _Gitlab(url, private_token=token, session=session, timeout=self.transport.timeout)
+        
+        # let gitlab's RateLimit-* / Retry-After headers steer the bucket
+        # (and record every response for the instrumentation)
+        session.hooks['response'].append(self._on_response)
+        self._commit_indexes: Dict[str, CommitIndex] = {}
+        self._bug_issue_indexes: Dict[str, BugIssueIndex] = {}
+        self._projects: Dict[str, object] = {}
+    
+    def _get_project(self, project_id: str):
         """
-        get commits touching a specific file
+        project handle for sub-resource queries
         
-        reality check: paginated, rate limited
+        reality check: commits/mrs/pipelines only need the project id in the
+        url, so a lazy object saves a projects.get round trip per call
         """
-        project = self.gl.projects.get(project_id)
+        key = str(project_id)
+        if key not in self._projects:
+            self._projects[key] = self.gl.projects.get(project_id, lazy=True)
+        return self._projects[key]
+    
+    @instrumented
+    def build_commit_index(self, project_id: str, since_days: int = 30) -> CommitIndex:
+        """
+        fetch every commit in the window once, with diff stats and changed paths
+        
+        reality check: O(commits) api calls instead of O(files × pages).
+        once built, get_file_commits / get_mrs_with_file_changes /
+        get_pipelines_touching_file answer from the index for any window
+        it covers. commits whose diff could not be fetched are recorded as
+        failed, and a window holding one is not covered.
+        """
+        project = self._get_project(project_id)
         since = datetime.now() - timedelta(days=since_days)
+        index = CommitIndex(project_id, since)
         
+        commits = self._list_commits(
+            project,
+            since,
+            cache_key=f'commits:{project_id}',
+            with_stats=True
+        )
+        
+        for commit in commits:
+            paths = self._commit_paths(project_id, commit)
+            
+            if paths is None:
+                index.add_failed(commit)
+                continue
+            
+            index.add(commit, paths)
+        
+        # gitlab pagination limit - index is only complete back to oldest commit
+        if len(commits) >= 100 * 100:
+            index.truncate_to(commit_date(commits[-1]))
+        
+        self._commit_indexes[str(project_id)] = index
+        return index
+    
+    @instrumented
+    def _list_commits(self, project, since: datetime, cache_key: str, **filters) -> List:
+        """
+        page through commits.list, refreshing incrementally from the cache
+        
+        reality check: commits never change, so a cached list only needs
+        what was pushed after its watermark (minus an overlap for late pushes)
+        - as long as it reaches back to since. a longer window than the
+        cached one is fetched in full, and so is the cached one every
+        FULL_RELIST_INTERVAL, for commits merged long after they were made
+        """
+        cached, fetch_since, covered = self._cached_range(cache_key, since)
+        
+        refreshed_at = datetime.now()
+        if cached is not None:
+            relisted = self.cache.get_watermark(f'{cache_key}:relisted')
+            if relisted is None or datetime.fromisoformat(relisted) <= refreshed_at - FULL_RELIST_INTERVAL:
+                fetch_since = covered
         commits = []
         page = 1
         
         while True:
             self._check_rate_limit()
             
+            # query_parameters: python-gitlab treats a path= kwarg as the url path
             batch = project.commits.list(
-                path=file_path,
-                since=since.isoformat(),
+                query_parameters=dict(filters, since=fetch_since.isoformat()),
                 page=page,
                 per_page=100  # max allowed
             )
             
             if not batch:
                 break
-                
+            
             commits.extend(batch)
             page += 1
             
@@ -44,8 +190,187 @@ class EuniceGitLabClient:
             if page > 100:
                 break
         
-        return commits
+        if self.cache is None:
+            return commits
+        
+        fetched = {c.id for c in commits}
+        commits.extend(
+            _restore(project.commits, attrs)
+            for attrs in (cached or [])
+            if attrs['id'] not in fetched
+        )
+        
+        # keep what the cache covers, answer the window asked for
+        kept = as_aware(covered)
+        commits = [c for c in commits if commit_date(c) >= kept]
+        self._store_range(cache_key, [c.attributes for c in commits], refreshed_at, covered)
+        if fetch_since <= covered:
+            self.cache.set_watermark(f'{cache_key}:relisted', refreshed_at.isoformat())
+        
+        cutoff = as_aware(since)
+        return [c for c in commits if commit_date(c) >= cutoff]
+    
+    def _cached_range(self, key: str, since: datetime) -> Tuple[Optional[Any], datetime, datetime]:
+        """
+        (cached value or None, fetch from, range the cache will cover) for an
+        incremental list
+        
+        the cached value is only used when the range it covers (stored next
+        to its watermark) reaches back to since; otherwise everything since
+        since is fetched again and that becomes the covered range
+        """
+        if self.cache is None:
+            return None, since, since
+        
+        watermark = self.cache.get_watermark(key)
+        covered = self.cache.get_watermark(f'{key}:since')
+        if watermark and covered and datetime.fromisoformat(covered) <= since:
+            cached = self.cache.get(key)
+            if cached is not None:
+                fetch_since = max(since, datetime.fromisoformat(watermark) - WATERMARK_OVERLAP)
+                return cached, fetch_since, datetime.fromisoformat(covered)
+        
+        return None, since, since
+    
+    def _store_range(self, key: str, value, refreshed_at: datetime, covered: datetime):
+        self.cache.set(key, value, ttl_seconds=INCREMENTAL_TTL_SECONDS)
+        self.cache.set_watermark(key, refreshed_at.isoformat())
+        self.cache.set_watermark(f'{key}:since', covered.isoformat())
+    
+    def _commit_paths(self, project_id: str, commit) -> Optional[List[str]]:
+        """paths changed by a commit (old and new on renames); diffs are immutable"""
+        key = f'commit_paths:{project_id}:{commit.id}'
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        self._check_rate_limit()
+        
+        try:
+            diffs = commit.diff(all=True)
+        except Exception as e:
+            self._dropped('commit_paths', e)
+            return None
+        
+        paths = []
+        for diff in diffs:
+            paths.append(diff.get('new_path'))
+            paths.append(diff.get('old_path'))
+        
+        if self.cache is not None:
+            self.cache.set(key, paths, immutable=True)
+        
+        return paths
+    
+    def _indexed_commits(self, project_id: str, file_path: str, since_days: int) -> Optional[List]:
+        """answer a per-file commit query from the index, or None if not covered"""
+        index = self._commit_indexes.get(str(project_id))
+        if index is None:
+            return None
+        
+        since = datetime.now() - timedelta(days=since_days)
+        if not index.covers(since):
+            return None
+        
+        return index.commits_for(file_path, since)
+    
+    @instrumented
+    def get_file_commits(self, project_id: str, file_path: str, since_days: int = 30) -> List:
+        """
+        get commits touching a specific file
+        
+        reality check: paginated, rate limited. served from the commit
+        index when one covering the window has been built
+        """
+        indexed = self._indexed_commits(project_id, file_path, since_days)
+        if indexed is not None:
+            return indexed
+        
+        project = self._get_project(project_id)
+        since = datetime.now() - timedelta(days=since_days)
+        
+        return self._list_commits(
+            project,
+            since,
+            cache_key=f'file_commits:{project_id}:{file_path}',
+            path=file_path
+        )
+    
+    def _stream(self, listing, limit: Optional[int] = 100 * 100) -> Iterator:
+        """
+        yield objects from a lazy python-gitlab list (iterator=True)
+        
+        reality check: one rate limit token per page of 100, same
+        10k-row cap as the paginated loops (limit=None: no cap)
+        """
+        for i, obj in enumerate(islice(listing, limit)):
+            if i % 100 == 99:
+                self._check_rate_limit()
+            yield obj
+    
+    @instrumented
+    def iter_file_commits(self, project_id: str, file_path: str, since_days: int = 30) -> Iterator[CommitRecord]:
+        """
+        stream commits touching a file as compact records
+        
+        reality check: get_file_commits keeps up to 10k RESTObjects alive;
+        this holds one page at a time and keeps only id/dates per commit
+        """
+        indexed = self._indexed_commits(project_id, file_path, since_days)
+        if indexed is not None or self.cache is not None:
+            # already materialized by the index / incremental cache
+            commits = indexed if indexed is not None else self.get_file_commits(project_id, file_path, since_days)
+            for commit in commits:
+                yield CommitRecord.from_object(commit)
+            return
+        
+        project = self._get_project(project_id)
+        since = datetime.now() - timedelta(days=since_days)
+        
+        self._check_rate_limit()
+        listing = project.commits.list(
+            query_parameters={'path': file_path, 'since': since.isoformat()},
+            per_page=100,
+            iterator=True
+        )
+        
+        for commit in self._stream(listing):
+            yield CommitRecord.from_object(commit)
     
+    @instrumented
+    def iter_mrs_with_file_changes(
+        self,
+        project_id: str,
+        file_path: str,
+        since_days: int = 30
+    ) -> Iterator[MergeRequestRecord]:
+        """stream merged mrs that modified a file as compact records"""
+        project = self._get_project(project_id)
+        seen = set()
+        
+        for commit in self.iter_file_commits(project_id, file_path, since_days):
+            try:
+                merged = self._merged_mr_iids(project, project_id, commit.id)
+            except Exception as e:
+                # fallback: skip this commit
+                self._dropped('commit_mrs', e)
+                continue
+            
+            for mr_iid in merged:
+                if mr_iid in seen:
+                    continue
+                seen.add(mr_iid)
+                
+                try:
+                    mr = self._get_mr(project, project_id, mr_iid)
+                except Exception as e:
+                    self._dropped('mr', e)
+                    continue
+                yield MergeRequestRecord.from_object(mr)
+    
+    @instrumented
     def get_mrs_with_file_changes(
         self, 
         project_id: str, 
@@ -63,36 +388,92 @@ class EuniceGitLabClient:
         if not commits:
             return []
         
-        project = self.gl.projects.get(project_id)
+        project = self._get_project(project_id)
+        index = self._commit_indexes.get(str(project_id))
         mrs = set()
         
         for commit in commits:
-            self._check_rate_limit()
+            # commits shared by several files are resolved once per index
+            if index is not None and commit.id in index.mr_iids_by_commit:
+                mrs.update(index.mr_iids_by_commit[commit.id])
+                continue
             
             try:
-                # gitlab can map commit → mr
-                commit_obj = project.commits.get(commit.id)
-                commit_mrs = commit_obj.merge_requests()
+                merged = self._merged_mr_iids(project, project_id, commit.id)
+                mrs.update(merged)
                 
-                for mr in commit_mrs:
-                    if mr.state == 'merged':
-                        mrs.add(mr.iid)
+                if index is not None:
+                    index.mr_iids_by_commit[commit.id] = merged
             except Exception as e:
                 # fallback: skip this commit
+                self._dropped('commit_mrs', e)
                 continue
         
         # fetch full mr objects
-        full_mrs = []
-        for mr_iid in mrs:
-            self._check_rate_limit()
+        return list(self._get_mrs(project, project_id, mrs).values())
+    
+    @instrumented
+    def _merged_mr_iids(self, project, project_id: str, sha: str) -> List[int]:
+        """
+        merged mr iids for a commit
+        
+        reality check: once a commit is merged the mapping never changes,
+        so only unmerged mappings expire from the cache
+        """
+        key = f'commit_mrs:{project_id}:{sha}'
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        self._check_rate_limit()
+        
+        # gitlab can map commit → mr (lazy: no need to fetch the commit itself)
+        commit_obj = project.commits.get(sha, lazy=True)
+        commit_mrs = commit_obj.merge_requests()
+        
+        merged = []
+        for mr in commit_mrs:
+            # merge_requests() returns plain dicts, not RESTObjects
+            state = mr['state'] if isinstance(mr, dict) else mr.state
+            if state == 'merged':
+                merged.append(mr['iid'] if isinstance(mr, dict) else mr.iid)
+        
+        if self.cache is not None:
+            self.cache.set(key, merged, immutable=bool(merged))
+        
+        return merged
+    
+    @instrumented
+    def _get_mrs(self, project, project_id: str, mr_iids) -> Dict[int, object]:
+        """full mr objects by iid; failed fetches are skipped"""
+        full_mrs = {}
+        for mr_iid in mr_iids:
             try:
-                mr = project.mergerequests.get(mr_iid)
-                full_mrs.append(mr)
-            except:
-                continue
+                full_mrs[mr_iid] = self._get_mr(project, project_id, mr_iid)
+            except Exception as e:
+                self._dropped('mr', e)
         
         return full_mrs
     
+    def _get_mr(self, project, project_id: str, mr_iid: int):
+        """full mr object; merged mrs are cached indefinitely"""
+        key = f'mr:{project_id}:{mr_iid}'
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return _restore(project.mergerequests, cached)
+        
+        self._check_rate_limit()
+        mr = project.mergerequests.get(mr_iid)
+        
+        if self.cache is not None:
+            self.cache.set(key, mr.attributes, immutable=mr.state == 'merged')
+        
+        return mr
+    
     def calculate_mr_review_time(self, mr) -> Optional[float]:
         """
         calculate time from creation to merge in minutes
@@ -106,35 +487,32 @@ class EuniceGitLabClient:
             created = datetime.fromisoformat(mr.created_at.replace('Z', '+00:00'))
             merged = datetime.fromisoformat(mr.merged_at.replace('Z', '+00:00'))
             return (merged - created).total_seconds() / 60
-        except:
+        except (AttributeError, TypeError, ValueError):
             return None
     
-    def get_bug_issues_with_time_tracking(
-        self, 
-        project_id: str, 
-        file_path: str,
-        since_days: int = 30
-    ) -> List[Dict]:
+    @instrumented
+    def get_bug_issues_with_time_tracking(
+        self, 
+        project_id: str, 
+        file_path: str,
+        since_days: int = 30
+    ) -> List[Dict]:
         """
         get bug issues mentioning file with time spent
         
-        reality check: time_stats.total_time_spent is in SECONDS
+        reality check: time_stats.total_time_spent is in SECONDS. served
+        from the bug issue index when one covering the window has been
+        built - that also counts bugs linked only through their closing mr
         """
-        project = self.gl.projects.get(project_id)
-        
-        self._check_rate_limit()
-        
-        updated_after = (datetime.now() - timedelta(days=since_days)).isoformat()
-        issues = project.issues.list(
-            labels=['bug'],
-            search=file_path,
-            updated_after=updated_after,
-            all=True
-        )
+        issues = self._indexed_bug_issues(project_id, file_path, since_days)
+        if issues is None:
+            project = self._get_project(project_id)
+            since = datetime.now() - timedelta(days=since_days)
+            issues = self._bug_issues(project, project_id, file_path, since)
         
         issues_with_time = []
         for issue in issues:
-            time_stats = getattr(issue, 'time_stats', {})
+            time_stats = issue_time_stats(issue)
             total_time_spent = time_stats.get('total_time_spent', 0)
             
             if total_time_spent and total_time_spent > 0:
@@ -150,6 +528,206 @@ class EuniceGitLabClient:
         
         return issues_with_time
     
+    def _bug_issues(self, project, project_id: str, file_path: Optional[str], since: datetime) -> List:
+        """
+        bug issues updated in the window - mentioning file_path, or all of them for None
+        
+        incremental refresh: only issues updated since the last run are fetched
+        """
+        key = f'bug_issues:{project_id}:{file_path}' if file_path else f'bug_issues:{project_id}'
+        cached, updated_after, covered = self._cached_range(key, since)
+        
+        refreshed_at = datetime.now()
+        issues = self._fetch_bug_issues(project, project_id, file_path, updated_after)
+        
+        if self.cache is not None:
+            by_iid = dict(cached or {})
+            for issue in issues:
+                by_iid[str(issue.iid)] = issue.attributes
+            
+            kept = as_aware(covered)
+            by_iid = {
+                iid: attrs for iid, attrs in by_iid.items()
+                if parse_gitlab_datetime(attrs['updated_at']) >= kept
+            }
+            self._store_range(key, by_iid, refreshed_at, covered)
+            
+            cutoff = as_aware(since)
+            issues = [
+                _restore(project.issues, attrs) for attrs in by_iid.values()
+                if parse_gitlab_datetime(attrs['updated_at']) >= cutoff
+            ]
+        
+        return issues
+    
+    @instrumented
+    def build_bug_issue_index(self, project_id: str, since_days: int = 30) -> BugIssueIndex:
+        """
+        list every bug issue in the window once and index it by file path
+        
+        reality check: one paged listing plus, for closed issues only, the
+        mrs that closed them and the files those mrs changed - instead of
+        one full-text search per file. open issues have no merged closing
+        mr yet, so they are linked by mentions alone. once built,
+        get_bug_issues_with_time_tracking answers from the index for any
+        window it covers.
+        """
+        project = self._get_project(project_id)
+        since = datetime.now() - timedelta(days=since_days)
+        index = BugIssueIndex(project_id, since)
+        mr_paths: Dict[int, List[str]] = {}  # one mr can close several issues
+        
+        for issue in self._bug_issues(project, project_id, None, since):
+            fixed_paths = []
+            
+            if getattr(issue, 'state', None) == 'closed':
+                try:
+                    mr_iids = self._closing_mr_iids(project, project_id, issue.iid)
+                except Exception as e:
+                    # fallback: link by mentions only
+                    self._dropped('issue_closed_by', e)
+                    mr_iids = []
+                
+                index.closing_mr_iids[issue.iid] = mr_iids
+                for mr_iid in mr_iids:
+                    if mr_iid not in mr_paths:
+                        mr_paths[mr_iid] = self._mr_paths(project, project_id, mr_iid) or []
+                    fixed_paths.extend(mr_paths[mr_iid])
+            
+            index.add(issue, fixed_paths)
+        
+        self._bug_issue_indexes[str(project_id)] = index
+        return index
+    
+    def export_indexes(self, project_id: str) -> Dict[str, Optional[Dict]]:
+        """the project's built commit and bug issue indexes in plain form (see load_indexes)"""
+        commit_index = self._commit_indexes.get(str(project_id))
+        bug_issue_index = self._bug_issue_indexes.get(str(project_id))
+        return {
+            'commits': commit_index.to_dict() if commit_index is not None else None,
+            'bug_issues': bug_issue_index.to_dict() if bug_issue_index is not None else None
+        }
+    
+    def load_indexes(self, project_id: str, indexes: Dict[str, Optional[Dict]]):
+        """
+        adopt indexes another client built (export_indexes), e.g. in the
+        parent of an audit's worker processes - no api calls beyond the project
+        """
+        project = self._get_project(project_id)
+        
+        if indexes.get('commits'):
+            self._commit_indexes[str(project_id)] = CommitIndex.from_dict(
+                indexes['commits'], lambda attrs: _restore(project.commits, attrs)
+            )
+        if indexes.get('bug_issues'):
+            self._bug_issue_indexes[str(project_id)] = BugIssueIndex.from_dict(
+                indexes['bug_issues'], lambda attrs: _restore(project.issues, attrs)
+            )
+    
+    def _indexed_bug_issues(self, project_id: str, file_path: str, since_days: int) -> Optional[List]:
+        """answer a per-file bug issue query from the index, or None if not covered"""
+        index = self._bug_issue_indexes.get(str(project_id))
+        if index is None:
+            return None
+        
+        since = datetime.now() - timedelta(days=since_days)
+        if not index.covers(since):
+            return None
+        
+        return index.issues_for(file_path, since)
+    
+    def _closing_mr_iids(self, project, project_id: str, issue_iid: int) -> List[int]:
+        """merged mrs that closed an issue (a reopened issue can gain more, so this expires)"""
+        key = f'issue_closed_by:{project_id}:{issue_iid}'
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        self._check_rate_limit()
+        closed_by = project.issues.get(issue_iid, lazy=True).closed_by()
+        
+        # closed_by() returns plain dicts, not RESTObjects
+        merged = [mr['iid'] for mr in closed_by if mr.get('state') == 'merged']
+        
+        if self.cache is not None:
+            self.cache.set(key, merged)
+        
+        return merged
+    
+    def _mr_paths(self, project, project_id: str, mr_iid: int) -> Optional[List[str]]:
+        """paths a merged mr changed (old and new on renames); never changes once merged"""
+        key = f'mr_paths:{project_id}:{mr_iid}'
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        self._check_rate_limit()
+        
+        try:
+            changes = project.mergerequests.get(mr_iid, lazy=True).changes()
+        except Exception as e:
+            self._dropped('mr_paths', e)
+            return None
+        
+        paths = []
+        for change in changes.get('changes', []):
+            paths.append(change.get('new_path'))
+            paths.append(change.get('old_path'))
+        
+        if self.cache is not None:
+            self.cache.set(key, paths, immutable=True)
+        
+        return paths
+    
+    @instrumented
+    def iter_bug_issues_with_time_tracking(
+        self,
+        project_id: str,
+        file_path: str,
+        since_days: int = 30
+    ) -> Iterator[IssueRecord]:
+        """stream bug issues mentioning a file that have time spent, as compact records"""
+        if self.cache is not None or str(project_id) in self._bug_issue_indexes:
+            for bug in self.get_bug_issues_with_time_tracking(project_id, file_path, since_days):
+                yield IssueRecord.from_object(bug['issue'])
+            return
+        
+        project = self._get_project(project_id)
+        updated_after = (datetime.now() - timedelta(days=since_days)).isoformat()
+        
+        self._check_rate_limit()
+        listing = project.issues.list(
+            labels=['bug'],
+            search=file_path,
+            updated_after=updated_after,
+            per_page=100,
+            iterator=True
+        )
+        
+        for issue in self._stream(listing):
+            record = IssueRecord.from_object(issue)
+            if record.hours_spent > 0:
+                yield record
+    
+    @instrumented
+    def _fetch_bug_issues(self, project, project_id: str, file_path: Optional[str], updated_after: datetime) -> List:
+        """bug issues mentioning a file (every bug issue for None), updated after a point in time"""
+        self._check_rate_limit()
+        
+        search = {'search': file_path} if file_path else {}
+        return project.issues.list(
+            labels=['bug'],
+            updated_after=updated_after.isoformat(),
+            per_page=100,  # max allowed
+            all=True,
+            **search
+        )
+    
+    @instrumented
     def get_pipelines_touching_file(
         self, 
         project_id: str, 
@@ -167,54 +745,428 @@ class EuniceGitLabClient:
         if not commits:
             return []
         
-        project = self.gl.projects.get(project_id)
+        project = self._get_project(project_id)
+        index = self._commit_indexes.get(str(project_id))
         pipelines = {}  # deduplicate by id
         
+        pending = [
+            c.id for c in commits
+            if index is None or c.id not in index.pipelines_by_commit
+        ]
+        fetched = self._pipelines_for_shas(project, project_id, pending)
+        
         for commit in commits:
-            self._check_rate_limit()
+            if index is not None and commit.id in index.pipelines_by_commit:
+                commit_pipelines = index.pipelines_by_commit[commit.id]
+            elif commit.id in fetched:
+                commit_pipelines = fetched[commit.id]
+                if index is not None:
+                    index.pipelines_by_commit[commit.id] = commit_pipelines
+            else:
+                # lookup failed: skip this commit
+                continue
             
+            for pipeline in commit_pipelines:
+                pipelines[pipeline.id] = pipeline
+        
+        return list(pipelines.values())
+    
+    @instrumented
+    def iter_pipelines_touching_file(
+        self,
+        project_id: str,
+        file_path: str,
+        since_days: int = 30
+    ) -> Iterator[PipelineRecord]:
+        """stream pipelines for commits that changed a file, deduplicated by id"""
+        project = self._get_project(project_id)
+        seen = set()
+        
+        for commit in self.iter_file_commits(project_id, file_path, since_days):
             try:
-                # get pipelines for this commit sha
-                commit_pipelines = project.pipelines.list(sha=commit.id)
-                
-                for pipeline in commit_pipelines:
-                    pipelines[pipeline.id] = pipeline
-            except:
+                commit_pipelines = self._commit_pipelines(project, project_id, commit.id)
+            except Exception as e:
+                self._dropped('commit_pipelines', e)
                 continue
+            
+            for pipeline in commit_pipelines:
+                if pipeline.id not in seen:
+                    seen.add(pipeline.id)
+                    yield PipelineRecord.from_object(pipeline)
+    
+    @instrumented
+    def _pipelines_for_shas(self, project, project_id: str, shas: List[str]) -> Dict[str, List]:
+        """pipelines per commit sha; failed lookups are left out"""
+        by_sha = {}
+        for sha in shas:
+            try:
+                by_sha[sha] = list(self._commit_pipelines(project, project_id, sha))
+            except Exception as e:
+                self._dropped('commit_pipelines', e)
         
-        return list(pipelines.values())
+        return by_sha
     
-    def calculate_pipeline_stats(self, pipelines: List) -> Dict:
-        """calculate aggregate pipeline statistics"""
-        if not pipelines:
-            return {
-                'avg_duration_minutes': 0,
-                'failure_rate': 0,
-                'failed_count': 0,
-                'total_count': 0
-            }
+    def _commit_pipelines(self, project, project_id: str, sha: str) -> List:
+        """pipelines for a commit sha; cached longer once all have finished"""
+        key = f'pipelines:{project_id}:{sha}'
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return [_restore(project.pipelines, attrs) for attrs in cached]
+        
+        self._check_rate_limit()
         
+        # get pipelines for this commit sha
+        commit_pipelines = project.pipelines.list(sha=sha)
+        
+        if self.cache is not None:
+            finished = bool(commit_pipelines) and all(
+                p.status in TERMINAL_PIPELINE_STATUSES for p in commit_pipelines
+            )
+            self.cache.set(
+                key,
+                [p.attributes for p in commit_pipelines],
+                ttl_seconds=FINISHED_PIPELINE_TTL_SECONDS if finished else None
+            )
+        
+        return commit_pipelines
+    
+    def calculate_pipeline_stats(self, pipelines: Iterable) -> Dict:
+        """
+        calculate aggregate pipeline statistics
+        
+        single pass - accepts a list or a streaming iterator of pipelines
+        """
         total_duration = 0
         failed_count = 0
+        pipeline_ids = []
         
         for pipeline in pipelines:
             if hasattr(pipeline, 'duration') and pipeline.duration:
                 total_duration += pipeline.duration
             
-            if pipeline.status in ['failed', 'canceled']:
+            if pipeline.status in FAILED_PIPELINE_STATUSES:
                 failed_count += 1
+            
+            pipeline_ids.append(pipeline.id)
         
-        avg_duration = (total_duration / len(pipelines)) / 60  # convert to minutes
-        failure_rate = failed_count / len(pipelines) if pipelines else 0
+        total_count = len(pipeline_ids)
+        if not total_count:
+            return {
+                'avg_duration_minutes': 0,
+                'failure_rate': 0,
+                'failed_count': 0,
+                'total_count': 0
+            }
+        
+        avg_duration = (total_duration / total_count) / 60  # convert to minutes
+        failure_rate = failed_count / total_count
         
         return {
             'avg_duration_minutes': round(avg_duration, 2),
             'failure_rate': round(failure_rate, 3),
             'failed_count': failed_count,
-            'total_count': len(pipelines),
-            'pipeline_ids': [p.id for p in pipelines]
+            'total_count': total_count,
+            'pipeline_ids': pipeline_ids
         }
     
+    def calculate_avg_review_time(self, mrs: Iterable) -> Optional[float]:
+        """
+        mean review time in minutes over mrs that were merged
+        
+        single pass - accepts a list or a streaming iterator of mrs
+        """
+        total = 0.0
+        count = 0
+        
+        for mr in mrs:
+            minutes = self.calculate_mr_review_time(mr)
+            if minutes is not None:
+                total += minutes
+                count += 1
+        
+        return total / count if count else None
+    
+    @instrumented
+    def get_merged_mr_review_times(self, project_id: str, since_days: int = 30) -> Dict[int, float]:
+        """
+        review minutes of every mr merged in the window, by iid
+        
+        reality check: one project-wide listing. an mr merged off a commit
+        from the window was updated inside the window too, so this covers
+        every mr analyze_files can link to a file
+        """
+        project = self._get_project(project_id)
+        updated_after = datetime.now() - timedelta(days=since_days)
+        
+        self._check_rate_limit()
+        listing = project.mergerequests.list(
+            state='merged',
+            updated_after=updated_after.isoformat(),
+            per_page=100,
+            iterator=True
+        )
+        
+        review_times = {}
+        for mr in self._stream(listing, limit=None):
+            minutes = self.calculate_mr_review_time(mr)
+            if minutes is not None:
+                review_times[mr.iid] = minutes
+        
+        return review_times
+    
+    @instrumented
+    def get_failed_pipeline_counts(self, project_id: str, since_days: int = 30) -> Dict[str, int]:
+        """failed pipelines per commit sha over the window, from one project-wide listing per failed status"""
+        project = self._get_project(project_id)
+        updated_after = datetime.now() - timedelta(days=since_days)
+        
+        counts: Dict[str, int] = {}
+        for status in sorted(FAILED_PIPELINE_STATUSES):
+            self._check_rate_limit()
+            listing = project.pipelines.list(
+                status=status,
+                updated_after=updated_after.isoformat(),
+                per_page=100,
+                iterator=True
+            )
+            
+            for pipeline in self._stream(listing, limit=None):
+                counts[pipeline.sha] = counts.get(pipeline.sha, 0) + 1
+        
+        return counts
+    
+    @instrumented
+    def analyze_files(
+        self,
+        project_id: str,
+        paths: List[str],
+        since_days: int = 30,
+        build_index: bool = False,
+        include_history: bool = False
+    ) -> Dict[str, Dict]:
+        """
+        review times, bug hours and pipeline stats for many files at once
+        
+        reality check: files in one audit share commits, mrs and pipelines.
+        every distinct commit is resolved to mrs/pipelines once, every mr is
+        fetched once, then results are fanned out per file. commits come
+        from the commit index and bug hours from the bug issue index when
+        they cover the window (build_index=True builds both first - worth
+        it once paths run into the hundreds). dropped_lookups counts a
+        file's commit → mr / pipeline and mr lookups that failed, so
+        incomplete results are visible. include_history=True adds each
+        file's 'history' in the AuditSnapshot format, so the audit can be
+        snapshotted without fetching it again (see
+        IncrementalReviewEngine.record_metrics)
+        """
+        project = self._get_project(project_id)
+        
+        index = self._commit_indexes.get(str(project_id))
+        now = datetime.now()
+        since = now - timedelta(days=since_days)
+        
+        if build_index and (index is None or not index.covers(since)):
+            index = self.build_commit_index(project_id, since_days)
+        
+        bug_index = self._bug_issue_indexes.get(str(project_id))
+        if build_index and (bug_index is None or not bug_index.covers(since)):
+            self.build_bug_issue_index(project_id, since_days)
+        
+        commits_by_path = {
+            path: self.get_file_commits(project_id, path, since_days)
+            for path in paths
+        }
+        
+        # resolve each distinct commit once
+        shas = list(dict.fromkeys(
+            c.id for commits in commits_by_path.values() for c in commits
+        ))
+        
+        mr_iids_by_sha: Dict[str, List[int]] = {}
+        failed_mr_shas = set()
+        for sha in shas:
+            if index is not None and sha in index.mr_iids_by_commit:
+                mr_iids_by_sha[sha] = index.mr_iids_by_commit[sha]
+                continue
+            try:
+                mr_iids_by_sha[sha] = self._merged_mr_iids(project, project_id, sha)
+            except Exception as e:
+                self._dropped('commit_mrs', e)
+                failed_mr_shas.add(sha)
+                mr_iids_by_sha[sha] = []
+        
+        pipelines_by_sha: Dict[str, List] = {}
+        if index is not None:
+            pipelines_by_sha.update(
+                (sha, index.pipelines_by_commit[sha])
+                for sha in shas if sha in index.pipelines_by_commit
+            )
+        pipelines_by_sha.update(self._pipelines_for_shas(
+            project, project_id, [sha for sha in shas if sha not in pipelines_by_sha]
+        ))
+        
+        failed_shas = failed_mr_shas.union(sha for sha in shas if sha not in pipelines_by_sha)
+        
+        if index is not None:
+            # failed lookups stay out of the index so the next call retries them
+            index.mr_iids_by_commit.update(
+                (sha, iids) for sha, iids in mr_iids_by_sha.items() if sha not in failed_shas
+            )
+            index.pipelines_by_commit.update(pipelines_by_sha)
+        
+        # fetch each mr once
+        mrs = self._get_mrs(project, project_id, dict.fromkeys(
+            iid for iids in mr_iids_by_sha.values() for iid in iids
+        ))
+        
+        results = {}
+        for path, commits in commits_by_path.items():
+            file_mrs = {}
+            file_pipelines = {}  # deduplicate by id
+            dropped = 0
+            
+            for commit in commits:
+                dropped += commit.id in failed_shas
+                for iid in mr_iids_by_sha[commit.id]:
+                    if iid in mrs:
+                        file_mrs[iid] = mrs[iid]
+                    else:
+                        dropped += 1
+                for pipeline in pipelines_by_sha.get(commit.id, []):
+                    file_pipelines[pipeline.id] = pipeline
+            
+            review_minutes = {iid: self.calculate_mr_review_time(mr) for iid, mr in file_mrs.items()}
+            review_times = [t for t in review_minutes.values() if t is not None]
+            bugs = self.get_bug_issues_with_time_tracking(project_id, path, since_days)
+            pipelines = list(file_pipelines.values())
+            
+            results[path] = {
+                'commit_count': len(commits),
+                'mr_iids': list(file_mrs),
+                'review_times_minutes': review_times,
+                'avg_review_minutes': sum(review_times) / len(review_times) if review_times else 0,
+                'bug_hours': sum(b['hours_spent'] for b in bugs),
+                'bug_issue_ids': [b['issue_id'] for b in bugs],
+                'pipeline_stats': self.calculate_pipeline_stats(pipelines),
+                'ci_failure_count': len([p for p in pipelines if p.status in FAILED_PIPELINE_STATUSES]),
+                'dropped_lookups': dropped
+            }
+            
+            if include_history:
+                # failed lookups are None, not []: the next refresh retries them
+                results[path]['history'] = {
+                    'refreshed_at': now.isoformat(),
+                    'commits': {
+                        record.id: {
+                            'date': record.committed_date or record.created_at,
+                            'mr_iids': None if record.id in failed_mr_shas else mr_iids_by_sha[record.id],
+                            'pipelines': (
+                                [pipeline_attrs(p) for p in pipelines_by_sha[record.id]]
+                                if record.id in pipelines_by_sha else None
+                            )
+                        }
+                        for record in map(CommitRecord.from_object, commits)
+                    },
+                    'mrs': {str(iid): minutes for iid, minutes in review_minutes.items()},
+                    'bugs': {
+                        str(b['issue_id']): {
+                            'updated_at': getattr(b['issue'], 'updated_at', None),
+                            'hours_spent': b['hours_spent']
+                        }
+                        for b in bugs
+                    }
+                }
+        
+        return results
+    
+    @instrumented
+    def get_code_quality_index(self, project_id: str, mr_id: int) -> Optional[CodeQualityIndex]:
+        """
+        code quality findings of an mr's head pipeline, by path and fingerprint
+        
+        reality check: the report is a ci artifact, not a rest resource.
+        it is streamed to disk and parsed incrementally (tens of mb on a
+        monorepo), and the parsed index is cached by job id - a finished
+        job's artifact never changes, so re-analysing a pipeline is free.
+        """
+        project = self._get_project(project_id)
+        mr = self._get_mr(project, project_id, mr_id)
+        
+        # get pipeline for mr
+        head_pipeline = getattr(mr, 'head_pipeline', None)
+        if not head_pipeline:
+            return None
+        
+        # find code_quality job
+        self._check_rate_limit()
+        jobs = project.pipelines.get(head_pipeline['id'], lazy=True).jobs.list(all=True)
+        code_quality_job = None
+        
+        for job in jobs:
+            if 'code_quality' in job.name.lower() or 'codeclimate' in job.name.lower():
+                code_quality_job = job
+                break
+        
+        if not code_quality_job:
+            return None
+        
+        return self._code_quality_report(project, project_id, code_quality_job)
+    
+    def _code_quality_report(self, project, project_id: str, job) -> CodeQualityIndex:
+        """parsed code quality artifact of one job (cached by job id)"""
+        key = f'code_quality:{project_id}:{job.id}'
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return CodeQualityIndex.from_dict(cached)
+        
+        artifact = self._artifact_path(project_id, job.id)
+        
+        if artifact is None:
+            # no file-backed cache: spool to a temporary file
+            with tempfile.TemporaryFile() as spool:
+                self._download_artifact(project, job.id, spool)
+                spool.seek(0)
+                index = parse_code_quality_report(spool, job.id)
+        else:
+            if not artifact.exists():
+                partial = artifact.with_suffix('.part')
+                with open(partial, 'wb') as spool:
+                    self._download_artifact(project, job.id, spool)
+                os.replace(partial, artifact)
+            
+            with open(artifact, 'rb') as report:
+                index = parse_code_quality_report(report, job.id)
+        
+        if self.cache is not None:
+            finished = getattr(job, 'status', None) in TERMINAL_PIPELINE_STATUSES
+            self.cache.set(key, index.to_dict(), immutable=finished)
+        
+        return index
+    
+    def _artifact_path(self, project_id: str, job_id: int) -> Optional[Path]:
+        """where a downloaded report is kept, next to the response cache"""
+        if self.cache is None or self.cache.path == ':memory:':
+            return None
+        
+        directory = Path(self.cache.path).parent / 'artifacts'
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / f"{str(project_id).replace('/', '_')}-{job_id}-{CODE_QUALITY_REPORT}"
+    
+    @instrumented
+    def _download_artifact(self, project, job_id: int, target):
+        """stream the report out of the job's artifacts in chunks"""
+        self._check_rate_limit()
+        project.jobs.get(job_id, lazy=True).artifact(
+            CODE_QUALITY_REPORT,
+            streamed=True,
+            action=target.write
+        )
+    
+    @instrumented
     def get_file_complexity_from_code_quality(
         self, 
         project_id: str, 
@@ -223,59 +1175,44 @@ class EuniceGitLabClient:
         """
         get code quality metrics from ci artifacts
         
-        reality check: not a simple rest endpoint, parse from artifacts
+        reality check: not a simple rest endpoint, parse from artifacts.
+        per-file summaries here; get_code_quality_index has the findings
         """
         try:
-            project = self.gl.projects.get(project_id)
-            mr = project.mergerequests.get(mr_id)
-            
-            # get pipeline for mr
-            if not hasattr(mr, 'head_pipeline') or not mr.head_pipeline:
-                return None
-            
-            pipeline = project.pipelines.get(mr.head_pipeline['id'])
-            
-            # find code_quality job
-            jobs = pipeline.jobs.list(all=True)
-            code_quality_job = None
-            
-            for job in jobs:
-                if 'code_quality' in job.name.lower() or 'codeclimate' in job.name.lower():
-                    code_quality_job = job
-                    break
-            
-            if not code_quality_job:
-                return None
-            
-            # for now, return placeholder
-            # actual implementation would parse artifact json
-            return {
-                'complexity_available': False,
-                'note': 'code quality parsing from artifacts not yet implemented'
-            }
-            
+            index = self.get_code_quality_index(project_id, mr_id)
         except Exception as e:
+            self._dropped('code_quality', e)
             return None
+        
+        if index is None:
+            return None
+        
+        return {
+            'complexity_available': True,
+            'job_id': index.job_id,
+            'issue_count': len(index),
+            'files': {path: index.file_summary(path) for path in index.paths()}
+        }
     
     def _check_rate_limit(self):
         """
         respect gitlab rate limits
         gitlab.com: 2000 requests/minute for authenticated users
-        """
-        now = datetime.now()
-        
-        # remove requests older than 1 minute
-        self.rate_limit_window = [
-            req for req in self.rate_limit_window 
-            if (now - req).seconds < 60
-        ]
-        
-        # if approaching limit, wait
-        if len(self.rate_limit_window) > 1900:
-            time.sleep(60)
         
-        self.rate_limit_window.append(now)
+        reality check: O(1) token bucket - sleeps only for the actual deficit
+        """
+        self.instrumentation.record_rate_limit(self.rate_limiter.acquire())
+    
+    def _dropped(self, lookup: str, error: Exception):
+        """count an item left out of a result because its lookup failed"""
+        self.instrumentation.record_dropped(lookup, error)
+    
+    def _on_response(self, response, *args, **kwargs):
+        """requests response hook: feed rate limit headers back to the bucket"""
+        self.rate_limiter.update_from_headers(response.headers)
+        self.instrumentation.record_response(response, **kwargs)
     
+    @instrumented
     def get_project_info(self, project_id: str) -> Dict:
         """get basic project information"""
         project = self.gl.projects.get(project_id)
@@ -287,3 +1224,20 @@ class EuniceGitLabClient:
             'web_url': project.web_url,
             'default_branch': project.default_branch
         }
+
+
+def create_client(url: str, token: str, backend: str = 'rest', **kwargs) -> EuniceGitLabClient:
+    """
+    build the client selected by gitlab_config.backend in eunice.yml
+    
+    rest: python-gitlab, one request per mr / pipeline lookup
+    graphql: same methods, mrs / pipelines / issues fetched in batches
+    """
+    if backend == 'graphql':
+        from .graphql_client import EuniceGraphQLClient
+        return EuniceGraphQLClient(url, token, **kwargs)
+    
+    if backend != 'rest':
+        raise ValueError(f"unknown gitlab backend: {backend!r} (expected 'rest' or 'graphql')")
+    
+    return EuniceGitLabClient(url, token, **kwargs)
@@ -0,0 +1,284 @@
+"""gitlab graphql backend for eunice - mrs, pipelines and issues in batches"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+from .cache import FINISHED_PIPELINE_TTL_SECONDS, TERMINAL_PIPELINE_STATUSES
+from .gitlab_client import EuniceGitLabClient, GitLabRecord
+from .instrumentation import instrumented
+
+
+# graphql connections cap `first` at 100
+BATCH_SIZE = 100
+
+# gitlab rejects queries scoring above 250 (each field and connection
+# counts); one aliased pipelines connection with PIPELINE_FIELDS is ~8
+PIPELINE_BATCH_SIZE = 20
+
+MERGE_REQUESTS_QUERY = """
+query($path: ID!, $iids: [String!], $after: String) {
+  project(fullPath: $path) {
+    mergeRequests(iids: $iids, first: 100, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        iid title state webUrl createdAt mergedAt updatedAt
+        headPipeline { id iid sha status duration }
+      }
+    }
+  }
+}
+"""
+
+ISSUES_QUERY = """
+query($path: ID!, $search: String, $updatedAfter: Time, $after: String) {
+  project(fullPath: $path) {
+    issues(labelName: ["bug"], search: $search, updatedAfter: $updatedAfter,
+           first: 100, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        iid title state webUrl description createdAt updatedAt
+        totalTimeSpent timeEstimate
+      }
+    }
+  }
+}
+"""
+
+# no duration: gitlab's rest pipeline list has none, and both backends
+# must give the same pipeline stats
+PIPELINE_FIELDS = 'nodes { id iid sha status createdAt finishedAt }'
+
+
+def _gid(value) -> int:
+    """numeric id from a global id like gid://gitlab/Ci::Pipeline/123"""
+    return int(str(value).rsplit('/', 1)[-1])
+
+
+def _pipeline_record(node: Dict) -> GitLabRecord:
+    return GitLabRecord(
+        id=_gid(node['id']),
+        iid=int(node['iid']) if node.get('iid') else None,
+        sha=node.get('sha'),
+        status=(node.get('status') or '').lower(),  # graphql enums are upper case
+        duration=node.get('duration'),
+        created_at=node.get('createdAt'),
+        finished_at=node.get('finishedAt')
+    )
+
+
+def _mr_record(node: Dict) -> GitLabRecord:
+    head = node.get('headPipeline')
+    return GitLabRecord(
+        iid=int(node['iid']),
+        title=node.get('title'),
+        state=node.get('state'),
+        web_url=node.get('webUrl'),
+        created_at=node.get('createdAt'),
+        merged_at=node.get('mergedAt'),
+        updated_at=node.get('updatedAt'),
+        head_pipeline=_pipeline_record(head).attributes if head else None
+    )
+
+
+def _issue_record(node: Dict) -> GitLabRecord:
+    return GitLabRecord(
+        iid=int(node['iid']),
+        title=node.get('title'),
+        state=node.get('state'),
+        web_url=node.get('webUrl'),
+        description=node.get('description'),
+        created_at=node.get('createdAt'),
+        updated_at=node.get('updatedAt'),
+        time_stats={
+            'total_time_spent': node.get('totalTimeSpent') or 0,
+            'time_estimate': node.get('timeEstimate') or 0
+        }
+    )
+
+
+class GraphQLComplexityError(RuntimeError):
+    """query scored above gitlab's complexity limit - retrying cannot help"""
+
+
+class EuniceGraphQLClient(EuniceGitLabClient):
+    """
+    EuniceGitLabClient with mr, pipeline and issue lookups over graphql
+
+    reality check: mergerequests.get(iid) per mr and pipelines.list(sha=...)
+    per commit dominate the request count. graphql fetches up to 100 mrs
+    by iid, or pipelines for 20 shas (aliased fields, kept under gitlab's
+    query complexity limit), per query.
+    commit history and commit → mr mapping have no graphql equivalent and
+    stay on rest. select with gitlab_config.backend: graphql
+    """
+
+    def __init__(self, url: str, token: str, **kwargs):
+        super().__init__(url, token, **kwargs)
+        self.graphql_url = url.rstrip('/') + '/api/graphql'
+        self._token = token
+        self._http = getattr(self.gl, 'session', None) or requests.Session()
+        self._project_paths: Dict[str, str] = {}
+
+    def _graphql(self, query: str, variables: Dict) -> Dict:
+        """run one query; graphql reports failures in the body, not the status"""
+        self._check_rate_limit()
+
+        resp = self._http.post(
+            self.graphql_url,
+            json={'query': query, 'variables': variables},
+            headers={'Authorization': f'Bearer {self._token}'},
+            timeout=self.transport.timeout
+        )
+        resp.raise_for_status()
+        payload = resp.json()
+
+        if payload.get('errors'):
+            messages = '; '.join(e.get('message', '') for e in payload['errors'])
+            if 'complexity' in messages:
+                raise GraphQLComplexityError(f'gitlab graphql error: {messages}')
+            raise RuntimeError(f'gitlab graphql error: {messages}')
+
+        return payload['data']
+
+    def _full_path(self, project_id: str) -> str:
+        """graphql addresses projects by full path, rest by id"""
+        key = str(project_id)
+        if '/' in key:
+            return key
+
+        if key not in self._project_paths:
+            self._check_rate_limit()
+            self._project_paths[key] = self.gl.projects.get(project_id).path_with_namespace
+        return self._project_paths[key]
+
+    def _paginate(self, query: str, variables: Dict, connection: str) -> List[Dict]:
+        """follow endCursor through a project connection"""
+        nodes = []
+        after = None
+
+        while True:
+            data = self._graphql(query, dict(variables, after=after))
+            page = (data.get('project') or {}).get(connection) or {}
+            nodes.extend(page.get('nodes') or [])
+
+            info = page.get('pageInfo') or {}
+            if not info.get('hasNextPage'):
+                return nodes
+            after = info.get('endCursor')
+
+    @instrumented
+    def _get_mrs(self, project, project_id: str, mr_iids) -> Dict[int, object]:
+        """full mrs by iid, 100 per query; merged mrs are cached indefinitely"""
+        full_mrs = {}
+        missing = []
+
+        for iid in mr_iids:
+            cached = self.cache.get(f'gql_mr:{project_id}:{iid}') if self.cache else None
+            if cached is not None:
+                full_mrs[iid] = GitLabRecord(**cached)
+            else:
+                missing.append(iid)
+
+        if not missing:
+            return full_mrs
+
+        path = self._full_path(project_id)
+        for start in range(0, len(missing), BATCH_SIZE):
+            batch = [str(iid) for iid in missing[start:start + BATCH_SIZE]]
+
+            try:
+                nodes = self._paginate(MERGE_REQUESTS_QUERY, {'path': path, 'iids': batch}, 'mergeRequests')
+            except GraphQLComplexityError:
+                raise
+            except Exception as e:
+                # fallback: skip this batch
+                self._dropped('mr', e)
+                continue
+
+            for node in nodes:
+                mr = _mr_record(node)
+                full_mrs[mr.iid] = mr
+                if self.cache is not None:
+                    self.cache.set(
+                        f'gql_mr:{project_id}:{mr.iid}',
+                        mr.attributes,
+                        immutable=mr.state == 'merged'
+                    )
+
+        return full_mrs
+
+    @instrumented
+    def _pipelines_for_shas(self, project, project_id: str, shas: List[str]) -> Dict[str, List]:
+        """
+        pipelines for PIPELINE_BATCH_SIZE shas per query via aliased connections
+
+        a query over gitlab's complexity limit fails every time, so it is
+        raised instead of being dropped like a failed batch
+        """
+        by_sha = {}
+        missing = []
+
+        for sha in shas:
+            cached = self.cache.get(f'gql_commit_pipelines:{project_id}:{sha}') if self.cache else None
+            if cached is not None:
+                by_sha[sha] = [GitLabRecord(**attrs) for attrs in cached]
+            else:
+                missing.append(sha)
+
+        if not missing:
+            return by_sha
+
+        path = self._full_path(project_id)
+        for start in range(0, len(missing), PIPELINE_BATCH_SIZE):
+            batch = missing[start:start + PIPELINE_BATCH_SIZE]
+
+            # first page only, like project.pipelines.list(sha=...)
+            params = ', '.join(f'$s{i}: String' for i in range(len(batch)))
+            fields = ' '.join(
+                f's{i}: pipelines(sha: $s{i}, first: 20) {{ {PIPELINE_FIELDS} }}'
+                for i in range(len(batch))
+            )
+            query = f'query($path: ID!, {params}) {{ project(fullPath: $path) {{ {fields} }} }}'
+            variables = {'path': path}
+            variables.update((f's{i}', sha) for i, sha in enumerate(batch))
+
+            try:
+                project_data = self._graphql(query, variables).get('project') or {}
+            except GraphQLComplexityError:
+                raise
+            except Exception as e:
+                # fallback: skip this batch
+                self._dropped('commit_pipelines', e)
+                continue
+
+            for i, sha in enumerate(batch):
+                nodes = (project_data.get(f's{i}') or {}).get('nodes') or []
+                pipelines = [_pipeline_record(node) for node in nodes]
+                by_sha[sha] = pipelines
+
+                if self.cache is not None:
+                    finished = bool(pipelines) and all(
+                        p.status in TERMINAL_PIPELINE_STATUSES for p in pipelines
+                    )
+                    self.cache.set(
+                        f'gql_commit_pipelines:{project_id}:{sha}',
+                        [p.attributes for p in pipelines],
+                        ttl_seconds=FINISHED_PIPELINE_TTL_SECONDS if finished else None
+                    )
+
+        return by_sha
+
+    @instrumented
+    def _fetch_bug_issues(self, project, project_id: str, file_path: Optional[str], updated_after: datetime) -> List:
+        """bug issues with time stats, 100 per query (search=null lists them all)"""
+        nodes = self._paginate(
+            ISSUES_QUERY,
+            {
+                'path': self._full_path(project_id),
+                'search': file_path,
+                'updatedAfter': updated_after.astimezone().isoformat()
+            },
+            'issues'
+        )
+        return [_issue_record(node) for node in nodes]
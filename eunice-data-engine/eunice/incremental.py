@@ -0,0 +1,297 @@
+"""incremental mr review - refresh only the files an mr touches, only since the last audit"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .cache import FAILED_PIPELINE_STATUSES, FULL_RELIST_INTERVAL, TERMINAL_PIPELINE_STATUSES, WATERMARK_OVERLAP
+from .commit_index import as_aware, parse_gitlab_datetime
+from .cost_calculator import (
+    EuniceConfig,
+    calculate_annual_velocity_cost,
+    calculate_roi,
+    estimate_fix_effort
+)
+from .gitlab_client import EuniceGitLabClient, GitLabRecord
+from .metrics_store import MetricsStore
+from .records import CommitRecord, IssueRecord, pipeline_attrs
+from .snapshot import AuditSnapshot
+
+
+def _empty_history() -> Dict:
+    return {'refreshed_at': None, 'relisted_at': None, 'commits': {}, 'mrs': {}, 'bugs': {}}
+
+
+class IncrementalReviewEngine:
+    """
+    per-file metrics and costs for an mr, starting from the audit snapshot
+
+    reality check: the mr-review flow used to pull 30 days of commits,
+    mrs, issues and pipelines for every changed file. here each file
+    starts from its snapshot history: only commits and bug issues newer
+    than the snapshot (minus WATERMARK_OVERLAP) are fetched, only those
+    commits are resolved to mrs and pipelines, and pipelines still
+    running at snapshot time are re-checked. every FULL_RELIST_INTERVAL a
+    file's whole window is listed and every pipeline re-checked instead,
+    for commits merged after the watermark and for retried pipelines. anything that slid out of
+    the window is dropped. files without a snapshot get a full window.
+    given a MetricsStore, every refresh also writes the window's daily
+    activity per file for the trend and impact reports.
+    """
+
+    def __init__(
+        self,
+        client: EuniceGitLabClient,
+        config: EuniceConfig,
+        snapshot: Optional[AuditSnapshot] = None,
+        since_days: int = 30,
+        metrics_store: Optional[MetricsStore] = None
+    ):
+        self.client = client
+        self.config = config
+        self.snapshot = snapshot or AuditSnapshot()
+        self.since_days = since_days
+        self.metrics_store = metrics_store
+
+    def changed_paths(self, project_id: str, mr_iid: int) -> List[str]:
+        """paths added or modified by an mr (deleted files carry no future cost)"""
+        project = self.client._get_project(project_id)
+
+        self.client._check_rate_limit()
+        changes = project.mergerequests.get(mr_iid, lazy=True).changes()
+
+        return list(dict.fromkeys(
+            change['new_path']
+            for change in changes.get('changes', [])
+            if not change.get('deleted_file')
+        ))
+
+    def refresh(self, project_id: str, paths: List[str]) -> Dict[str, Dict]:
+        """bring the histories of paths up to date and store them back in the snapshot"""
+        client = self.client
+        project = client._get_project(project_id)
+
+        now = datetime.now()
+        window_start = as_aware(now - timedelta(days=self.since_days))
+        histories = self.snapshot.load(project_id, paths, self.since_days)
+        fetched_since = {}
+        relisted = set()
+
+        # new commits per file
+        for path in paths:
+            history = histories.setdefault(path, _empty_history())
+
+            # histories recorded from a full audit count as a full listing
+            relisted_at = history.get('relisted_at', history['refreshed_at'])
+            if relisted_at and datetime.fromisoformat(relisted_at) > now - FULL_RELIST_INTERVAL:
+                refreshed_at = datetime.fromisoformat(history['refreshed_at'])
+                since = max(window_start, as_aware(refreshed_at - WATERMARK_OVERLAP))
+            else:
+                since = window_start
+                relisted.add(path)
+                history['relisted_at'] = now.isoformat()
+            fetched_since[path] = since
+
+            client._check_rate_limit()
+            listing = project.commits.list(
+                query_parameters={'path': path, 'since': since.isoformat()},
+                per_page=100,
+                iterator=True
+            )
+
+            for commit in client._stream(listing):
+                record = CommitRecord.from_object(commit)
+                history['commits'].setdefault(record.id, {
+                    'date': record.committed_date or record.created_at,
+                    'mr_iids': None,
+                    'pipelines': None
+                })
+
+        # slide the window
+        for history in histories.values():
+            history['commits'] = {
+                sha: commit for sha, commit in history['commits'].items()
+                if parse_gitlab_datetime(commit['date']) >= window_start
+            }
+
+        # resolve each new commit once, even when several files share it
+        commits_by_sha: Dict[str, List[Dict]] = {}
+        recheck = set()
+        for path, history in histories.items():
+            for sha, commit in history['commits'].items():
+                commits_by_sha.setdefault(sha, []).append(commit)
+                if path in relisted:
+                    recheck.add(sha)
+
+        mr_iids_by_sha = {}
+        stale_pipelines = []
+
+        for sha, commits in commits_by_sha.items():
+            known = [c['mr_iids'] for c in commits if c['mr_iids'] is not None]
+            if known:
+                mr_iids_by_sha[sha] = known[0]
+            else:
+                try:
+                    mr_iids_by_sha[sha] = client._merged_mr_iids(project, project_id, sha)
+                except Exception as e:
+                    # None, not []: the lookup is retried on the next update
+                    client._dropped('commit_mrs', e)
+                    mr_iids_by_sha[sha] = None
+
+            if sha in recheck or any(
+                c['pipelines'] is None or any(p['status'] not in TERMINAL_PIPELINE_STATUSES for p in c['pipelines'])
+                for c in commits
+            ):
+                stale_pipelines.append(sha)
+
+        pipelines_by_sha = client._pipelines_for_shas(project, project_id, stale_pipelines)
+
+        for sha, commits in commits_by_sha.items():
+            for commit in commits:
+                commit['mr_iids'] = mr_iids_by_sha[sha]
+                if sha in pipelines_by_sha:
+                    commit['pipelines'] = [pipeline_attrs(p) for p in pipelines_by_sha[sha]]
+
+        # review time of every mr not seen before
+        missing_mrs = set()
+        for history in histories.values():
+            for commit in history['commits'].values():
+                missing_mrs.update(
+                    iid for iid in commit['mr_iids'] or () if str(iid) not in history['mrs']
+                )
+
+        mrs = client._get_mrs(project, project_id, missing_mrs) if missing_mrs else {}
+
+        for history in histories.values():
+            referenced = {
+                str(iid) for commit in history['commits'].values() for iid in commit['mr_iids'] or ()
+            }
+            for iid, mr in mrs.items():
+                if str(iid) in referenced:
+                    history['mrs'][str(iid)] = client.calculate_mr_review_time(mr)
+            history['mrs'] = {iid: minutes for iid, minutes in history['mrs'].items() if iid in referenced}
+
+        # bug issues updated since the last refresh
+        for path, history in histories.items():
+            for issue in client._fetch_bug_issues(project, project_id, path, fetched_since[path]):
+                record = IssueRecord.from_object(issue)
+                history['bugs'][str(record.iid)] = {
+                    'updated_at': record.updated_at,
+                    'hours_spent': record.hours_spent
+                }
+
+            history['bugs'] = {
+                iid: bug for iid, bug in history['bugs'].items()
+                if bug['updated_at'] and parse_gitlab_datetime(bug['updated_at']) >= window_start
+            }
+            history['refreshed_at'] = now.isoformat()
+
+        self.snapshot.save(project_id, histories, self.since_days)
+        if self.metrics_store is not None:
+            self.metrics_store.record_histories(project_id, histories, window_start)
+        return histories
+
+    def record_audit(self, project_id: str, paths: List[str]) -> Dict[str, Dict]:
+        """refresh and snapshot every audited file, for the mr reviews that follow"""
+        histories = self.refresh(project_id, paths)
+        return {path: self.file_metrics(history) for path, history in histories.items()}
+
+    def record_metrics(self, project_id: str, metrics: Dict[str, Dict]) -> Dict[str, Dict]:
+        """
+        snapshot the histories returned by analyze_files(..., include_history=True)
+
+        for audits that already ran analyze_files over since_days: the
+        commits, mrs, pipelines and bug issues it fetched are stored as
+        they are, instead of fetched again by record_audit
+        """
+        missing = [path for path, file_metrics in metrics.items() if 'history' not in file_metrics]
+        if missing:
+            raise ValueError(f'no history for {", ".join(missing)}: call analyze_files with include_history=True')
+
+        histories = {path: file_metrics['history'] for path, file_metrics in metrics.items()}
+        if not histories:
+            return histories
+
+        self.snapshot.save(project_id, histories, self.since_days)
+        if self.metrics_store is not None:
+            refreshed_at = min(datetime.fromisoformat(h['refreshed_at']) for h in histories.values())
+            window_start = as_aware(refreshed_at - timedelta(days=self.since_days))
+            self.metrics_store.record_histories(project_id, histories, window_start)
+        return histories
+
+    def file_metrics(self, history: Dict) -> Dict:
+        """same shape as EuniceGitLabClient.analyze_files, from a history"""
+        commits = history['commits']
+        review_times = [minutes for minutes in history['mrs'].values() if minutes is not None]
+        bugs = {iid: bug for iid, bug in history['bugs'].items() if bug['hours_spent'] > 0}
+
+        pipelines = {}  # deduplicate by id
+        for commit in commits.values():
+            for pipeline in commit['pipelines'] or ():
+                pipelines[pipeline['id']] = GitLabRecord(**pipeline)
+
+        return {
+            'commit_count': len(commits),
+            'mr_iids': [int(iid) for iid in history['mrs']],
+            'review_times_minutes': review_times,
+            'avg_review_minutes': sum(review_times) / len(review_times) if review_times else 0,
+            'bug_hours': sum(bug['hours_spent'] for bug in bugs.values()),
+            'bug_issue_ids': [int(iid) for iid in bugs],
+            'pipeline_stats': self.client.calculate_pipeline_stats(pipelines.values()),
+            'ci_failure_count': len([p for p in pipelines.values() if p.status in FAILED_PIPELINE_STATUSES])
+        }
+
+    def review_mr(
+        self,
+        project_id: str,
+        mr_iid: int,
+        paths: Optional[List[str]] = None,
+        lines_of_code: Optional[Dict[str, int]] = None
+    ) -> Dict:
+        """
+        metrics, annual cost and (given lines_of_code) roi for every file an mr changes
+
+        paths overrides the mr diff, e.g. when the flow already has it.
+        when a webhook ingestion service (eunice.ingest) has fed the
+        metrics store for the whole window, files are read from the store
+        instead of refreshed - no api calls beyond the mr diff
+        """
+        started = time.perf_counter()
+        paths = paths if paths is not None else self.changed_paths(project_id, mr_iid)
+
+        ingested = self.metrics_store is not None and self.metrics_store.ingest_covers(self.since_days)
+        if ingested:
+            all_metrics = self.metrics_store.file_metrics(project_id, paths, self.since_days, source='webhooks')
+        else:
+            histories = self.refresh(project_id, paths)
+            all_metrics = {path: self.file_metrics(histories[path]) for path in paths}
+
+        # monthly rates from the window, like the flows' 30-day counts
+        per_month = 30 / self.since_days
+        files = {}
+
+        for path in paths:
+            metrics = all_metrics[path]
+            velocity_cost = calculate_annual_velocity_cost(
+                commit_count_monthly=metrics['commit_count'] * per_month,
+                avg_review_time_minutes=metrics['avg_review_minutes'],
+                bug_hours_tracked=metrics['bug_hours'],
+                ci_failure_count_monthly=metrics['ci_failure_count'] * per_month,
+                config=self.config,
+                bug_hours_window_days=self.since_days
+            )
+
+            file_result = {'metrics': metrics, 'velocity_cost': velocity_cost}
+            if lines_of_code and path in lines_of_code:
+                file_result['roi'] = calculate_roi(
+                    annual_savings=velocity_cost['annual_cost_usd'],
+                    effort_hours=estimate_fix_effort(lines_of_code[path], self.config),
+                    config=self.config
+                )
+            files[path] = file_result
+
+        return {
+            'mr_iid': mr_iid,
+            'files': files,
+            'source': 'webhooks' if ingested else 'api',
+            'elapsed_seconds': round(time.perf_counter() - started, 3)
+        }
@@ -0,0 +1,563 @@
+"""webhook ingestion - gitlab push, mr, pipeline and issue events into the local MetricsStore"""
+import asyncio
+import hmac
+import json
+import logging
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .cache import FAILED_PIPELINE_STATUSES, TERMINAL_PIPELINE_STATUSES
+from .commit_index import parse_gitlab_datetime
+from .issue_index import mentioned_paths
+from .metrics_store import METRICS, MetricsStore, day_number
+
+try:
+    import aiohttp
+    from aiohttp import web
+except ImportError:  # optional dependency: pip install eunice-data-engine[async]
+    aiohttp = web = None
+
+logger = logging.getLogger(__name__)
+
+# tries per batch before its events count as lost (1s, 2s apart)
+BATCH_ATTEMPTS = 3
+
+
+EVENTS = ('Push Hook', 'Merge Request Hook', 'Pipeline Hook', 'Issue Hook')
+
+_NULL_SHA = '0' * 40
+
+# gitlab's default closing pattern, simplified: "Closes #12", "fixes #3, #4 and #5"
+_CLOSING = re.compile(
+    r'\b(?:clos(?:e[sd]?|ing)|fix(?:e[sd]|ing)?|resolv(?:e[sd]?|ing)|implement(?:s|ed|ing)?):?'
+    r'\s+(#\d+(?:(?:\s*,\s*|\s+and\s+)#\d+)*)',
+    re.IGNORECASE
+)
+
+_SCHEMA = (
+    # every commit pushed to any branch: what it touched, for pipelines and mrs
+    """CREATE TABLE IF NOT EXISTS ingest_commits (
+        project_id TEXT NOT NULL,
+        sha TEXT NOT NULL,
+        day INTEGER NOT NULL,
+        paths TEXT NOT NULL,
+        PRIMARY KEY (project_id, sha)
+    ) WITHOUT ROWID""",
+    # commits on feature branches, until the branch's mr is merged
+    """CREATE TABLE IF NOT EXISTS ingest_branches (
+        project_id TEXT NOT NULL,
+        branch TEXT NOT NULL,
+        sha TEXT NOT NULL,
+        PRIMARY KEY (project_id, branch, sha)
+    ) WITHOUT ROWID""",
+    # what each commit / mr / pipeline / issue currently adds to the webhook rows
+    """CREATE TABLE IF NOT EXISTS ingest_entities (
+        project_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        ref TEXT,
+        inputs TEXT NOT NULL,
+        contribution TEXT NOT NULL,
+        PRIMARY KEY (project_id, kind, key)
+    ) WITHOUT ROWID""",
+    'CREATE INDEX IF NOT EXISTS ingest_entities_ref ON ingest_entities (project_id, ref)',
+    # paths an issue names, for issues that arrive before their file does
+    """CREATE TABLE IF NOT EXISTS ingest_mentions (
+        project_id TEXT NOT NULL,
+        path TEXT NOT NULL,
+        iid TEXT NOT NULL,
+        PRIMARY KEY (project_id, path, iid)
+    ) WITHOUT ROWID""",
+)
+
+
+def webhook_time(value: str) -> datetime:
+    """webhook timestamps: iso (2024-05-01T10:00:00Z) or gitlab's older `2024-05-01 10:00:00 UTC`"""
+    if value.endswith(' UTC'):
+        return datetime.fromisoformat(value[:-4].replace(' ', 'T')).replace(tzinfo=timezone.utc)
+    return parse_gitlab_datetime(value)
+
+
+def closed_issue_iids(description: Optional[str]) -> List[int]:
+    """issue iids an mr description closes (same-project references only)"""
+    iids = []
+    for match in _CLOSING.finditer(description or ''):
+        iids.extend(int(ref) for ref in re.findall(r'#(\d+)', match.group(1)))
+    return list(dict.fromkeys(iids))
+
+
+def _values(day: int, **metrics) -> List:
+    """[day, *values in METRICS order]"""
+    return [day] + [metrics.get(name, 0) for name in METRICS]
+
+
+class WebhookIngestor:
+    """
+    gitlab webhook events → per-file daily metrics, through an asyncio queue
+
+    reality check: a weekly audit starts with thousands of requests for
+    activity gitlab already announced, one webhook at a time. here push,
+    merge request, pipeline and issue events are queued as they arrive
+    and applied in batches (one sqlite transaction per batch_size events
+    or flush_interval seconds) to the MetricsStore, which then answers
+    audits and mr reviews without api calls (MetricsStore.file_metrics).
+
+    the counts match analyze_files: commits on the default branch per
+    file, review minutes of merged mrs over the files of their branch
+    commits, failed pipelines per commit, and hours of bug issues that
+    name a file or were closed by an mr touching it. every commit, mr,
+    pipeline and issue remembers what it added, so redelivered events
+    add nothing and updates (a pipeline finishing, hours logged on an
+    issue, a bug label removed) replace the old contribution.
+
+    limits: push events list at most 20 commits (the rest are counted in
+    stats['truncated_pushes']), and merge commits are recognised by
+    gitlab's default `Merge branch '...'` title.
+    """
+
+    def __init__(
+        self,
+        store: MetricsStore,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue: int = 10_000,
+        heartbeat_interval: float = 60.0
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.heartbeat_interval = heartbeat_interval
+        self.stats: Counter = Counter()
+        self.last_error: Optional[str] = None
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._run_id: Optional[int] = None
+        self._handlers = {
+            'Push Hook': self._push,
+            'Merge Request Hook': self._merge_request,
+            'Pipeline Hook': self._pipeline,
+            'Issue Hook': self._issue
+        }
+
+        with store.transaction() as db:
+            for statement in _SCHEMA:
+                db.execute(statement)
+
+    # service
+
+    async def start(self):
+        """start consuming (call from the running event loop)"""
+        self._queue = asyncio.Queue(self.max_queue)
+        self._run_id = await asyncio.to_thread(self.store.start_ingest_run)
+        self._task = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """apply everything already queued, then stop"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def submit(self, event: str, payload: Dict) -> bool:
+        """queue one delivery; False when the queue is full (answer 503, gitlab shows it failed)"""
+        try:
+            self._queue.put_nowait((event, payload))
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            return False
+        self.stats['received'] += 1
+        return True
+
+    def status(self) -> Dict:
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'running': self._task is not None and not self._task.done(),
+            'last_error': self.last_error,
+            **self.stats
+        }
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            batch = []
+            deadline = None
+
+            while len(batch) < self.batch_size:
+                timeout = self.heartbeat_interval if deadline is None else deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = loop.time() + self.flush_interval
+
+            # sqlite work off the loop, so deliveries keep being accepted;
+            # an empty batch is the idle heartbeat
+            for attempt in range(BATCH_ATTEMPTS):
+                try:
+                    await asyncio.to_thread(self.process, batch)
+                    break
+                except Exception as e:
+                    # the batch's transaction is rolled back
+                    error = e
+                    self.stats['batch_errors'] += 1
+                    self.last_error = f'{type(e).__name__}: {e}'
+                    if attempt + 1 < BATCH_ATTEMPTS:
+                        logger.warning('webhook batch of %d events failed, retrying: %s', len(batch), self.last_error)
+                        await asyncio.sleep(2 ** attempt)
+            else:
+                # gitlab got a 202 for these: the store must not claim the
+                # window is complete, so coverage starts again from now
+                logger.error('webhook batch of %d events lost', len(batch), exc_info=error)
+                self.stats['lost_events'] += len(batch)
+                self._run_id = await asyncio.to_thread(self._restart_run)
+
+    def _restart_run(self) -> int:
+        self.store.ingest_lost(self._run_id)
+        return self.store.start_ingest_run()
+
+    # processing
+
+    def process(self, events: Iterable[Tuple[str, Dict]]) -> int:
+        """apply a batch of (event type, payload) in one transaction; returns the events applied"""
+        deltas: Dict[str, Dict[str, Dict[int, List[float]]]] = {}  # project → path → day → values
+        counts: Counter = Counter()  # into stats once committed
+        applied = 0
+
+        with self.store.transaction() as db:
+            for event, payload in events:
+                handler = self._handlers.get(event)
+                project_id = str((payload.get('project') or {}).get('id') or payload.get('project_id') or '')
+                if handler is None or not project_id:
+                    counts['ignored'] += 1
+                    continue
+
+                changes: Dict[str, Dict[int, List[float]]] = {}
+                new_paths: Set[str] = set()
+
+                db.execute('SAVEPOINT event')
+                try:
+                    handler(db, project_id, payload, changes, new_paths)
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    # malformed payload: this event only
+                    db.execute('ROLLBACK TO event')
+                    db.execute('RELEASE event')
+                    counts['failed'] += 1
+                    continue
+                db.execute('RELEASE event')
+
+                # outside the savepoint: a rolled back file id must not stay cached
+                self.store.register_paths(project_id, new_paths)
+
+                project_deltas = deltas.setdefault(project_id, {})
+                for path, days in changes.items():
+                    for day, values in days.items():
+                        row = project_deltas.setdefault(path, {}).setdefault(day, [0] * len(METRICS))
+                        for i, value in enumerate(values):
+                            row[i] += value
+
+                applied += 1
+                counts[event] += 1
+
+            for project_id, days_by_path in deltas.items():
+                self.store.add(project_id, days_by_path)
+            if self._run_id is not None:
+                self.store.ingest_alive(self._run_id)
+
+        self.stats.update(counts)
+        self.stats['batches'] += bool(applied)
+        return applied
+
+    def _apply(self, db, project_id: str, kind: str, key, contribution: Dict[str, List], changes: Dict,
+               inputs: Optional[Dict] = None, ref: Optional[str] = None):
+        """replace an entity's contribution ({path: [day, *values]}) and record the difference"""
+        row = db.execute(
+            'SELECT contribution FROM ingest_entities WHERE project_id = ? AND kind = ? AND key = ?',
+            (project_id, kind, str(key))
+        ).fetchone()
+        previous = json.loads(row[0]) if row else {}
+
+        for sign, entries in ((-1, previous), (1, contribution)):
+            for path, (day, *values) in entries.items():
+                delta = changes.setdefault(path, {}).setdefault(day, [0] * len(METRICS))
+                for i, value in enumerate(values):
+                    delta[i] += sign * value
+
+        db.execute(
+            'INSERT OR REPLACE INTO ingest_entities VALUES (?, ?, ?, ?, ?, ?)',
+            (project_id, kind, str(key), ref, json.dumps(inputs or {}), json.dumps(contribution))
+        )
+
+    def _entity_inputs(self, db, project_id: str, kind: str, key) -> Optional[Dict]:
+        row = db.execute(
+            'SELECT inputs FROM ingest_entities WHERE project_id = ? AND kind = ? AND key = ?',
+            (project_id, kind, str(key))
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _commit(self, db, project_id: str, sha: str) -> Optional[Tuple[int, List[str]]]:
+        row = db.execute(
+            'SELECT day, paths FROM ingest_commits WHERE project_id = ? AND sha = ?', (project_id, sha)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _push(self, db, project_id: str, payload: Dict, changes: Dict, new_paths: Set[str]):
+        ref = payload['ref']
+        if not ref.startswith('refs/heads/') or payload.get('after') == _NULL_SHA:
+            return  # tags and branch deletions
+
+        branch = ref[len('refs/heads/'):]
+        default_branch = (payload.get('project') or {}).get('default_branch')
+        commits = payload.get('commits') or []
+        if (payload.get('total_commits_count') or 0) > len(commits):
+            self.stats['truncated_pushes'] += 1
+
+        for commit in commits:
+            sha = commit['id']
+            day = day_number(webhook_time(commit['timestamp']))
+            paths = list(dict.fromkeys(
+                (commit.get('added') or []) + (commit.get('modified') or []) + (commit.get('removed') or [])
+            ))
+
+            db.execute('INSERT OR IGNORE INTO ingest_commits VALUES (?, ?, ?, ?)', (project_id, sha, day, json.dumps(paths)))
+            unseen = set(paths) - set(self.store.known_paths(project_id, paths)) - new_paths
+            new_paths.update(paths)
+
+            if branch != default_branch:
+                db.execute('INSERT OR IGNORE INTO ingest_branches VALUES (?, ?, ?)', (project_id, branch, sha))
+            elif not (commit.get('title') or commit.get('message') or '').startswith("Merge branch '"):
+                self._apply(db, project_id, 'commit', sha, {p: _values(day, commits=1) for p in paths}, changes)
+
+            # pipelines that were delivered before their commit
+            for key, inputs in db.execute(
+                "SELECT key, inputs FROM ingest_entities WHERE project_id = ? AND ref = ? AND kind = 'pipeline'",
+                (project_id, sha)
+            ).fetchall():
+                inputs = json.loads(inputs)
+                self._apply(db, project_id, 'pipeline', key, self._pipeline_contribution(paths, inputs), changes,
+                            inputs, ref=sha)
+
+            # issues naming a file nobody had pushed yet
+            if unseen:
+                placeholders = ', '.join('?' * len(unseen))
+                iids = db.execute(
+                    f'SELECT DISTINCT iid FROM ingest_mentions WHERE project_id = ? AND path IN ({placeholders})',
+                    (project_id, *unseen)
+                ).fetchall()
+                for (iid,) in iids:
+                    self._update_issue(db, project_id, iid, changes, new_paths)
+
+    def _merge_request(self, db, project_id: str, payload: Dict, changes: Dict, new_paths: Set[str]):
+        mr = payload['object_attributes']
+        if mr.get('action') != 'merge' or self._entity_inputs(db, project_id, 'mr', mr['iid']) is not None:
+            return  # only the merge counts, once
+
+        created = webhook_time(mr['created_at'])
+        merged = webhook_time(mr.get('merged_at') or mr['updated_at'])
+        minutes = (merged - created).total_seconds() / 60
+
+        # each file's review lands on the day of the mr's last commit to it
+        last_day: Dict[str, int] = {}
+        shas = db.execute(
+            'SELECT sha FROM ingest_branches WHERE project_id = ? AND branch = ?', (project_id, mr['source_branch'])
+        ).fetchall()
+        for (sha,) in shas:
+            commit = self._commit(db, project_id, sha)
+            if commit is not None:
+                day, paths = commit
+                for path in paths:
+                    last_day[path] = max(last_day.get(path, 0), day)
+
+        contribution = {path: _values(day, reviews=1, review_minutes=minutes) for path, day in last_day.items()}
+        self._apply(db, project_id, 'mr', mr['iid'], contribution, changes, {'review_minutes': minutes})
+        db.execute('DELETE FROM ingest_branches WHERE project_id = ? AND branch = ?', (project_id, mr['source_branch']))
+
+        # bugs this mr closes also count against the files it changed
+        for iid in closed_issue_iids(mr.get('description')):
+            inputs = self._entity_inputs(db, project_id, 'issue', iid) or {}
+            inputs['fixed'] = sorted(set(inputs.get('fixed', [])) | set(last_day))
+            self._update_issue(db, project_id, iid, changes, new_paths, inputs)
+
+    @staticmethod
+    def _pipeline_contribution(paths: List[str], inputs: Dict) -> Dict[str, List]:
+        values = _values(
+            inputs['day'],
+            pipelines=1,
+            pipeline_seconds=inputs['duration'],
+            failures=int(inputs['status'] in FAILED_PIPELINE_STATUSES)
+        )
+        return {path: values for path in paths}
+
+    def _pipeline(self, db, project_id: str, payload: Dict, changes: Dict, new_paths: Set[str]):
+        pipeline = payload['object_attributes']
+        sha = pipeline['sha']
+
+        previous = self._entity_inputs(db, project_id, 'pipeline', pipeline['id'])
+        if (
+            previous is not None
+            and previous['status'] in TERMINAL_PIPELINE_STATUSES
+            and pipeline['status'] not in TERMINAL_PIPELINE_STATUSES
+        ):
+            return  # a late `running` delivery; a retry reports again when it finishes
+
+        inputs = {
+            'day': day_number(webhook_time(pipeline['created_at'])),
+            'status': pipeline['status'],
+            'duration': pipeline.get('duration') or 0
+        }
+        commit = self._commit(db, project_id, sha)
+        paths = commit[1] if commit is not None else []  # filled in when the push arrives
+        self._apply(db, project_id, 'pipeline', pipeline['id'], self._pipeline_contribution(paths, inputs), changes,
+                    inputs, ref=sha)
+
+    def _issue(self, db, project_id: str, payload: Dict, changes: Dict, new_paths: Set[str]):
+        issue = payload['object_attributes']
+        iid = issue['iid']
+        labels = {label['title'] if isinstance(label, dict) else label for label in payload.get('labels') or []}
+        mentioned = mentioned_paths(f"{issue.get('title') or ''}\n{issue.get('description') or ''}")
+
+        inputs = self._entity_inputs(db, project_id, 'issue', iid) or {}
+        inputs.update(
+            bug='bug' in labels,
+            day=day_number(webhook_time(issue['updated_at'])),
+            hours=(issue.get('total_time_spent') or 0) / 3600,
+            mentioned=sorted(mentioned)
+        )
+
+        db.execute('DELETE FROM ingest_mentions WHERE project_id = ? AND iid = ?', (project_id, str(iid)))
+        db.executemany(
+            'INSERT OR IGNORE INTO ingest_mentions VALUES (?, ?, ?)',
+            [(project_id, path, str(iid)) for path in mentioned]
+        )
+        self._update_issue(db, project_id, iid, changes, new_paths, inputs)
+
+    def _update_issue(self, db, project_id: str, iid, changes: Dict, new_paths: Set[str], inputs: Optional[Dict] = None):
+        """recompute an issue's bug hours from its inputs and the files known so far"""
+        if inputs is None:
+            inputs = self._entity_inputs(db, project_id, 'issue', iid) or {}
+
+        contribution = {}
+        if inputs.get('bug') and inputs.get('hours', 0) > 0:
+            mentioned = inputs.get('mentioned', [])
+            paths = set(self.store.known_paths(project_id, mentioned)) | (new_paths & set(mentioned))
+            paths.update(inputs.get('fixed', []))
+            contribution = {path: _values(inputs['day'], bug_hours=inputs['hours']) for path in paths}
+
+        self._apply(db, project_id, 'issue', iid, contribution, changes, inputs)
+
+
+# http
+
+def webhook_app(ingestor: WebhookIngestor, secret: Optional[str] = None) -> 'web.Application':
+    """
+    aiohttp app: POST /webhook (gitlab deliveries), GET /healthz (queue and counters)
+
+    secret is the hook's secret token, compared to X-Gitlab-Token
+    """
+    if web is None:
+        raise ImportError('the webhook service needs aiohttp: pip install eunice-data-engine[async]')
+
+    async def receive(request):
+        if secret is not None and not hmac.compare_digest(request.headers.get('X-Gitlab-Token', ''), secret):
+            return web.json_response({'message': 'invalid token'}, status=401)
+
+        event = request.headers.get('X-Gitlab-Event', '')
+        try:
+            payload = await request.json()
+        except ValueError:
+            return web.json_response({'message': 'invalid json'}, status=400)
+
+        if event not in EVENTS:
+            ingestor.stats['ignored'] += 1
+            return web.json_response({'queued': False}, status=202)
+        if not ingestor.submit(event, payload):
+            return web.json_response({'message': 'queue full'}, status=503)
+        return web.json_response({'queued': True}, status=202)
+
+    async def health(request):
+        return web.json_response(ingestor.status())
+
+    async def on_startup(app):
+        await ingestor.start()
+
+    async def on_cleanup(app):
+        await ingestor.stop()
+
+    app = web.Application(client_max_size=25 * 1024 ** 2)  # gitlab caps payloads at 25 MB
+    app.router.add_post('/webhook', receive)
+    app.router.add_get('/healthz', health)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def serve(store: MetricsStore, host: str = '0.0.0.0', port: int = 8090, secret: Optional[str] = None, **kwargs):
+    """run the ingestion service until interrupted (kwargs go to WebhookIngestor)"""
+    if web is None:
+        raise ImportError('the webhook service needs aiohttp: pip install eunice-data-engine[async]')
+    web.run_app(webhook_app(WebhookIngestor(store, **kwargs), secret), host=host, port=port, print=None)
+
+
+# replay
+
+def load_events(path: str) -> Iterator[Tuple[str, Dict]]:
+    """recorded deliveries, one json object per line: {"event": "Push Hook", "payload": {...}}"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['event'], record['payload']
+
+
+def dump_events(events: Iterable[Tuple[str, Dict]], path: str) -> int:
+    count = 0
+    with open(path, 'w') as f:
+        for event, payload in events:
+            f.write(json.dumps({'event': event, 'payload': payload}) + '\n')
+            count += 1
+    return count
+
+
+async def replay(url: str, events: Iterable[Tuple[str, Dict]], secret: Optional[str] = None,
+                 retries: int = 10) -> Dict:
+    """
+    post deliveries to a running service in order, like gitlab would
+
+    503s (queue full) are retried with backoff, so a replay also
+    exercises the service's backpressure
+    """
+    if aiohttp is None:
+        raise ImportError('replay needs aiohttp: pip install eunice-data-engine[async]')
+
+    headers = {'X-Gitlab-Token': secret} if secret is not None else {}
+    endpoint = url.rstrip('/') + '/webhook'
+    stats: Counter = Counter()
+    started = time.perf_counter()
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        for event, payload in events:
+            for attempt in range(retries + 1):
+                async with session.post(endpoint, json=payload, headers={'X-Gitlab-Event': event}) as resp:
+                    await resp.read()
+                    if resp.status != 503 or attempt == retries:
+                        stats[str(resp.status)] += 1
+                        break
+                stats['retried'] += 1
+                await asyncio.sleep(min(0.05 * 2 ** attempt, 2.0))
+
+    return {'sent': sum(v for k, v in stats.items() if k != 'retried'), 'seconds': round(time.perf_counter() - started, 3),
+            'responses': dict(stats)}
@@ -0,0 +1,579 @@
+"""request-level instrumentation for the gitlab clients - counters, latency histograms, exports"""
+import functools
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+
+# seconds; prometheus-style upper bounds, +Inf is implied
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# functions kept per profile summary
+PROFILE_TOP = 30
+
+_NUMERIC = re.compile(r'^\d+$')
+
+
+def endpoint_template(url: str) -> str:
+    """
+    low-cardinality label for a request url
+
+    /api/v4/projects/group%2Fapp/repository/commits/3f2a.../merge_requests
+    → /projects/:id/repository/commits/:sha/merge_requests
+    """
+    path = urlsplit(url).path
+    if '/api/v4/' in path:
+        path = path.split('/api/v4', 1)[1]
+    elif path.endswith('/api/graphql'):
+        return '/graphql'
+
+    parts = []
+    previous = None
+    for part in path.split('/'):
+        if previous == 'projects' or _NUMERIC.match(part):
+            part = ':id'
+        elif previous == 'commits':
+            part = ':sha'
+        elif previous == 'files':
+            part = ':path'
+        parts.append(part)
+        previous = part
+
+    return '/'.join(parts)
+
+
+class Histogram:
+    """fixed-bucket histogram (cumulative on export, like prometheus)"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> Dict:
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            running += count
+            cumulative[f'{bound:g}' if bound != '+Inf' else bound] = running
+
+        return {'count': self.count, 'sum': round(self.sum, 6), 'buckets': cumulative}
+
+
+def _merge_histogram(into: Optional[Dict], other: Dict) -> Dict:
+    if into is None:
+        return {'count': other['count'], 'sum': other['sum'], 'buckets': dict(other['buckets'])}
+
+    into['count'] += other['count']
+    into['sum'] = round(into['sum'] + other['sum'], 6)
+    for bound, count in other['buckets'].items():
+        into['buckets'][bound] = into['buckets'].get(bound, 0) + count
+    return into
+
+
+class Instrumentation:
+    """
+    where an audit's time goes: per-method calls and latency, http
+    requests by endpoint, rate limit sleeps, retries, cache hit ratios,
+    bytes - and which items were dropped because a lookup failed
+
+    reality check: spans cost two perf_counter calls and a lock, noise
+    next to a gitlab round trip, so every client carries one. method
+    times are inclusive - analyze_files contains the _merged_mr_iids
+    and _pipelines_for_shas spans it triggers. iterators are timed
+    until exhausted, including the caller's work between items.
+
+    profile=True runs cProfile while any span is open (one profiler per
+    process; under python < 3.12 it sees only the thread that opened
+    the outermost span). tracer takes an opentelemetry tracer - every
+    span is mirrored as eunice.<method>.
+    """
+
+    def __init__(self, profile: bool = False, tracer=None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.profile = profile
+        self.tracer = tracer
+        self.buckets = tuple(buckets)
+        self.caches: List = []
+
+        self._lock = threading.Lock()
+        self._methods: Dict[str, List] = {}  # name → [calls, errors, histogram]
+        self._requests: Dict[Tuple[str, int], int] = {}
+        self._request_seconds: Dict[str, Histogram] = {}
+        self._bytes: Dict[str, List[int]] = {}  # endpoint → [received, sent]
+        self._rate_limit = [0, 0, Histogram(buckets)]  # acquires, waits, sleep histogram
+        self._retries: Dict[str, int] = {}  # reason (status or error) → retries
+        self._retry_sleep = Histogram(buckets)
+        self._dropped: Dict[Tuple[str, str], int] = {}  # (method, error type) → items skipped
+
+        self._open_spans = 0
+        self._profiler = None       # cProfile.Profile while spans are open
+        self._profile_stats = None  # pstats.Stats across finished spans
+
+    def track_cache(self, cache):
+        """include a ResponseCache's per-kind hit ratios in exports"""
+        if cache is not None and cache not in self.caches:
+            self.caches.append(cache)
+
+    # recording
+
+    @contextmanager
+    def span(self, name: str, profile: bool = True):
+        """time a block as method `name`; profile=False for asyncio tasks"""
+        profile = profile and self.profile
+
+        with ExitStack() as stack:
+            if self.tracer is not None:
+                stack.enter_context(self.tracer.start_as_current_span(f'eunice.{name}'))
+            if profile:
+                self._start_profile()
+                stack.callback(self._stop_profile)
+
+            started = time.perf_counter()
+            failed = False
+            try:
+                yield
+            except BaseException as e:
+                # generators closed early are not failures
+                failed = not isinstance(e, GeneratorExit)
+                raise
+            finally:
+                self._observe_method(name, time.perf_counter() - started, failed)
+
+    def _observe_method(self, name: str, seconds: float, failed: bool):
+        with self._lock:
+            method = self._methods.get(name)
+            if method is None:
+                method = self._methods[name] = [0, 0, Histogram(self.buckets)]
+            method[0] += 1
+            method[1] += failed
+            method[2].observe(seconds)
+
+    def record_request(self, endpoint: str, status: int, seconds: float, received: int = 0, sent: int = 0):
+        """one http exchange; endpoint should come from endpoint_template"""
+        with self._lock:
+            key = (endpoint, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            histogram = self._request_seconds.get(endpoint)
+            if histogram is None:
+                histogram = self._request_seconds[endpoint] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+            transferred = self._bytes.setdefault(endpoint, [0, 0])
+            transferred[0] += received
+            transferred[1] += sent
+
+    def record_response(self, response, **kwargs):
+        """record a requests.Response (usable as a session response hook)"""
+        request = response.request
+        length = response.headers.get('Content-Length')
+
+        if length is not None and length.isdigit():
+            received = int(length)  # wire size, compressed if gzipped
+        elif not kwargs.get('stream'):
+            received = len(response.content)
+        else:
+            received = 0  # streamed without a length: do not consume it here
+
+        body = getattr(request, 'body', None)
+        self.record_request(
+            endpoint_template(response.url or request.url),
+            response.status_code,
+            response.elapsed.total_seconds(),
+            received=received,
+            sent=len(body) if body else 0
+        )
+
+    def record_rate_limit(self, slept: float):
+        with self._lock:
+            self._rate_limit[0] += 1
+            if slept > 0:
+                self._rate_limit[1] += 1
+                self._rate_limit[2].observe(slept)
+
+    def record_retry(self, reason: str, delay: float):
+        """one resend by the transport: reason is the status code or error type"""
+        with self._lock:
+            self._retries[reason] = self._retries.get(reason, 0) + 1
+            self._retry_sleep.observe(delay)
+
+    def record_dropped(self, method: str, error: BaseException):
+        """
+        an item left out of a result because its lookup failed
+
+        reality check: per-commit and per-mr lookups skip failures so one
+        bad commit does not sink a whole audit - but the results are then
+        incomplete, and that has to show up somewhere
+        """
+        with self._lock:
+            key = (method, type(error).__name__)
+            self._dropped[key] = self._dropped.get(key, 0) + 1
+
+    # profiling
+
+    def _start_profile(self):
+        with self._lock:
+            self._open_spans += 1
+            if self._open_spans > 1:
+                return
+
+            import cProfile  # only when profiling
+
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                return  # another profiler is already active
+            self._profiler = profiler
+
+    def _stop_profile(self):
+        with self._lock:
+            self._open_spans -= 1
+            if self._open_spans or self._profiler is None:
+                return
+
+            profiler, self._profiler = self._profiler, None
+            profiler.disable()
+
+            import pstats
+
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(profiler)
+            else:
+                self._profile_stats.add(profiler)
+
+    def profile_summary(self, limit: int = PROFILE_TOP) -> List[Dict]:
+        """functions with the most cumulative time across all profiled spans"""
+        with self._lock:
+            stats = self._profile_stats
+            if stats is None:
+                return []
+
+            rows = [
+                {
+                    'function': f'{path}:{line}({name})',
+                    'calls': calls,
+                    'own_seconds': round(own, 6),
+                    'cumulative_seconds': round(cumulative, 6)
+                }
+                for (path, line, name), (_, calls, own, cumulative, _) in stats.stats.items()
+                if path != __file__  # the span wrappers themselves
+            ]
+
+        rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+        return rows[:limit]
+
+    def dump_profile(self, path: str):
+        """write the accumulated profile for pstats / snakeviz"""
+        with self._lock:
+            if self._profile_stats is not None:
+                self._profile_stats.dump_stats(path)
+
+    # export
+
+    def to_dict(self) -> Dict:
+        """json-serializable snapshot (cumulative since creation or reset)"""
+        with self._lock:
+            methods = {
+                name: {'calls': calls, 'errors': errors, 'seconds': histogram.to_dict()}
+                for name, (calls, errors, histogram) in sorted(self._methods.items())
+            }
+
+            http = {}
+            for endpoint, histogram in sorted(self._request_seconds.items()):
+                received, sent = self._bytes.get(endpoint, (0, 0))
+                http[endpoint] = {
+                    'requests': {
+                        str(status): count
+                        for (name, status), count in sorted(self._requests.items())
+                        if name == endpoint
+                    },
+                    'seconds': histogram.to_dict(),
+                    'bytes_received': received,
+                    'bytes_sent': sent
+                }
+
+            acquires, waits, sleeps = self._rate_limit
+            rate_limit = {'acquires': acquires, 'waits': waits, 'sleep_seconds': sleeps.to_dict()}
+            retries = {'by_reason': dict(sorted(self._retries.items())), 'sleep_seconds': self._retry_sleep.to_dict()}
+
+            dropped: Dict[str, Dict[str, int]] = {}
+            for (method, error), count in sorted(self._dropped.items()):
+                dropped.setdefault(method, {})[error] = count
+
+        snapshot = {
+            'methods': methods,
+            'http': http,
+            'rate_limit': rate_limit,
+            'retries': retries,
+            'dropped': dropped,
+            'cache': merge_cache_stats(cache.stats_by_kind() for cache in self.caches)
+        }
+        if self.profile:
+            snapshot['profile'] = self.profile_summary()
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        return prometheus_text(self.to_dict())
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+            self._requests.clear()
+            self._request_seconds.clear()
+            self._bytes.clear()
+            self._rate_limit = [0, 0, Histogram(self.buckets)]
+            self._retries.clear()
+            self._retry_sleep = Histogram(self.buckets)
+            self._dropped.clear()
+            self._profile_stats = None
+
+
+def instrumented(method):
+    """
+    run a client method inside self.instrumentation.span(<method name>)
+
+    works for plain methods, generators and coroutines; a client without
+    an instrumentation attribute runs the method bare
+    """
+    import inspect  # class-definition time of the clients only
+
+    name = method.__name__
+
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = getattr(self, 'instrumentation', None)
+            if instrumentation is None:
+                return (yield from method(self, *args, **kwargs))
+            with instrumentation.span(name):
+                return (yield from method(self, *args, **kwargs))
+
+    elif inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            instrumentation = getattr(self, 'instrumentation', None)
+            if instrumentation is None:
+                return await method(self, *args, **kwargs)
+            # tasks interleave: a process-wide profiler would mix them up
+            with instrumentation.span(name, profile=False):
+                return await method(self, *args, **kwargs)
+
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = getattr(self, 'instrumentation', None)
+            if instrumentation is None:
+                return method(self, *args, **kwargs)
+            with instrumentation.span(name):
+                return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def merge_cache_stats(per_cache: Iterable[Dict[str, Dict]]) -> Dict[str, Dict]:
+    """sum per-kind hit/miss counts and recompute the ratios"""
+    merged: Dict[str, Dict] = {}
+    for stats in per_cache:
+        for kind, counts in stats.items():
+            entry = merged.setdefault(kind, {'hits': 0, 'misses': 0})
+            entry['hits'] += counts['hits']
+            entry['misses'] += counts['misses']
+
+    for entry in merged.values():
+        lookups = entry['hits'] + entry['misses']
+        entry['hit_ratio'] = round(entry['hits'] / lookups, 3) if lookups else 0
+    return dict(sorted(merged.items()))
+
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict:
+    """
+    combine to_dict() snapshots, e.g. one per audit worker process
+
+    counts, sums and histogram buckets add up; profile rows are summed
+    per function and re-ranked
+    """
+    merged = {
+        'methods': {},
+        'http': {},
+        'rate_limit': None,
+        'retries': {'by_reason': {}, 'sleep_seconds': None},
+        'dropped': {},
+        'cache': {}
+    }
+    caches = []
+    profile: Dict[str, Dict] = {}
+    profiled = False
+
+    for snapshot in snapshots:
+        for name, method in snapshot['methods'].items():
+            into = merged['methods'].setdefault(name, {'calls': 0, 'errors': 0, 'seconds': None})
+            into['calls'] += method['calls']
+            into['errors'] += method['errors']
+            into['seconds'] = _merge_histogram(into['seconds'], method['seconds'])
+
+        for endpoint, http in snapshot['http'].items():
+            into = merged['http'].setdefault(
+                endpoint, {'requests': {}, 'seconds': None, 'bytes_received': 0, 'bytes_sent': 0}
+            )
+            for status, count in http['requests'].items():
+                into['requests'][status] = into['requests'].get(status, 0) + count
+            into['seconds'] = _merge_histogram(into['seconds'], http['seconds'])
+            into['bytes_received'] += http['bytes_received']
+            into['bytes_sent'] += http['bytes_sent']
+
+        rate_limit = snapshot['rate_limit']
+        if merged['rate_limit'] is None:
+            merged['rate_limit'] = {'acquires': 0, 'waits': 0, 'sleep_seconds': None}
+        merged['rate_limit']['acquires'] += rate_limit['acquires']
+        merged['rate_limit']['waits'] += rate_limit['waits']
+        merged['rate_limit']['sleep_seconds'] = _merge_histogram(
+            merged['rate_limit']['sleep_seconds'], rate_limit['sleep_seconds']
+        )
+
+        retries = snapshot.get('retries') or {'by_reason': {}, 'sleep_seconds': None}
+        for reason, count in retries['by_reason'].items():
+            merged['retries']['by_reason'][reason] = merged['retries']['by_reason'].get(reason, 0) + count
+        if retries['sleep_seconds'] is not None:
+            merged['retries']['sleep_seconds'] = _merge_histogram(
+                merged['retries']['sleep_seconds'], retries['sleep_seconds']
+            )
+
+        for method, errors in (snapshot.get('dropped') or {}).items():
+            into = merged['dropped'].setdefault(method, {})
+            for error, count in errors.items():
+                into[error] = into.get(error, 0) + count
+
+        caches.append(snapshot['cache'])
+
+        if 'profile' in snapshot:
+            profiled = True
+            for row in snapshot['profile']:
+                into = profile.setdefault(
+                    row['function'],
+                    {'function': row['function'], 'calls': 0, 'own_seconds': 0.0, 'cumulative_seconds': 0.0}
+                )
+                into['calls'] += row['calls']
+                into['own_seconds'] = round(into['own_seconds'] + row['own_seconds'], 6)
+                into['cumulative_seconds'] = round(into['cumulative_seconds'] + row['cumulative_seconds'], 6)
+
+    if merged['rate_limit'] is None:
+        merged['rate_limit'] = {'acquires': 0, 'waits': 0, 'sleep_seconds': Histogram().to_dict()}
+    if merged['retries']['sleep_seconds'] is None:
+        merged['retries']['sleep_seconds'] = Histogram().to_dict()
+    merged['cache'] = merge_cache_stats(caches)
+
+    if profiled:
+        merged['profile'] = sorted(
+            profile.values(), key=lambda row: row['cumulative_seconds'], reverse=True
+        )[:PROFILE_TOP]
+    return merged
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _histogram_lines(metric: str, histogram: Dict, **labels) -> List[str]:
+    lines = [
+        f'{metric}_bucket{_labels(**labels, le=bound)} {count}'
+        for bound, count in histogram['buckets'].items()
+    ]
+    lines.append(f'{metric}_sum{_labels(**labels) if labels else ""} {histogram["sum"]}')
+    lines.append(f'{metric}_count{_labels(**labels) if labels else ""} {histogram["count"]}')
+    return lines
+
+
+def prometheus_text(snapshot: Dict) -> str:
+    """
+    prometheus text exposition of a to_dict() / merge_snapshots() snapshot
+
+    reality check: meant for a node_exporter textfile collector or a
+    pushgateway after each audit - eunice runs as a batch job, not a
+    long-lived server to scrape
+    """
+    out = []
+
+    def family(name: str, kind: str, help_text: str, lines: List[str]):
+        out.append(f'# HELP {name} {help_text}')
+        out.append(f'# TYPE {name} {kind}')
+        out.extend(lines)
+
+    methods = snapshot['methods']
+    family('eunice_method_calls_total', 'counter', 'client method calls', [
+        f'eunice_method_calls_total{_labels(method=name)} {m["calls"]}' for name, m in methods.items()
+    ])
+    family('eunice_method_errors_total', 'counter', 'client method calls that raised', [
+        f'eunice_method_errors_total{_labels(method=name)} {m["errors"]}' for name, m in methods.items()
+    ])
+    family('eunice_method_duration_seconds', 'histogram', 'client method wall time (inclusive)', [
+        line for name, m in methods.items()
+        for line in _histogram_lines('eunice_method_duration_seconds', m['seconds'], method=name)
+    ])
+
+    http = snapshot['http']
+    family('eunice_http_requests_total', 'counter', 'gitlab api requests by endpoint and status', [
+        f'eunice_http_requests_total{_labels(endpoint=endpoint, status=status)} {count}'
+        for endpoint, h in http.items() for status, count in h['requests'].items()
+    ])
+    family('eunice_http_request_duration_seconds', 'histogram', 'gitlab api response time', [
+        line for endpoint, h in http.items()
+        for line in _histogram_lines('eunice_http_request_duration_seconds', h['seconds'], endpoint=endpoint)
+    ])
+    family('eunice_http_response_bytes_total', 'counter', 'response bytes received', [
+        f'eunice_http_response_bytes_total{_labels(endpoint=endpoint)} {h["bytes_received"]}'
+        for endpoint, h in http.items()
+    ])
+    family('eunice_http_request_bytes_total', 'counter', 'request body bytes sent', [
+        f'eunice_http_request_bytes_total{_labels(endpoint=endpoint)} {h["bytes_sent"]}'
+        for endpoint, h in http.items()
+    ])
+
+    rate_limit = snapshot['rate_limit']
+    family('eunice_rate_limit_acquires_total', 'counter', 'rate limit tokens taken', [
+        f'eunice_rate_limit_acquires_total {rate_limit["acquires"]}'
+    ])
+    family('eunice_rate_limit_waits_total', 'counter', 'token requests that had to sleep', [
+        f'eunice_rate_limit_waits_total {rate_limit["waits"]}'
+    ])
+    family('eunice_rate_limit_sleep_seconds', 'histogram', 'time slept waiting for the rate limit',
+           _histogram_lines('eunice_rate_limit_sleep_seconds', rate_limit['sleep_seconds']))
+
+    retries = snapshot.get('retries') or {'by_reason': {}, 'sleep_seconds': Histogram().to_dict()}
+    family('eunice_http_retries_total', 'counter', 'requests resent after a 429, 5xx or connection error', [
+        f'eunice_http_retries_total{_labels(reason=reason)} {count}'
+        for reason, count in retries['by_reason'].items()
+    ])
+    family('eunice_http_retry_sleep_seconds', 'histogram', 'backoff slept before resending',
+           _histogram_lines('eunice_http_retry_sleep_seconds', retries['sleep_seconds']))
+
+    family('eunice_dropped_items_total', 'counter', 'items left out of results because their lookup failed', [
+        f'eunice_dropped_items_total{_labels(method=method, error=error)} {count}'
+        for method, errors in (snapshot.get('dropped') or {}).items() for error, count in errors.items()
+    ])
+
+    cache = snapshot['cache']
+    family('eunice_cache_lookups_total', 'counter', 'response cache lookups by key kind', [
+        f'eunice_cache_lookups_total{_labels(kind=kind, result=result)} {c[field]}'
+        for kind, c in cache.items() for result, field in (('hit', 'hits'), ('miss', 'misses'))
+    ])
+    family('eunice_cache_hit_ratio', 'gauge', 'response cache hit ratio by key kind', [
+        f'eunice_cache_hit_ratio{_labels(kind=kind)} {c["hit_ratio"]}' for kind, c in cache.items()
+    ])
+
+    return '\n'.join(out) + '\n'
@@ -0,0 +1,112 @@
+"""project-wide bug issue index - list bug issues once, answer per-file bug hours locally"""
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .commit_index import as_aware, parse_gitlab_datetime
+
+
+# what ends a path mention: whitespace, quotes, brackets, markdown and
+# line references (auth.py:42, auth.py#L42)
+_MENTION_SPLIT = re.compile(r'[\s`\'"()\[\]{}<>,;:|*#!?]+')
+_LEADING_SLASHES = re.compile(r'^(?:\.?/)+')  # ./src/x.py, /src/x.py
+
+
+def mentioned_paths(text: Optional[str]) -> Set[str]:
+    """
+    path-like tokens in an issue text, with every shorter path suffix
+
+    reality check: `fails in src/auth/login.py:42` is indexed under
+    src/auth/login.py, auth/login.py and login.py - the same files a
+    per-file `search=` query for any of them would have matched. only
+    tokens with a `/` or `.` count as paths, so bare names like Makefile
+    are not matched.
+    """
+    paths = set()
+    for token in _MENTION_SPLIT.split(text or ''):
+        token = _LEADING_SLASHES.sub('', token.rstrip('.'))
+        if '/' not in token and '.' not in token:
+            continue
+
+        while token:
+            paths.add(token)
+            _, _, token = token.partition('/')
+    return paths
+
+
+def issue_updated_at(issue) -> datetime:
+    return parse_gitlab_datetime(issue.updated_at)
+
+
+class BugIssueIndex:
+    """
+    map file path → bug issues for one project over a time window
+
+    reality check: `issues.list(search=file_path)` per file is a slow
+    full-text search on the server, one request per file, and it misses
+    bugs whose text never names the file. the index lists every bug issue
+    in the window once and links each issue to the paths its title and
+    description mention plus the files changed by the merged mrs that
+    closed it. per-file bug hours are then a dict lookup.
+    """
+
+    def __init__(self, project_id: str, since: datetime):
+        self.project_id = str(project_id)
+        self.since = as_aware(since)
+        self.issues: Dict[int, object] = {}              # iid → issue
+        self.paths_by_issue: Dict[int, Set[str]] = {}    # iid → mentioned and fixed paths
+        self.iids_by_path: Dict[str, List[int]] = {}     # path → iids, in listing order
+        self.closing_mr_iids: Dict[int, List[int]] = {}  # iid → merged mrs that closed it
+
+    def __len__(self) -> int:
+        return len(self.issues)
+
+    def add(self, issue, fixed_paths: Iterable[str] = ()):
+        """record an issue under the paths it mentions and the paths its closing mrs changed"""
+        iid = issue.iid
+        if iid in self.issues:
+            return
+
+        text = f'{issue.title or ""}\n{getattr(issue, "description", None) or ""}'
+        paths = mentioned_paths(text)
+        paths.update(p for p in fixed_paths if p)
+
+        self.issues[iid] = issue
+        self.paths_by_issue[iid] = paths
+
+        for path in paths:
+            self.iids_by_path.setdefault(path, []).append(iid)
+
+    def covers(self, since: datetime) -> bool:
+        """true if the index window reaches back at least to `since`"""
+        return self.since <= as_aware(since)
+
+    def issues_for(self, file_path: str, since: Optional[datetime] = None) -> List:
+        """bug issues linked to a file, optionally narrowed to those updated after `since`"""
+        issues = [self.issues[iid] for iid in self.iids_by_path.get(file_path, [])]
+
+        if since is None or as_aware(since) <= self.since:
+            return issues
+
+        cutoff = as_aware(since)
+        return [i for i in issues if issue_updated_at(i) >= cutoff]
+
+    def to_dict(self) -> Dict:
+        """plain (picklable) form, to hand a built index to another process"""
+        return {
+            'project_id': self.project_id,
+            'since': self.since.isoformat(),
+            'issues': [issue.attributes for issue in self.issues.values()],
+            'paths_by_issue': {iid: sorted(paths) for iid, paths in self.paths_by_issue.items()},
+            'closing_mr_iids': dict(self.closing_mr_iids)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, restore: Callable[[Dict], object]) -> 'BugIssueIndex':
+        """rebuild an index from to_dict(); restore turns issue attributes back into objects"""
+        index = cls(data['project_id'], datetime.fromisoformat(data['since']))
+        for attrs in data['issues']:
+            index.add(restore(attrs), data['paths_by_issue'][attrs['iid']])
+
+        index.closing_mr_iids.update(data['closing_mr_iids'])
+        return index
@@ -0,0 +1,511 @@
+"""per-file, per-day metrics history - trend and impact reports without api calls"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache import FAILED_PIPELINE_STATUSES
+from .commit_index import parse_gitlab_datetime
+from .cost_calculator import EuniceConfig, calculate_annual_velocity_cost, calculate_time_savings_only
+
+
+DEFAULT_METRICS_PATH = '.eunice/cache/metrics.sqlite'
+
+# an ingestion service silent for longer than this has missed events
+DEFAULT_INGEST_MAX_GAP = 600  # seconds
+
+METRICS = ('commits', 'reviews', 'review_minutes', 'bug_hours', 'pipelines', 'pipeline_seconds', 'failures')
+
+# where each kind of writer keeps its rows: audits replace their window,
+# webhooks add deltas - sharing rows, an audit would overwrite what later
+# deltas correct (and subtract from)
+SOURCES = {'audit': 'daily_metrics', 'webhooks': 'ingest_metrics'}
+
+# days are stored as yyyymmdd integers: compact, ordered, and months /
+# quarters fall out of integer arithmetic inside sqlite
+PERIODS = {
+    'day': 'm.day',
+    'month': 'm.day / 100',
+    'quarter': '(m.day / 10000) * 10 + ((m.day / 100) % 100 + 2) / 3',
+    'year': 'm.day / 10000'
+}
+
+
+def day_number(value) -> int:
+    """date, datetime or gitlab timestamp → yyyymmdd (utc)"""
+    if isinstance(value, str):
+        value = parse_gitlab_datetime(value)
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc).date() if value.tzinfo else value.date()
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def _period_label(period: str, key: int) -> str:
+    if period == 'day':
+        return f'{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}'
+    if period == 'month':
+        return f'{key // 100:04d}-{key % 100:02d}'
+    if period == 'quarter':
+        return f'{key // 10:04d}-Q{key % 10}'
+    return f'{key:04d}'
+
+
+def _summary(commits, reviews, review_minutes, bug_hours, pipelines, pipeline_seconds, failures, files=None) -> Dict:
+    summary = {
+        'commits': commits,
+        'reviews': reviews,
+        'avg_review_minutes': round(review_minutes / reviews, 2) if reviews else 0,
+        'bug_hours': round(bug_hours, 2),
+        'pipelines': pipelines,
+        'avg_pipeline_minutes': round(pipeline_seconds / pipelines / 60, 2) if pipelines else 0,
+        'ci_failures': failures
+    }
+    if files is not None:
+        summary['files'] = files
+    return summary
+
+
+def history_days(history: Dict) -> Dict[int, List[float]]:
+    """
+    bucket one AuditSnapshot file history by day
+
+    commits land on their commit date, pipelines on their creation date,
+    an mr's review minutes on the day of its last commit to the file,
+    and a bug's tracked hours on the day the issue was last updated
+    """
+    days: Dict[int, List[float]] = {}
+
+    def bucket(day: int) -> List[float]:
+        return days.setdefault(day, [0, 0, 0.0, 0.0, 0, 0.0, 0])
+
+    last_commit_day: Dict[str, int] = {}
+    pipelines = {}  # deduplicate by id
+
+    for commit in history['commits'].values():
+        day = day_number(commit['date'])
+        bucket(day)[0] += 1
+
+        for iid in commit['mr_iids'] or ():
+            last_commit_day[str(iid)] = max(last_commit_day.get(str(iid), 0), day)
+        for pipeline in commit['pipelines'] or ():
+            pipelines[pipeline['id']] = pipeline
+
+    for iid, minutes in history['mrs'].items():
+        if minutes is not None and iid in last_commit_day:
+            row = bucket(last_commit_day[iid])
+            row[1] += 1
+            row[2] += minutes
+
+    for bug in history['bugs'].values():
+        if bug['updated_at'] and bug['hours_spent'] > 0:
+            bucket(day_number(bug['updated_at']))[3] += bug['hours_spent']
+
+    for pipeline in pipelines.values():
+        if not pipeline.get('created_at'):
+            continue
+        row = bucket(day_number(pipeline['created_at']))
+        row[4] += 1
+        row[5] += pipeline.get('duration') or 0
+        row[6] += pipeline['status'] in FAILED_PIPELINE_STATUSES
+
+    return days
+
+
+class MetricsStore:
+    """
+    sqlite store of per-file daily activity: commits, reviews, bug hours,
+    pipeline duration and failures
+
+    reality check: the impact report used to re-query gitlab for every
+    month it compared. here each audit / mr review writes the days its
+    window covers, and monthly or quarterly trends are one indexed range
+    scan + group by over local rows. rows are keyed (day, file id)
+    without a rowid, so a month of a project is a contiguous slice of
+    the table and paths are stored once, as small integers.
+
+    the webhook ingestion service (eunice.ingest) adds events as they
+    arrive, into rows of its own (source='webhooks'); while it has been
+    running for the whole window, file_metrics(source='webhooks')
+    answers audits and mr reviews with no api calls.
+    """
+
+    def __init__(self, path: str = DEFAULT_METRICS_PATH):
+        self.path = path
+
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        # autocommit: audits and mr reviews may write concurrently
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                project_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                UNIQUE (project_id, path)
+            );
+        """ + ''.join(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                day INTEGER NOT NULL,
+                file_id INTEGER NOT NULL,
+                commits INTEGER NOT NULL,
+                reviews INTEGER NOT NULL,
+                review_minutes REAL NOT NULL,
+                bug_hours REAL NOT NULL,
+                pipelines INTEGER NOT NULL,
+                pipeline_seconds REAL NOT NULL,
+                failures INTEGER NOT NULL,
+                PRIMARY KEY (day, file_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS {table}_file ON {table} (file_id, day);
+        """ for table in SOURCES.values()) + """
+            CREATE TABLE IF NOT EXISTS ingest_runs (
+                id INTEGER PRIMARY KEY,
+                started_at REAL NOT NULL,
+                alive_at REAL NOT NULL,
+                lost INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        columns = [row[1] for row in self._db.execute('PRAGMA table_info(ingest_runs)')]
+        if 'lost' not in columns:  # stores written before lost runs were tracked
+            self._db.execute('ALTER TABLE ingest_runs ADD COLUMN lost INTEGER NOT NULL DEFAULT 0')
+        self._file_ids: Dict[Tuple[str, str], int] = {}
+
+    def _file_id(self, project_id: str, path: str) -> int:
+        """id of a project file, created on first use (caller holds the lock)"""
+        key = (str(project_id), path)
+        if key not in self._file_ids:
+            self._db.execute('INSERT OR IGNORE INTO files (project_id, path) VALUES (?, ?)', key)
+            self._file_ids[key] = self._db.execute(
+                'SELECT id FROM files WHERE project_id = ? AND path = ?', key
+            ).fetchone()[0]
+        return self._file_ids[key]
+
+    @contextmanager
+    def transaction(self):
+        """
+        the connection inside one locked transaction, for writers that keep
+        their own tables next to the metrics (eunice.ingest). nests: an
+        inner block joins the outer transaction
+        """
+        with self._lock:
+            if self._db.in_transaction:
+                yield self._db
+                return
+
+            self._db.execute('BEGIN')
+            try:
+                yield self._db
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                self._file_ids.clear()  # ids created in this transaction are gone
+                raise
+
+    def register_paths(self, project_id: str, paths: Iterable[str]):
+        """make paths known to the store before they have any activity"""
+        with self.transaction():
+            for path in paths:
+                self._file_id(project_id, path)
+
+    def known_paths(self, project_id: str, paths: Iterable[str]) -> List[str]:
+        """the subset of paths the store has seen for a project"""
+        with self._lock:
+            known = []
+            for path in paths:
+                key = (str(project_id), path)
+                if key in self._file_ids or self._db.execute(
+                    'SELECT 1 FROM files WHERE project_id = ? AND path = ?', key
+                ).fetchone():
+                    known.append(path)
+            return known
+
+    def record(self, project_id: str, days_by_path: Dict[str, Dict[int, List[float]]], since_day: Optional[int] = None):
+        """
+        store daily rows per path (values in METRICS order), one transaction
+
+        since_day marks the window the rows were computed over: stored
+        days of those paths from since_day on are replaced, so a rerun
+        over the same window never double counts and days that lost all
+        activity (a reverted commit, a relabelled issue) go back to zero
+        """
+        with self.transaction():
+            for path, days in days_by_path.items():
+                file_id = self._file_id(project_id, path)
+                if since_day is not None:
+                    self._db.execute(
+                        'DELETE FROM daily_metrics WHERE file_id = ? AND day >= ?', (file_id, since_day)
+                    )
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO daily_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(day, file_id, *values) for day, values in days.items()]
+                )
+
+    def add(self, project_id: str, days_by_path: Dict[str, Dict[int, List[float]]]):
+        """
+        add daily webhook deltas per path (values in METRICS order, may be
+        negative), one transaction. they go to the 'webhooks' rows, which
+        record never touches
+        """
+        columns = ', '.join(f'{m} = {m} + excluded.{m}' for m in METRICS)
+        with self.transaction():
+            for path, days in days_by_path.items():
+                file_id = self._file_id(project_id, path)
+                self._db.executemany(
+                    f'INSERT INTO ingest_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    f'ON CONFLICT (day, file_id) DO UPDATE SET {columns}',
+                    [(day, file_id, *values) for day, values in days.items()]
+                )
+
+    def start_ingest_run(self) -> int:
+        """register a running ingestion service; returns its run id for ingest_alive"""
+        now = time.time()
+        with self.transaction():
+            return self._db.execute('INSERT INTO ingest_runs (started_at, alive_at) VALUES (?, ?)', (now, now)).lastrowid
+
+    def ingest_alive(self, run_id: int):
+        with self.transaction():
+            self._db.execute('UPDATE ingest_runs SET alive_at = ? WHERE id = ?', (time.time(), run_id))
+
+    def ingest_lost(self, run_id: int):
+        """mark a run as having dropped events: coverage cannot reach back past it"""
+        with self.transaction():
+            self._db.execute('UPDATE ingest_runs SET lost = 1, alive_at = ? WHERE id = ?', (time.time(), run_id))
+
+    def ingested_since(self, max_gap: float = DEFAULT_INGEST_MAX_GAP) -> Optional[float]:
+        """
+        unix time since which every webhook event has been ingested, or
+        None when no service is running
+
+        consecutive service runs count as one stretch as long as no gap
+        between them was longer than max_gap (a restart, a deploy) and
+        none of them lost events
+        """
+        with self._lock:
+            runs = self._db.execute(
+                'SELECT started_at, alive_at, lost FROM ingest_runs ORDER BY started_at DESC, id DESC'
+            ).fetchall()
+
+        if not runs or runs[0][2] or time.time() - runs[0][1] > max_gap:
+            return None
+
+        since = runs[0][0]
+        for started_at, alive_at, lost in runs[1:]:
+            if lost or alive_at < since - max_gap:
+                break
+            since = min(since, started_at)
+        return since
+
+    def ingest_covers(self, since_days: float, max_gap: float = DEFAULT_INGEST_MAX_GAP) -> bool:
+        """whether webhook ingestion has run without gaps for the whole window"""
+        since = self.ingested_since(max_gap)
+        return since is not None and since <= time.time() - since_days * 86400
+
+    def record_histories(self, project_id: str, histories: Dict[str, Dict], window_start: datetime):
+        """
+        store the days covered by refreshed AuditSnapshot histories
+
+        the window starts mid-day; that partial first day keeps what an
+        earlier, longer window recorded for it
+        """
+        since_day = day_number(_as_date(window_start) + timedelta(days=1))
+        self.record(
+            project_id,
+            {
+                path: {day: values for day, values in history_days(history).items() if day >= since_day}
+                for path, history in histories.items()
+            },
+            since_day=since_day
+        )
+
+    @staticmethod
+    def _table(source: str) -> str:
+        if source not in SOURCES:
+            raise ValueError(f'unknown source: {source!r} (expected one of {", ".join(SOURCES)})')
+        return SOURCES[source]
+
+    def _where(self, project_id: str, start, end, paths: Optional[Iterable[str]]) -> Tuple[str, List]:
+        clause = 'f.project_id = ? AND m.day BETWEEN ? AND ?'
+        params: List = [str(project_id), day_number(start), day_number(end)]
+
+        if paths is not None:
+            paths = list(paths)
+            clause += f' AND f.path IN ({", ".join("?" * len(paths))})'
+            params.extend(paths)
+        return clause, params
+
+    def trend(
+        self,
+        project_id: str,
+        start,
+        end,
+        period: str = 'month',
+        paths: Optional[Iterable[str]] = None,
+        source: str = 'audit'
+    ) -> List[Dict]:
+        """project (or paths) totals per day / month / quarter / year, oldest first"""
+        if period not in PERIODS:
+            raise ValueError(f'unknown period: {period!r} (expected one of {", ".join(PERIODS)})')
+
+        table = self._table(source)
+        where, params = self._where(project_id, start, end, paths)
+        with self._lock:
+            rows = self._db.execute(f"""
+                SELECT {PERIODS[period]} AS period,
+                       SUM(m.commits), SUM(m.reviews), SUM(m.review_minutes), SUM(m.bug_hours),
+                       SUM(m.pipelines), SUM(m.pipeline_seconds), SUM(m.failures),
+                       COUNT(DISTINCT m.file_id)
+                FROM {table} m JOIN files f ON f.id = m.file_id
+                WHERE {where}
+                GROUP BY period ORDER BY period
+            """, params).fetchall()
+
+        return [dict(period=_period_label(period, row[0]), **_summary(*row[1:])) for row in rows]
+
+    def file_totals(
+        self,
+        project_id: str,
+        start,
+        end,
+        paths: Optional[Iterable[str]] = None,
+        source: str = 'audit'
+    ) -> Dict[str, Dict]:
+        """per-file totals over [start, end]"""
+        table = self._table(source)
+        where, params = self._where(project_id, start, end, paths)
+        with self._lock:
+            rows = self._db.execute(f"""
+                SELECT f.path,
+                       SUM(m.commits), SUM(m.reviews), SUM(m.review_minutes), SUM(m.bug_hours),
+                       SUM(m.pipelines), SUM(m.pipeline_seconds), SUM(m.failures)
+                FROM {table} m JOIN files f ON f.id = m.file_id
+                WHERE {where}
+                GROUP BY m.file_id
+            """, params).fetchall()
+
+        return {row[0]: _summary(*row[1:]) for row in rows}
+
+    def file_metrics(
+        self,
+        project_id: str,
+        paths: Iterable[str],
+        since_days: float = 30,
+        source: str = 'audit'
+    ) -> Dict[str, Dict]:
+        """
+        per-file metrics over the last since_days, in the shape of
+        EuniceGitLabClient.analyze_files (counts and averages only - no
+        mr, issue or pipeline ids). paths without rows get zeros
+        """
+        paths = list(paths)
+        end = datetime.now(timezone.utc)
+        start = end - timedelta(days=since_days)
+
+        totals = {}
+        for i in range(0, len(paths), 500):  # sqlite caps bound parameters
+            totals.update(self.file_totals(project_id, start, end, paths[i:i + 500], source))
+
+        results = {}
+        for path in paths:
+            total = totals.get(path) or _summary(0, 0, 0.0, 0.0, 0, 0.0, 0)
+            pipelines, failures = total['pipelines'], total['ci_failures']
+            results[path] = {
+                'commit_count': total['commits'],
+                'review_count': total['reviews'],
+                'avg_review_minutes': total['avg_review_minutes'],
+                'bug_hours': total['bug_hours'],
+                'pipeline_stats': {
+                    'avg_duration_minutes': total['avg_pipeline_minutes'],
+                    'failure_rate': round(failures / pipelines, 3) if pipelines else 0,
+                    'failed_count': failures,
+                    'total_count': pipelines
+                },
+                'ci_failure_count': failures
+            }
+        return results
+
+    def impact(
+        self,
+        project_id: str,
+        before: Tuple,
+        after: Tuple,
+        config: EuniceConfig,
+        paths: Optional[Iterable[str]] = None,
+        source: str = 'audit'
+    ) -> Dict:
+        """
+        debt paid down and hours recovered between two periods
+
+        before / after are (start, end) date pairs. each file's annual
+        velocity cost and hours are computed from its totals in both
+        periods (rates normalized to 30 days, bug hours annualized over
+        the period length); files that got cheaper count as debt paid,
+        files that got more expensive as debt added.
+        """
+        paths = list(paths) if paths is not None else None
+        periods = []
+        for start, end in (before, after):
+            days = (_as_date(end) - _as_date(start)).days + 1
+            periods.append((days, self.file_totals(project_id, start, end, paths, source)))
+
+        files = {}
+        for path in set(periods[0][1]) | set(periods[1][1]):
+            costs = []
+            for days, totals in periods:
+                costs.append(_period_cost(totals.get(path), days, config))
+
+            (cost_before, hours_before), (cost_after, hours_after) = costs
+            files[path] = {
+                'annual_cost_before_usd': cost_before,
+                'annual_cost_after_usd': cost_after,
+                'annual_cost_change_usd': round(cost_after - cost_before, 2),
+                'annual_hours_before': hours_before,
+                'annual_hours_after': hours_after
+            }
+
+        changes = [f['annual_cost_change_usd'] for f in files.values()]
+        hour_changes = [f['annual_hours_after'] - f['annual_hours_before'] for f in files.values()]
+
+        return {
+            'before': [str(_as_date(d)) for d in before],
+            'after': [str(_as_date(d)) for d in after],
+            'debt_paid_usd': round(-sum(c for c in changes if c < 0), 2),
+            'debt_added_usd': round(sum(c for c in changes if c > 0), 2),
+            'hours_recovered_annually': round(-sum(h for h in hour_changes if h < 0), 1),
+            'files': dict(sorted(files.items(), key=lambda item: item[1]['annual_cost_change_usd']))
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _as_date(value) -> date:
+    day = day_number(value)
+    return date(day // 10000, day // 100 % 100, day % 100)
+
+
+def _period_cost(totals: Optional[Dict], days: int, config: EuniceConfig) -> Tuple[float, float]:
+    """annual cost and hours of one file's period totals"""
+    if not totals:
+        return 0.0, 0.0
+
+    per_month = 30 / days
+    inputs = dict(
+        commit_count_monthly=totals['commits'] * per_month,
+        avg_review_time_minutes=totals['avg_review_minutes'],
+        bug_hours_tracked=totals['bug_hours'],
+        ci_failure_count_monthly=totals['ci_failures'] * per_month,
+        config=config,
+        bug_hours_window_days=days
+    )
+    return (
+        calculate_annual_velocity_cost(**inputs)['annual_cost_usd'],
+        calculate_time_savings_only(**inputs)['annual_hours_saved']
+    )
@@ -0,0 +1,185 @@
+"""vectorized cost scoring for a whole portfolio of files"""
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pip install eunice-data-engine[numpy]
+    np = None
+
+from .cost_calculator import (
+    EuniceConfig,
+    calculate_annual_velocity_cost,
+    calculate_roi,
+    estimate_fix_effort
+)
+
+
+def _scalar(value):
+    """numpy element back to the int/float the flows would have passed"""
+    value = value.item()
+    return int(value) if float(value).is_integer() else value
+
+
+def _round_cents(values: 'np.ndarray') -> 'np.ndarray':
+    """
+    round(value, 2) for every element
+
+    reality check: np.round scales by 100 and rounds that, so a value
+    within an ulp of a half cent can land on the other cent than
+    python's round, which rounds the exact value. those few elements
+    are rounded by python instead
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_half = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) <= 2 * np.abs(np.spacing(scaled)))
+    rounded[near_half] = [round(value, 2) for value in values[near_half].tolist()]
+    return rounded
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('portfolio scoring needs numpy: pip install eunice-data-engine[numpy]')
+
+
+class PortfolioScores:
+    """
+    columnar scores for n files - one float64 array per metric
+
+    reality check: the report only shows the top 10-20 files, so nested
+    dicts are built on demand (to_dict / top_dicts) by the scalar
+    functions themselves - identical shape and rounding to what the
+    flows already render.
+    """
+
+    def __init__(self, config: EuniceConfig, paths: List[str], inputs: Dict, outputs: Dict):
+        self.config = config
+        self.paths = paths
+        self.inputs = inputs
+        self.annual_cost = outputs['annual_cost']
+        self.effort_hours = outputs['effort_hours']
+        self.roi = outputs['roi']
+        self.payback_days = outputs['payback_days']
+        self.priority_score = outputs['priority_score']
+
+    def __len__(self) -> int:
+        return len(self.annual_cost)
+
+    def top(self, k: int, by: str = 'priority_score') -> 'np.ndarray':
+        """indices of the k best files by a metric, best first (O(n) partition + O(k log k))"""
+        values = getattr(self, by)
+        k = min(k, len(values))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        candidates = np.argpartition(-values, k - 1)[:k]
+        return candidates[np.argsort(-values[candidates], kind='stable')]
+
+    def to_dict(self, i: int) -> Dict:
+        """expand one file into the scalar functions' dict shape"""
+        i = int(i)
+        inputs = {name: _scalar(values[i]) for name, values in self.inputs.items()}
+
+        velocity_cost = calculate_annual_velocity_cost(
+            commit_count_monthly=inputs['commits_monthly'],
+            avg_review_time_minutes=inputs['avg_review_minutes'],
+            bug_hours_tracked=inputs['bug_hours'],
+            ci_failure_count_monthly=inputs['ci_failures_monthly'],
+            config=self.config,
+            bug_hours_window_days=inputs['bug_hours_window_days']
+        )
+        roi = calculate_roi(
+            annual_savings=velocity_cost['annual_cost_usd'],
+            effort_hours=estimate_fix_effort(inputs['lines_of_code'], self.config),
+            config=self.config
+        )
+
+        return {
+            'file': self.paths[i],
+            'velocity_cost': velocity_cost,
+            'roi': roi
+        }
+
+    def top_dicts(self, k: int, by: str = 'priority_score') -> List[Dict]:
+        """dicts for the top k files only"""
+        return [self.to_dict(i) for i in self.top(k, by)]
+
+
+class PortfolioCostEngine:
+    """
+    score every file in one vectorized pass
+
+    same arithmetic, in the same order, as calculate_annual_velocity_cost →
+    calculate_roi(estimate_fix_effort(loc)), so results match the scalar
+    functions element for element (the annual cost is rounded to cents
+    before roi, as the flows pass annual_cost_usd along).
+    """
+
+    def __init__(self, config: EuniceConfig):
+        _require_numpy()
+        self.config = config
+
+    def score(
+        self,
+        commits_monthly: Sequence[float],
+        avg_review_minutes: Sequence[float],
+        bug_hours: Sequence[float],
+        ci_failures_monthly: Sequence[float],
+        lines_of_code: Sequence[float],
+        bug_hours_window_days=30,
+        paths: Optional[List[str]] = None
+    ) -> PortfolioScores:
+        commits = np.asarray(commits_monthly, dtype=np.float64)
+        review = np.asarray(avg_review_minutes, dtype=np.float64)
+        bugs = np.asarray(bug_hours, dtype=np.float64)
+        ci = np.asarray(ci_failures_monthly, dtype=np.float64)
+        loc = np.asarray(lines_of_code, dtype=np.float64)
+
+        window = np.broadcast_to(
+            np.asarray(bug_hours_window_days, dtype=np.float64), commits.shape
+        )
+        window = np.where(window <= 0, 30.0, window)
+
+        compiled = self.config.compiled
+        rate = compiled.dev_rate
+        hours_per_100_loc = compiled.refactor_hours_per_100_loc
+
+        # calculate_annual_velocity_cost, grouped the same way
+        annual_review_cost = (((commits * review) / 60) * rate) * 12
+        annual_bug_cost = (bugs * (365 / window)) * rate
+        annual_ci_cost = ((ci * compiled.avg_ci_failure_hours) * rate) * 12
+        annual_cost = annual_review_cost + annual_bug_cost + annual_ci_cost
+
+        # calculate_roi(annual_cost_usd, estimate_fix_effort(loc))
+        savings = _round_cents(annual_cost)
+        effort_hours = (loc / 100) * hours_per_100_loc
+        effort_cost = effort_hours * rate
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roi = np.where(effort_cost > 0, savings / effort_cost, 0.0)
+            payback_days = np.where(savings > 0, effort_cost / savings * 365, 999.0)
+
+        priority_score = np.minimum(10, roi / 10)
+
+        n = commits.shape[0]
+        inputs = {
+            'commits_monthly': commits,
+            'avg_review_minutes': review,
+            'bug_hours': bugs,
+            'ci_failures_monthly': ci,
+            'lines_of_code': loc,
+            'bug_hours_window_days': window
+        }
+        outputs = {
+            'annual_cost': annual_cost,
+            'effort_hours': effort_hours,
+            'roi': roi,
+            'payback_days': payback_days,
+            'priority_score': priority_score
+        }
+
+        return PortfolioScores(
+            self.config,
+            list(paths) if paths is not None else [str(i) for i in range(n)],
+            inputs,
+            outputs
+        )
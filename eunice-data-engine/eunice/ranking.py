@@ -0,0 +1,190 @@
+"""top-k files by roi or annual cost - upper bounds from local history, refined best-first into a bounded heap"""
+import heapq
+import time
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional
+
+from .audit import file_velocity_cost
+from .cost_calculator import Config, calculate_roi, estimate_fix_effort
+from .git_history import GitHistory
+
+
+RANK_KEYS = ('roi', 'annual_cost')
+
+# analyze_files reads the first page of pipelines per commit
+PIPELINES_PER_COMMIT = 20
+
+
+class TopKRanker:
+    """
+    the k files of a project with the highest roi (or annual cost),
+    without measuring every file
+
+    reality check: the flows only report the top 10-20 files, yet ranking
+    by roi meant review times, bug hours and pipelines for every candidate
+    first. here each file changed in the window gets an upper bound on its
+    annual cost from local and project-wide data:
+
+    - commits: the local clone's count for the file (git history)
+    - review minutes: the longest review of any mr merged in the window
+    - bug hours: exact, from the project's bug issue index
+    - ci failures: the largest per-commit failed pipeline counts of the
+      window, one per commit of the file
+
+    divided by fix effort from the file's real lines of code
+    (estimate_fix_effort), that bounds its roi. files are then measured
+    with analyze_files in order of bound, batch_size at a time, into a
+    k-sized min-heap; once the next bound cannot beat the k-th best, every
+    remaining file is pruned without a single request.
+
+    the bounds hold as long as the clone is up to date with the branch
+    gitlab reports on. bound_violations counts measured files with more
+    commits than the clone knows about - anything above 0 means the
+    pruning may have dropped a file that belonged in the top k.
+    """
+
+    def __init__(
+        self,
+        client,
+        project_id: str,
+        history: GitHistory,
+        config: Config,
+        since_days: float = 30,
+        by: str = 'roi'
+    ):
+        if by not in RANK_KEYS:
+            raise ValueError(f'unknown ranking key: {by!r} (expected one of {", ".join(RANK_KEYS)})')
+
+        self.client = client
+        self.project_id = project_id
+        self.history = history
+        self.config = config
+        self.since_days = since_days
+        self.by = by
+
+        self.review_cap_minutes: Optional[float] = None
+        self._failed_prefix: List[int] = []  # failed pipelines of the n worst commits, n = 0, 1, ...
+
+    def prepare(self):
+        """fetch what the bounds need: merged mrs, failed pipelines and the bug issue index"""
+        client, project_id = self.client, self.project_id
+
+        review_times = client.get_merged_mr_review_times(project_id, self.since_days)
+        self.review_cap_minutes = max(review_times.values(), default=0.0)
+
+        counts = client.get_failed_pipeline_counts(project_id, self.since_days)
+        worst = sorted((min(n, PIPELINES_PER_COMMIT) for n in counts.values()), reverse=True)
+        self._failed_prefix = list(accumulate(worst, initial=0))
+
+        client.build_bug_issue_index(project_id, self.since_days)
+
+    def _score(self, velocity_cost: Dict, lines_of_code: Optional[int]) -> Optional[Dict]:
+        """the ranked value (plus roi when there is loc); None if the file cannot be ranked"""
+        annual_cost = velocity_cost['annual_cost_usd']
+        if not lines_of_code:
+            return None if self.by == 'roi' else {'value': annual_cost, 'roi': None}
+
+        roi = calculate_roi(annual_cost, estimate_fix_effort(lines_of_code, self.config), self.config)
+        return {'value': roi['roi'] if self.by == 'roi' else annual_cost, 'roi': roi}
+
+    def upper_bound(self, path: str) -> Optional[float]:
+        """highest value the file can reach once measured, or None if it cannot be ranked"""
+        if self.review_cap_minutes is None:
+            self.prepare()
+
+        stats = self.history.file_stats(path)
+        if stats is None:
+            return None
+
+        commits = stats['commits']
+        bugs = self.client.get_bug_issues_with_time_tracking(self.project_id, path, self.since_days)
+        ceiling = {
+            'commit_count': commits,
+            'avg_review_minutes': self.review_cap_minutes,
+            'bug_hours': sum(b['hours_spent'] for b in bugs),
+            'ci_failure_count': self._failed_prefix[min(commits, len(self._failed_prefix) - 1)]
+        }
+
+        score = self._score(file_velocity_cost(ceiling, self.since_days, self.config), stats['lines_of_code'])
+        return None if score is None else score['value']
+
+    def top(self, k: int = 20, batch_size: int = 10, paths: Optional[Iterable[str]] = None) -> Dict:
+        """
+        measure files best bound first until no remaining bound can enter the top k
+
+        paths narrows the candidates (default: every file changed in the
+        window). batch_size trades requests for round trips: analyze_files
+        shares commit → mr and pipeline lookups inside a batch, but the
+        last batch may measure files a smaller one would have pruned.
+        """
+        started = time.perf_counter()
+        if self.review_cap_minutes is None:
+            self.prepare()
+
+        candidates = []  # max-heap of (-bound, path)
+        unrankable = 0
+        for path in dict.fromkeys(paths if paths is not None else self.history.paths):
+            bound = self.upper_bound(path)
+            if bound is None:
+                unrankable += 1
+            else:
+                candidates.append((-bound, path))
+        heapq.heapify(candidates)
+        total = len(candidates)
+
+        best = []   # min-heap of (value, path), at most k
+        rows = {}   # path → result, for files in `best`
+        measured = violations = 0
+
+        while candidates and k > 0:
+            threshold = best[0][0] if len(best) == k else None
+
+            batch = {}  # path → bound
+            while candidates and len(batch) < batch_size:
+                if threshold is not None and -candidates[0][0] <= threshold:
+                    break
+                bound, path = heapq.heappop(candidates)
+                batch[path] = -bound
+            if not batch:
+                break
+
+            metrics = self.client.analyze_files(self.project_id, list(batch), self.since_days)
+            measured += len(batch)
+
+            for path, file_metrics in metrics.items():
+                stats = self.history.file_stats(path)
+                violations += file_metrics['commit_count'] > stats['commits']
+
+                velocity_cost = file_velocity_cost(file_metrics, self.since_days, self.config)
+                score = self._score(velocity_cost, stats['lines_of_code'])
+                entry = (score['value'], path)
+
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    del rows[heapq.heapreplace(best, entry)[1]]
+                else:
+                    continue
+
+                rows[path] = dict(
+                    file_metrics,
+                    file=path,
+                    velocity_cost=velocity_cost,
+                    lines_of_code=stats['lines_of_code'],
+                    roi=score['roi'],
+                    upper_bound=batch[path]
+                )
+
+        return {
+            'by': self.by,
+            'k': k,
+            'since_days': self.since_days,
+            'candidates': total,
+            'unrankable': unrankable,
+            'measured': measured,
+            'pruned': total - measured,
+            'bound_violations': violations,
+            'review_cap_minutes': round(self.review_cap_minutes, 1),
+            'elapsed_seconds': round(time.perf_counter() - started, 2),
+            'results': [rows[path] for _, path in sorted(best, reverse=True)]
+        }
@@ -0,0 +1,180 @@
+"""token bucket rate limiting shared by threads, asyncio tasks and worker processes"""
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # windows: FileTokenBucket unavailable
+    fcntl = None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delay-seconds or an http date"""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    from email.utils import parsedate_to_datetime  # rare: gitlab sends seconds
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    O(1) token bucket for gitlab's per-user request budget
+
+    reality check: gitlab.com allows 2000 requests/minute for authenticated
+    users. refill at rate_per_minute with a small burst capacity so no
+    60s window can exceed rate + capacity. callers reserve a token (the
+    balance may go negative) and sleep only for their own deficit, so
+    waiting threads queue fairly instead of all stalling for a minute.
+    RateLimit-Remaining / Retry-After headers from gitlab override the
+    local estimate - other clients may be spending the same budget.
+    """
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, rate_per_minute: float = 1900, capacity: float = 100):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity
+        self.slept_seconds = 0.0
+        self.waits = 0
+        self._lock = threading.Lock()
+        # tokens, last refill, blocked until
+        self._state = [float(capacity), self.clock(), 0.0]
+
+    def __getstate__(self):
+        # locks do not pickle; process pools get a fresh one
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            yield self._state
+
+    def _reserve(self) -> float:
+        """take one token, return how long the caller has to wait for it"""
+        rate = self.rate_per_minute / 60.0
+
+        with self._locked() as state:
+            now = self.clock()
+            tokens, updated, blocked_until = state
+
+            tokens = min(self.capacity, tokens + (now - updated) * rate) - 1
+            wait = -tokens / rate if tokens < 0 else 0.0
+
+            state[0], state[1] = tokens, now
+
+        return max(wait, blocked_until - now)
+
+    def _record_wait(self, wait: float):
+        if wait > 0:
+            self.waits += 1
+            self.slept_seconds += wait
+
+    def acquire(self) -> float:
+        """block until a request may be sent; returns seconds slept"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        self._record_wait(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """asyncio variant of acquire - sleeps without blocking the loop"""
+        import asyncio  # already loaded by any caller with a running loop
+
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._record_wait(wait)
+        return wait
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        sync the bucket with gitlab's view of the budget
+
+        reality check: RateLimit-Reset is a unix timestamp, Retry-After
+        comes with 429s. back off exactly that long, no more
+        """
+        remaining = headers.get('RateLimit-Remaining')
+        reset = headers.get('RateLimit-Reset')
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+
+        with self._locked() as state:
+            now = self.clock()
+
+            if retry_after is not None:
+                state[2] = max(state[2], now + retry_after)
+
+            if remaining is not None:
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    return
+
+                state[0] = min(state[0], remaining)
+
+                if remaining <= 0 and reset:
+                    try:
+                        until_reset = float(reset) - time.time()
+                    except ValueError:
+                        until_reset = 0
+                    state[2] = max(state[2], now + max(0.0, until_reset))
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    token bucket whose state lives in a flock-protected file
+
+    reality check: audit workers in separate processes share one gitlab
+    budget. state is 24 bytes (tokens, last refill, blocked until) on a
+    wall clock, read and rewritten under an exclusive lock per request
+    """
+
+    clock = staticmethod(time.time)
+    _format = struct.Struct('ddd')
+
+    def __init__(self, path: str = '.eunice/cache/rate-limit.bucket', rate_per_minute: float = 1900, capacity: float = 100):
+        if fcntl is None:
+            raise RuntimeError('FileTokenBucket needs fcntl (posix only)')
+
+        super().__init__(rate_per_minute, capacity)
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).touch(exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(self.path, 'r+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+
+            data = f.read(self._format.size)
+            if len(data) == self._format.size:
+                state: List[float] = list(self._format.unpack(data))
+            else:
+                state = [float(self.capacity), self.clock(), 0.0]
+
+            yield state
+
+            f.seek(0)
+            f.write(self._format.pack(*state))
+            f.flush()
+            # lock released when the file closes
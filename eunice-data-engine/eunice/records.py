@@ -0,0 +1,88 @@
+"""compact records for streaming gitlab results - only the fields eunice reads"""
+from typing import Dict, NamedTuple, Optional
+
+
+def issue_time_stats(issue) -> Dict:
+    """
+    time_stats dict of an issue
+
+    reality check: python-gitlab issues have a time_stats() method that
+    shadows the time_stats attribute returned by issues.list
+    """
+    time_stats = getattr(issue, 'time_stats', None)
+    if callable(time_stats):
+        time_stats = (getattr(issue, 'attributes', None) or {}).get('time_stats')
+    return time_stats or {}
+
+
+def pipeline_attrs(pipeline) -> Dict:
+    """the pipeline fields an audit snapshot history keeps (json-safe)"""
+    return {
+        'id': pipeline.id,
+        'status': pipeline.status,
+        'duration': getattr(pipeline, 'duration', None),
+        'created_at': getattr(pipeline, 'created_at', None)
+    }
+
+
+class CommitRecord(NamedTuple):
+    id: str
+    created_at: str
+    committed_date: Optional[str]
+
+    @property
+    def sha(self) -> str:
+        return self.id
+
+    @classmethod
+    def from_object(cls, commit) -> 'CommitRecord':
+        return cls(commit.id, commit.created_at, getattr(commit, 'committed_date', None))
+
+
+class MergeRequestRecord(NamedTuple):
+    iid: int
+    state: str
+    created_at: str
+    merged_at: Optional[str]
+
+    @classmethod
+    def from_object(cls, mr) -> 'MergeRequestRecord':
+        return cls(mr.iid, mr.state, mr.created_at, getattr(mr, 'merged_at', None))
+
+
+class PipelineRecord(NamedTuple):
+    id: int
+    sha: Optional[str]
+    status: str
+    duration: Optional[float]
+    created_at: Optional[str]
+
+    @classmethod
+    def from_object(cls, pipeline) -> 'PipelineRecord':
+        return cls(
+            pipeline.id,
+            getattr(pipeline, 'sha', None),
+            pipeline.status,
+            getattr(pipeline, 'duration', None),
+            getattr(pipeline, 'created_at', None)
+        )
+
+
+class IssueRecord(NamedTuple):
+    iid: int
+    title: str
+    web_url: str
+    updated_at: Optional[str]
+    hours_spent: float
+
+    @classmethod
+    def from_object(cls, issue) -> 'IssueRecord':
+        # time_stats.total_time_spent is in SECONDS
+        time_stats = issue_time_stats(issue)
+        return cls(
+            issue.iid,
+            issue.title,
+            issue.web_url,
+            getattr(issue, 'updated_at', None),
+            (time_stats.get('total_time_spent') or 0) / 3600
+        )
@@ -0,0 +1,285 @@
+"""monte carlo / sensitivity analysis over the eunice.yml cost assumptions"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pip install eunice-data-engine[numpy]
+    np = None
+
+from .cost_calculator import EuniceConfig
+
+
+# assumptions that can be given a distribution, and where eunice.yml keeps them
+ASSUMPTIONS = {
+    'dev_hourly_rate': 'cost_assumptions',
+    'avg_ci_failure_debug_hours': 'effort_assumptions',
+    'avg_refactor_hours_per_100_loc': 'effort_assumptions',
+}
+
+# elements per (files × samples) block - bounds peak memory to ~64mb per metric
+_BLOCK_ELEMENTS = 8_000_000
+
+
+def _sample(spec, point: float, samples: int, rng) -> 'np.ndarray':
+    """
+    draw samples for one assumption
+
+    spec forms (eunice.yml `sensitivity:` section):
+      {dist: uniform, low, high}
+      {dist: triangular, low, mode, high}
+      {dist: normal, mean, sd}          - clipped at 0
+      {dist: lognormal, median, sigma}
+      missing / {dist: point}           - the configured point estimate
+    """
+    if not spec or spec.get('dist', 'point') == 'point':
+        return np.full(samples, float(spec.get('value', point) if spec else point))
+
+    dist = spec['dist']
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], samples)
+    if dist == 'triangular':
+        return rng.triangular(spec['low'], spec.get('mode', point), spec['high'], samples)
+    if dist == 'normal':
+        return np.clip(rng.normal(spec.get('mean', point), spec['sd'], samples), 0, None)
+    if dist == 'lognormal':
+        return rng.lognormal(np.log(spec.get('median', point)), spec['sigma'], samples)
+
+    raise ValueError(f'unknown distribution for sensitivity analysis: {dist!r}')
+
+
+def distributions_from_config(config: EuniceConfig) -> Dict[str, Dict]:
+    """assumption distributions from the optional `sensitivity:` section of eunice.yml"""
+    section = config.config.get('sensitivity') or {}
+    return {name: section[name] for name in ASSUMPTIONS if name in section}
+
+
+class SensitivityResult:
+    """
+    percentiles of annual cost, roi and payback per file, plus tornado rankings
+
+    arrays have shape (files, len(percentiles)).
+    """
+
+    def __init__(self, paths: List[str], percentiles: Tuple[float, ...], metrics: Dict, portfolio: Dict, tornado: Dict):
+        self.paths = paths
+        self.percentiles = percentiles
+        self.annual_cost = metrics['annual_cost']
+        self.roi = metrics['roi']
+        self.payback_days = metrics['payback_days']
+        self.portfolio_annual_cost = portfolio['annual_cost']
+        self._tornado = tornado
+
+    def _labelled(self, values) -> Dict:
+        return {f'p{q:g}': round(float(v), 2) for q, v in zip(self.percentiles, values)}
+
+    def tornado(self, i: Optional[int] = None) -> List[Dict]:
+        """
+        assumptions ranked by how far they swing annual cost (p10 → p90),
+        for the whole portfolio or for one file. roi does not depend on
+        the hourly rate - it cancels between savings and effort cost.
+        """
+        rows = []
+        for name, swing in self._tornado.items():
+            cost_low, cost_high = swing['annual_cost']
+            roi_low, roi_high = swing['roi']
+
+            if i is None:
+                cost_low, cost_high = cost_low.sum(), cost_high.sum()
+                roi_low = roi_high = None
+            else:
+                cost_low, cost_high = cost_low[i], cost_high[i]
+                roi_low, roi_high = round(float(roi_low[i]), 1), round(float(roi_high[i]), 1)
+
+            rows.append({
+                'assumption': name,
+                'low_value': swing['range'][0],
+                'high_value': swing['range'][1],
+                'annual_cost_low': round(float(cost_low), 2),
+                'annual_cost_high': round(float(cost_high), 2),
+                'annual_cost_swing': round(abs(float(cost_high - cost_low)), 2),
+                'roi_low': roi_low,
+                'roi_high': roi_high
+            })
+
+        return sorted(rows, key=lambda r: r['annual_cost_swing'], reverse=True)
+
+    def to_dict(self, i: int) -> Dict:
+        """confidence intervals and tornado for one file"""
+        i = int(i)
+        return {
+            'file': self.paths[i],
+            'annual_cost_usd': self._labelled(self.annual_cost[i]),
+            'roi': self._labelled(self.roi[i]),
+            'payback_days': self._labelled(self.payback_days[i]),
+            'tornado': self.tornado(i)
+        }
+
+    def portfolio_summary(self) -> Dict:
+        return {
+            'files': len(self.paths),
+            'annual_cost_usd': self._labelled(self.portfolio_annual_cost),
+            'tornado': self.tornado()
+        }
+
+
+class SensitivityAnalysis:
+    """
+    sample assumption distributions and propagate them to every file
+
+    reality check: per file, annual hours are A + B × ci_hours (A from
+    reviews and bugs, B from ci failures), cost is hours × rate and roi is
+    hours / (loc/100 × refactor_hours). writing t = B / (A + B), every
+    metric is a per-file scale times a quantile that depends on t alone.
+    quantile curves are computed for at most `grid` values of t (exactly,
+    when the portfolio has fewer distinct t) and interpolated, so 100k
+    samples across thousands of files is a few hundred array passes - no
+    python call per sample or per file.
+    """
+
+    def __init__(
+        self,
+        config: EuniceConfig,
+        distributions: Optional[Dict[str, Dict]] = None,
+        samples: Optional[int] = None,
+        percentiles: Sequence[float] = (5, 50, 95),
+        seed: Optional[int] = None,
+        grid: int = 257
+    ):
+        if np is None:
+            raise ImportError('sensitivity analysis needs numpy: pip install eunice-data-engine[numpy]')
+
+        self.config = config
+        self.distributions = distributions if distributions is not None else distributions_from_config(config)
+        self.samples = samples or (config.config.get('sensitivity') or {}).get('samples', 100_000)
+        self.percentiles = tuple(percentiles)
+        self.grid = grid
+        self.rng = np.random.default_rng(seed)
+
+        unknown = set(self.distributions) - set(ASSUMPTIONS)
+        if unknown:
+            raise ValueError(f'no such assumption: {", ".join(sorted(unknown))}')
+
+    def _draws(self) -> Dict[str, 'np.ndarray']:
+        return {
+            name: _sample(
+                self.distributions.get(name),
+                self.config.config[section][name],
+                self.samples,
+                self.rng
+            )
+            for name, section in ASSUMPTIONS.items()
+        }
+
+    def _quantile_curves(self, ts: 'np.ndarray', draws: Dict) -> Dict[str, 'np.ndarray']:
+        """percentiles of each unit metric at every t, shape (len(ts), percentiles)"""
+        rate = draws['dev_hourly_rate']
+        ci_hours = draws['avg_ci_failure_debug_hours']
+        refactor = draws['avg_refactor_hours_per_100_loc']
+
+        curves = {name: np.empty((len(ts), len(self.percentiles))) for name in ('cost', 'roi', 'payback')}
+        block = max(1, _BLOCK_ELEMENTS // self.samples)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for start in range(0, len(ts), block):
+                end = min(len(ts), start + block)
+                t = ts[start:end, None]
+
+                # hours per unit of (A + B): mix of review/bug hours and ci hours
+                mix = (1 - t) + t * ci_hours
+
+                curves['cost'][start:end] = np.percentile(mix * rate, self.percentiles, axis=1).T
+                curves['roi'][start:end] = np.percentile(mix / refactor, self.percentiles, axis=1).T
+                curves['payback'][start:end] = np.percentile(refactor / mix, self.percentiles, axis=1).T
+
+        return curves
+
+    def run(
+        self,
+        commits_monthly: Sequence[float],
+        avg_review_minutes: Sequence[float],
+        bug_hours: Sequence[float],
+        ci_failures_monthly: Sequence[float],
+        lines_of_code: Sequence[float],
+        bug_hours_window_days=30,
+        paths: Optional[List[str]] = None
+    ) -> SensitivityResult:
+        commits = np.asarray(commits_monthly, dtype=np.float64)
+        review = np.asarray(avg_review_minutes, dtype=np.float64)
+        bugs = np.asarray(bug_hours, dtype=np.float64)
+        ci = np.asarray(ci_failures_monthly, dtype=np.float64)
+        loc = np.asarray(lines_of_code, dtype=np.float64)
+
+        window = np.broadcast_to(
+            np.asarray(bug_hours_window_days, dtype=np.float64), commits.shape
+        )
+        window = np.where(window <= 0, 30.0, window)
+
+        # assumption-free parts of the formulas (annual hours)
+        fixed_hours = (commits * review) / 60 * 12 + bugs * (365 / window)
+        ci_count = ci * 12
+        effort_units = loc / 100
+
+        scale = fixed_hours + ci_count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(scale > 0, ci_count / scale, 0.0)
+
+        draws = self._draws()
+
+        # exact curves for few distinct t, interpolated grid otherwise
+        unique_t = np.unique(t)
+        grid = unique_t if len(unique_t) <= self.grid else np.linspace(0, 1, self.grid)
+        curves = self._quantile_curves(grid, draws)
+
+        def at_t(curve):
+            return np.column_stack([
+                np.interp(t, grid, curve[:, j]) for j in range(curve.shape[1])
+            ])
+
+        has_hours = scale[:, None] > 0
+        has_effort = effort_units[:, None] > 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics = {
+                'annual_cost': scale[:, None] * at_t(curves['cost']),
+                'roi': np.where(
+                    has_hours & has_effort,
+                    (scale / effort_units)[:, None] * at_t(curves['roi']),
+                    0.0
+                ),
+                'payback_days': np.where(
+                    has_hours,
+                    (effort_units / scale * 365)[:, None] * at_t(curves['payback']),
+                    999.0
+                )
+            }
+
+        portfolio_cost = (fixed_hours.sum() + ci_count.sum() * draws['avg_ci_failure_debug_hours']) * draws['dev_hourly_rate']
+
+        # tornado: swing one assumption p10 → p90, hold the others at their median
+        medians = {name: float(np.median(values)) for name, values in draws.items()}
+        tornado = {}
+
+        for name, values in draws.items():
+            low, high = (float(v) for v in np.percentile(values, (10, 90)))
+            swing = {'range': (round(low, 4), round(high, 4))}
+
+            for value in (low, high):
+                point = dict(medians, **{name: value})
+                hours = fixed_hours + ci_count * point['avg_ci_failure_debug_hours']
+                effort = effort_units * point['avg_refactor_hours_per_100_loc']
+
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    roi = np.where(effort > 0, hours / effort, 0.0)
+
+                swing.setdefault('annual_cost', []).append(hours * point['dev_hourly_rate'])
+                swing.setdefault('roi', []).append(roi)
+
+            tornado[name] = swing
+
+        return SensitivityResult(
+            list(paths) if paths is not None else [str(i) for i in range(len(commits))],
+            self.percentiles,
+            metrics,
+            {'annual_cost': np.percentile(portfolio_cost, self.percentiles)},
+            tornado
+        )
@@ -0,0 +1,712 @@
+"""local gitlab api simulator - synthetic repos over http, with latency, 429s and 5xx faults"""
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+from .code_quality import CODE_QUALITY_REPORT
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def _parse(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.astimezone()
+
+
+class SyntheticRepo:
+    """
+    deterministic project history: commits touching files, mrs grouping
+    commits, one pipeline per commit, bug issues mentioning files
+
+    reality check: change frequency is skewed (a few hot files get most
+    commits) like a real repo, so per-file queries vary in size.
+    """
+
+    def __init__(
+        self,
+        files: int = 200,
+        commits: int = 3000,
+        issues: int = 300,
+        days: int = 30,
+        commits_per_mr: int = 3,
+        failure_rate: float = 0.15,
+        quality_issues_per_file: int = 5,
+        seed: int = 0
+    ):
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc)
+
+        self.project_id = 1
+        self.path_with_namespace = 'eunice/simulated'
+        self.paths = [f'src/pkg{i % 20}/module_{i}.py' for i in range(files)]
+        self.quality_issues_per_file = quality_issues_per_file
+
+        # zipf-like weights: file i is touched ~1/(i+1) as often as file 0
+        weights = [1 / (i + 1) for i in range(files)]
+
+        self.commits: List[Dict] = []            # newest first
+        self.paths_by_commit: Dict[str, List[str]] = {}
+        step = days * 86400 / max(commits, 1)
+
+        for i in range(commits):
+            sha = hashlib.sha1(f'{seed}:{i}'.encode()).hexdigest()
+            when = _iso(now - timedelta(seconds=i * step + rng.random() * step))
+            touched = sorted(set(rng.choices(self.paths, weights, k=rng.randint(1, 4))))
+            additions = rng.randint(1, 200)
+            deletions = rng.randint(0, 100)
+
+            self.commits.append({
+                'id': sha,
+                'short_id': sha[:8],
+                'title': f'change {i}',
+                'message': f'change {i}',
+                'author_name': f'dev{i % 7}',
+                'created_at': when,
+                'committed_date': when,
+                'parent_ids': [],
+                'stats': {'additions': additions, 'deletions': deletions, 'total': additions + deletions}
+            })
+            self.paths_by_commit[sha] = touched
+
+        self.commits_by_path: Dict[str, List[int]] = {}
+        for position, commit in enumerate(self.commits):
+            for path in self.paths_by_commit[commit['id']]:
+                self.commits_by_path.setdefault(path, []).append(position)
+
+        # mrs group consecutive commits; one pipeline per commit
+        self.merge_requests: Dict[int, Dict] = {}
+        self.mr_by_commit: Dict[str, int] = {}
+        self.pipelines_by_sha: Dict[str, List[Dict]] = {}
+        self.pipelines: Dict[int, Dict] = {}
+
+        for start in range(0, commits, commits_per_mr):
+            iid = start // commits_per_mr + 1
+            group = self.commits[start:start + commits_per_mr]
+            newest = _parse(group[0]['created_at'])
+            oldest = _parse(group[-1]['created_at'])
+
+            for commit in group:
+                self.mr_by_commit[commit['id']] = iid
+
+                pipeline_id = 100000 + len(self.pipelines)
+                draw = rng.random()  # a fifth of the failures are canceled
+                status = 'success' if draw >= failure_rate else 'canceled' if draw < failure_rate / 5 else 'failed'
+                created = _parse(commit['created_at'])
+                pipeline = {
+                    'id': pipeline_id,
+                    'iid': pipeline_id - 100000 + 1,
+                    'project_id': self.project_id,
+                    'sha': commit['id'],
+                    'ref': f'feature-{iid}',
+                    'status': status,
+                    'source': 'merge_request_event',
+                    'created_at': commit['created_at'],
+                    'updated_at': _iso(created + timedelta(minutes=10)),
+                    'web_url': f'https://gitlab.example/eunice/simulated/-/pipelines/{pipeline_id}',
+                    'duration': rng.randint(120, 1800)
+                }
+                self.pipelines[pipeline_id] = pipeline
+                self.pipelines_by_sha[commit['id']] = [pipeline]
+
+            created = oldest - timedelta(hours=rng.uniform(0.5, 48))
+            merged = newest + timedelta(hours=rng.uniform(0.1, 24))
+            self.merge_requests[iid] = {
+                'id': 5000 + iid,
+                'iid': iid,
+                'project_id': self.project_id,
+                'title': f'feature {iid}',
+                'state': 'merged',
+                'created_at': _iso(created),
+                'updated_at': _iso(merged + timedelta(minutes=1)),
+                'merged_at': _iso(merged),
+                'web_url': f'https://gitlab.example/eunice/simulated/-/merge_requests/{iid}',
+                'sha': group[0]['id'],
+                'commit_shas': [c['id'] for c in group],
+                'head_pipeline': {
+                    k: v for k, v in self.pipelines_by_sha[group[0]['id']][0].items()
+                    if k in ('id', 'iid', 'sha', 'status', 'duration', 'created_at')
+                }
+            }
+
+        # about a third of the bugs were closed by an mr touching the file;
+        # half of those never name the file (own rng: the rest stays put)
+        links = random.Random(seed + 1)
+        self.closing_mrs: Dict[int, List[int]] = {}
+
+        self.issues: List[Dict] = []
+        for iid in range(1, issues + 1):
+            path = rng.choices(self.paths, weights)[0]
+            updated = now - timedelta(seconds=rng.random() * days * 86400)
+            spent = rng.choice((0, 1800, 3600, 7200, 14400))
+            title, description, state = f'bug in {path}', f'fails in {path} under load', 'opened'
+
+            fixing_commits = self.commits_by_path.get(path)
+            if fixing_commits and links.random() < 1 / 3:
+                self.closing_mrs[iid] = [self.mr_by_commit[self.commits[links.choice(fixing_commits)]['id']]]
+                state = 'closed'
+                if links.random() < 0.5:
+                    title, description = f'crash under load ({iid})', 'fixed by the linked merge request'
+
+            self.issues.append({
+                'id': 9000 + iid,
+                'iid': iid,
+                'project_id': self.project_id,
+                'title': title,
+                'description': description,
+                'state': state,
+                'labels': ['bug'],
+                'created_at': _iso(updated - timedelta(days=2)),
+                'updated_at': _iso(updated),
+                'web_url': f'https://gitlab.example/eunice/simulated/-/issues/{iid}',
+                'time_stats': {'time_estimate': 0, 'total_time_spent': spent}
+            })
+
+    def commit_diff(self, sha: str) -> List[Dict]:
+        return [
+            {'old_path': path, 'new_path': path, 'new_file': False, 'renamed_file': False,
+             'deleted_file': False, 'diff': '@@ -1,1 +1,1 @@\n-old\n+new\n'}
+            for path in self.paths_by_commit[sha]
+        ]
+
+    def mr_changes(self, iid: int) -> Dict:
+        mr = self.merge_requests[iid]
+        paths = dict.fromkeys(p for sha in mr['commit_shas'] for p in self.paths_by_commit[sha])
+        return dict(mr, changes=[
+            {'old_path': p, 'new_path': p, 'new_file': False, 'renamed_file': False, 'deleted_file': False}
+            for p in paths
+        ])
+
+    def webhook_events(self) -> List[Tuple[str, Dict]]:
+        """
+        the repo's history as gitlab webhook deliveries, oldest first:
+        per mr a push to its feature branch, a running and a finished
+        pipeline event per commit, the merge event (closing its issues)
+        and the fast-forward push to main; plus an event per bug issue
+        """
+        project = {
+            'id': self.project_id,
+            'path_with_namespace': self.path_with_namespace,
+            'default_branch': 'main'
+        }
+        by_sha = {c['id']: c for c in self.commits}
+        closes: Dict[int, List[int]] = {}
+        for issue_iid, mr_iids in self.closing_mrs.items():
+            for mr_iid in mr_iids:
+                closes.setdefault(mr_iid, []).append(issue_iid)
+
+        def push(branch: str, commits: List[Dict]) -> Dict:
+            return {
+                'object_kind': 'push',
+                'ref': f'refs/heads/{branch}',
+                'before': '0' * 40,
+                'after': commits[-1]['id'],
+                'project': project,
+                'total_commits_count': len(commits),
+                'commits': [
+                    {
+                        'id': c['id'],
+                        'message': c['message'],
+                        'title': c['title'],
+                        'timestamp': c['committed_date'],
+                        'added': [],
+                        'modified': self.paths_by_commit[c['id']],
+                        'removed': []
+                    }
+                    for c in commits
+                ]
+            }
+
+        events = []  # (time, order, event, payload)
+        for mr in self.merge_requests.values():
+            group = [by_sha[sha] for sha in reversed(mr['commit_shas'])]  # oldest first
+            branch = f"feature-{mr['iid']}"
+            pushed = _parse(group[-1]['committed_date'])
+            events.append((pushed, 0, 'Push Hook', push(branch, group)))
+
+            for commit in group:
+                for pipeline in self.pipelines_by_sha[commit['id']]:
+                    attrs = {k: pipeline[k] for k in ('id', 'iid', 'sha', 'ref', 'status', 'duration', 'created_at')}
+                    attrs['finished_at'] = pipeline['updated_at']
+                    running = dict(attrs, status='running', duration=None, finished_at=None)
+                    # pipelines start on push, so older commits of the push finish after it
+                    finished = max(pushed, _parse(pipeline['updated_at']))
+                    for when, order, state in ((pushed, 1, running), (finished, 2, attrs)):
+                        events.append((when, order, 'Pipeline Hook', {
+                            'object_kind': 'pipeline', 'project': project, 'object_attributes': state
+                        }))
+
+            merged = _parse(mr['merged_at'])
+            references = ' '.join(f'Closes #{iid}' for iid in closes.get(mr['iid'], []))
+            events.append((merged, 3, 'Merge Request Hook', {
+                'object_kind': 'merge_request',
+                'project': project,
+                'object_attributes': {
+                    'iid': mr['iid'],
+                    'title': mr['title'],
+                    'description': references,
+                    'state': 'merged',
+                    'action': 'merge',
+                    'source_branch': branch,
+                    'target_branch': 'main',
+                    'created_at': mr['created_at'],
+                    'updated_at': mr['updated_at'],
+                    'merged_at': mr['merged_at']
+                }
+            }))
+            events.append((merged, 4, 'Push Hook', push('main', group)))
+
+        for issue in self.issues:
+            events.append((_parse(issue['updated_at']), 5, 'Issue Hook', {
+                'object_kind': 'issue',
+                'project': project,
+                'labels': [{'title': label} for label in issue['labels']],
+                'object_attributes': {
+                    'iid': issue['iid'],
+                    'title': issue['title'],
+                    'description': issue['description'],
+                    'state': issue['state'],
+                    'action': 'update',
+                    'updated_at': issue['updated_at'],
+                    'total_time_spent': issue['time_stats']['total_time_spent']
+                }
+            }))
+
+        events.sort(key=lambda e: (e[0], e[1]))
+        return [(event, payload) for _, _, event, payload in events]
+
+    def code_quality_report(self) -> bytes:
+        issues = []
+        for n, path in enumerate(self.paths):
+            for k in range(self.quality_issues_per_file):
+                begin = 10 + k * 40
+                issues.append({
+                    'type': 'issue',
+                    'check_name': 'method_complexity',
+                    'description': f'Method `fn_{k}` has a Cognitive Complexity of {5 + (n + k) % 30} (exceeds 5 allowed)',
+                    'categories': ['Complexity'],
+                    'location': {'path': path, 'lines': {'begin': begin, 'end': begin + 30}},
+                    'fingerprint': hashlib.md5(f'{path}:{k}'.encode()).hexdigest(),
+                    'severity': 'major'
+                })
+        return json.dumps(issues).encode()
+
+
+def _pipeline_node(pipeline: Dict) -> Dict:
+    return {
+        'id': f"gid://gitlab/Ci::Pipeline/{pipeline['id']}",
+        'iid': str(pipeline['iid']),
+        'sha': pipeline['sha'],
+        'status': pipeline['status'].upper(),
+        'duration': pipeline['duration'],
+        'createdAt': pipeline['created_at'],
+        'finishedAt': pipeline['updated_at']
+    }
+
+
+class GitLabSimulator:
+    """
+    threaded http server speaking the slice of the gitlab rest (and
+    graphql) api that eunice uses, backed by a SyntheticRepo
+
+    latency_ms (+ jitter) is added to every response. throttle_rate is the
+    share of requests answered 429 with Retry-After; rate_limit_per_minute
+    enforces a real per-minute budget and sends RateLimit-* headers.
+    error_rate is the share answered with a random 500/502/503, and
+    stall_rate the share held for stall_ms before answering (to trip read
+    timeouts). compress gzips bodies of 1 KB and up when the client
+    accepts it. graphql queries above max_graphql_complexity (each
+    selected field and connection counts 1, as gitlab scores them) are
+    rejected like gitlab does. calls counts requests per endpoint
+    ('errors' and 'stalled' for injected faults).
+    """
+
+    def __init__(
+        self,
+        repo: Optional[SyntheticRepo] = None,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1,
+        rate_limit_per_minute: Optional[int] = None,
+        error_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_ms: float = 0,
+        compress: bool = False,
+        max_graphql_complexity: int = 250,
+        seed: int = 0
+    ):
+        self.repo = repo or SyntheticRepo()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.compress = compress
+        self.max_graphql_complexity = max_graphql_complexity
+
+        self.calls: Counter = Counter()
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window: Tuple[float, int] = (time.time(), 0)
+        self._report: Optional[bytes] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'GitLabSimulator':
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body go out in separate writes; with nagle on,
+            # keep-alive requests stall ~40ms on the client's delayed ack
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                simulator._handle(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                simulator._handle(self, self.rfile.read(length))
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'GitLabSimulator':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.bytes_sent = 0
+
+    def _budget(self) -> Tuple[bool, Dict[str, str]]:
+        """(throttled, rate limit headers) for one request"""
+        with self._lock:
+            if self.throttle_rate and self._rng.random() < self.throttle_rate:
+                self.calls['throttled'] += 1
+                return True, {'Retry-After': f'{self.retry_after:g}'}
+
+            if not self.rate_limit_per_minute:
+                return False, {}
+
+            now = time.time()
+            started, used = self._window
+            if now - started >= 60:
+                started, used = now, 0
+
+            reset = int(started + 60)
+            if used >= self.rate_limit_per_minute:
+                self._window = (started, used)
+                self.calls['throttled'] += 1
+                return True, {
+                    'Retry-After': str(max(1, int(reset - now))),
+                    'RateLimit-Remaining': '0',
+                    'RateLimit-Reset': str(reset)
+                }
+
+            self._window = (started, used + 1)
+            return False, {
+                'RateLimit-Limit': str(self.rate_limit_per_minute),
+                'RateLimit-Remaining': str(self.rate_limit_per_minute - used - 1),
+                'RateLimit-Reset': str(reset)
+            }
+
+    def _fault(self):
+        """an injected 5xx status, 'stalled', or None for a normal answer"""
+        with self._lock:
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.calls['errors'] += 1
+                return self._rng.choice((500, 502, 503))
+            if self.stall_rate and self._rng.random() < self.stall_rate:
+                self.calls['stalled'] += 1
+                return 'stalled'
+        return None
+
+    def _handle(self, request: BaseHTTPRequestHandler, body: Optional[bytes]):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep((self.latency_ms + self._rng.random() * self.jitter_ms) / 1000)
+
+        throttled, headers = self._budget()
+        if throttled:
+            self._send(request, 429, {'message': '429 Too Many Requests'}, headers)
+            return
+
+        fault = self._fault()
+        if fault == 'stalled':
+            time.sleep(self.stall_ms / 1000)
+        elif fault:
+            self._send(request, fault, {'message': f'{fault} Server Error'}, {})
+            return
+
+        parsed = urlparse(request.path)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+
+        try:
+            if parsed.path == '/api/graphql':
+                endpoint, status, payload, extra = 'graphql', 200, self._graphql(json.loads(body or b'{}')), {}
+            else:
+                endpoint, status, payload, extra = self._rest(unquote(parsed.path), query, parsed)
+        except KeyError:
+            endpoint, status, payload, extra = 'not_found', 404, {'message': '404 Not Found'}, {}
+
+        with self._lock:
+            self.calls[endpoint] += 1
+        self._send(request, status, payload, dict(headers, **extra))
+
+    def _send(self, request, status: int, payload, headers: Dict[str, str]):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        content_type = 'application/octet-stream' if isinstance(payload, bytes) else 'application/json'
+
+        if self.compress and len(data) >= 1024 and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            data = gzip.compress(data, 5)
+            headers = dict(headers, **{'Content-Encoding': 'gzip'})
+
+        try:
+            request.send_response(status)
+            request.send_header('Content-Type', content_type)
+            request.send_header('Content-Length', str(len(data)))
+            for name, value in headers.items():
+                request.send_header(name, value)
+            request.end_headers()
+            request.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client timed out on a stalled response and hung up
+            request.close_connection = True
+            return
+
+        with self._lock:
+            self.bytes_sent += len(data)
+
+    def _paginate(self, items: List, query: Dict, parsed) -> Tuple[List, Dict[str, str]]:
+        """gitlab offset pagination: X-* headers plus a Link rel=next"""
+        page = int(query.get('page', 1))
+        per_page = min(int(query.get('per_page', 20)), 100)
+        total_pages = max(1, -(-len(items) // per_page))
+
+        headers = {
+            'X-Page': str(page),
+            'X-Per-Page': str(per_page),
+            'X-Total': str(len(items)),
+            'X-Total-Pages': str(total_pages),
+            'X-Next-Page': str(page + 1) if page < total_pages else ''
+        }
+        if page < total_pages:
+            next_query = dict(query, page=page + 1, per_page=per_page)
+            headers['Link'] = f'<{self.url}{parsed.path}?{urlencode(next_query)}>; rel="next"'
+
+        return items[(page - 1) * per_page:page * per_page], headers
+
+    def _rest(self, path: str, query: Dict, parsed) -> Tuple[str, int, object, Dict]:
+        repo = self.repo
+        match = re.fullmatch(r'/api/v4/projects/([^/]+)(/.*)?', path)
+        if not match:
+            raise KeyError(path)
+        rest = match.group(2) or ''
+
+        if not rest:
+            return 'project', 200, {
+                'id': repo.project_id,
+                'name': 'simulated',
+                'path_with_namespace': repo.path_with_namespace,
+                'web_url': 'https://gitlab.example/eunice/simulated',
+                'default_branch': 'main'
+            }, {}
+
+        if rest == '/repository/commits':
+            positions = repo.commits_by_path.get(query['path'], []) if 'path' in query else range(len(repo.commits))
+            since = _parse(query['since']) if 'since' in query else None
+            items = []
+            for position in positions:
+                commit = repo.commits[position]
+                if since is not None and _parse(commit['committed_date']) < since:
+                    break  # newest first
+                if query.get('with_stats') in ('true', 'True'):
+                    items.append(commit)
+                else:
+                    items.append({k: v for k, v in commit.items() if k != 'stats'})
+            page, headers = self._paginate(items, query, parsed)
+            return 'commits', 200, page, headers
+
+        match = re.fullmatch(r'/repository/commits/([0-9a-f]+)(/diff|/merge_requests)?', rest)
+        if match:
+            sha, sub = match.groups()
+            if sub == '/diff':
+                page, headers = self._paginate(repo.commit_diff(sha), query, parsed)
+                return 'commit_diff', 200, page, headers
+            if sub == '/merge_requests':
+                mr = repo.merge_requests[repo.mr_by_commit[sha]]
+                return 'commit_merge_requests', 200, [
+                    {k: v for k, v in mr.items() if k not in ('commit_shas', 'head_pipeline')}
+                ], {}
+            return 'commit', 200, repo.commits[next(i for i, c in enumerate(repo.commits) if c['id'] == sha)], {}
+
+        if rest == '/merge_requests':
+            updated_after = _parse(query['updated_after']) if 'updated_after' in query else None
+            items = [
+                {k: v for k, v in mr.items() if k not in ('commit_shas', 'head_pipeline')}
+                for mr in reversed(repo.merge_requests.values())  # newest first
+                if query.get('state', 'all') in ('all', mr['state'])
+                and (updated_after is None or _parse(mr['updated_at']) >= updated_after)
+            ]
+            page, headers = self._paginate(items, query, parsed)
+            return 'merge_requests', 200, page, headers
+
+        match = re.fullmatch(r'/merge_requests/(\d+)(/changes)?', rest)
+        if match:
+            iid = int(match.group(1))
+            if match.group(2):
+                return 'merge_request_changes', 200, repo.mr_changes(iid), {}
+            mr = repo.merge_requests[iid]
+            return 'merge_request', 200, {k: v for k, v in mr.items() if k != 'commit_shas'}, {}
+
+        if rest == '/pipelines':
+            items = repo.pipelines_by_sha.get(query['sha'], []) if 'sha' in query else list(repo.pipelines.values())
+            updated_after = _parse(query['updated_after']) if 'updated_after' in query else None
+            items = [
+                p for p in items
+                if query.get('status', p['status']) == p['status']
+                and (updated_after is None or _parse(p['updated_at']) >= updated_after)
+            ]
+            # the list endpoint has no duration, like gitlab's
+            items = [{k: v for k, v in p.items() if k != 'duration'} for p in items]
+            page, headers = self._paginate(items, query, parsed)
+            return 'pipelines', 200, page, headers
+
+        match = re.fullmatch(r'/pipelines/(\d+)(/jobs)?', rest)
+        if match:
+            pipeline = repo.pipelines[int(match.group(1))]
+            if not match.group(2):
+                return 'pipeline', 200, pipeline, {}
+            jobs = [
+                {'id': pipeline['id'] * 10 + 1, 'name': 'test', 'status': pipeline['status'], 'stage': 'test'},
+                {'id': pipeline['id'] * 10 + 2, 'name': 'code_quality', 'status': 'success', 'stage': 'test'}
+            ]
+            page, headers = self._paginate(jobs, query, parsed)
+            return 'pipeline_jobs', 200, page, headers
+
+        match = re.fullmatch(r'/jobs/(\d+)/artifacts/(.+)', rest)
+        if match:
+            if match.group(2) != CODE_QUALITY_REPORT:
+                raise KeyError(match.group(2))
+            if self._report is None:
+                self._report = repo.code_quality_report()
+            return 'job_artifact', 200, self._report, {}
+
+        if rest == '/issues':
+            labels = set(filter(None, query.get('labels', '').split(',')))
+            search = query.get('search')
+            updated_after = _parse(query['updated_after']) if 'updated_after' in query else None
+            items = [
+                issue for issue in repo.issues
+                if labels <= set(issue['labels'])
+                and (not search or search in issue['title'] or search in issue['description'])
+                and (updated_after is None or _parse(issue['updated_at']) >= updated_after)
+            ]
+            page, headers = self._paginate(items, query, parsed)
+            return 'issues', 200, page, headers
+
+        match = re.fullmatch(r'/issues/(\d+)/closed_by', rest)
+        if match:
+            mrs = [repo.merge_requests[i] for i in repo.closing_mrs.get(int(match.group(1)), [])]
+            return 'issue_closed_by', 200, [
+                {k: v for k, v in mr.items() if k not in ('commit_shas', 'head_pipeline')} for mr in mrs
+            ], {}
+
+        raise KeyError(path)
+
+    def _graphql(self, request: Dict) -> Dict:
+        """the three query shapes EuniceGraphQLClient sends"""
+        query, variables = request.get('query', ''), request.get('variables') or {}
+        repo = self.repo
+        project: Dict = {}
+
+        if 'mergeRequests(' in query:
+            nodes = []
+            for iid in variables.get('iids') or []:
+                mr = repo.merge_requests.get(int(iid))
+                if mr is None:
+                    continue
+                head = repo.pipelines[mr['head_pipeline']['id']]
+                nodes.append({
+                    'iid': str(mr['iid']), 'title': mr['title'], 'state': mr['state'],
+                    'webUrl': mr['web_url'], 'createdAt': mr['created_at'],
+                    'mergedAt': mr['merged_at'], 'updatedAt': mr['updated_at'],
+                    'headPipeline': _pipeline_node(head)
+                })
+            project['mergeRequests'] = {'pageInfo': {'hasNextPage': False, 'endCursor': None}, 'nodes': nodes}
+
+        if 'issues(' in query:
+            search = variables.get('search')
+            updated_after = _parse(variables['updatedAfter']) if variables.get('updatedAfter') else None
+            matching = [
+                issue for issue in repo.issues
+                if (not search or search in issue['title'] or search in issue['description'])
+                and (updated_after is None or _parse(issue['updated_at']) >= updated_after)
+            ]
+            offset = int(variables.get('after') or 0)
+            page = matching[offset:offset + 100]
+            has_next = offset + 100 < len(matching)
+            project['issues'] = {
+                'pageInfo': {'hasNextPage': has_next, 'endCursor': str(offset + 100) if has_next else None},
+                'nodes': [
+                    {'iid': str(i['iid']), 'title': i['title'], 'state': i['state'], 'webUrl': i['web_url'],
+                     'description': i['description'], 'createdAt': i['created_at'],
+                     'updatedAt': i['updated_at'],
+                     'totalTimeSpent': i['time_stats']['total_time_spent'], 'timeEstimate': 0}
+                    for i in page
+                ]
+            }
+
+        # only the selected fields, like gitlab
+        selection = re.search(r'pipelines\([^)]*\) \{ nodes \{([^}]*)\}', query)
+        fields = selection.group(1).split() if selection else ()
+        aliases = re.findall(r'(s\d+): pipelines\(sha: \$(s\d+)', query)
+
+        # project + per aliased connection: itself, nodes and each field
+        complexity = 1 + len(aliases) * (2 + len(fields))
+        if complexity > self.max_graphql_complexity:
+            return {'errors': [{'message': (
+                f'Query has complexity of {complexity}, which exceeds max complexity '
+                f'of {self.max_graphql_complexity}'
+            )}]}
+
+        for alias, variable in aliases:
+            pipelines = repo.pipelines_by_sha.get(variables.get(variable), [])
+            project[alias] = {'nodes': [
+                {k: v for k, v in _pipeline_node(p).items() if k in fields} for p in pipelines
+            ]}
+
+        return {'data': {'project': project}}
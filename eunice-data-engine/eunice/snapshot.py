@@ -0,0 +1,95 @@
+"""per-file audit snapshots - the history an mr review starts from"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+DEFAULT_SNAPSHOT_PATH = '.eunice/cache/audit-snapshot.sqlite'
+
+
+class AuditSnapshot:
+    """
+    sqlite table of project, path → file history as of the last refresh
+
+    reality check: a file history holds the commits in the audit window
+    with their mr iids and pipelines, review minutes per mr and hours per
+    bug issue - enough to slide the window forward and recompute costs
+    without asking gitlab about anything already seen. rows are keyed by
+    path so an mr review loads only the files in its diff.
+    """
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # autocommit: audits and mr reviews may write concurrently
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS file_history (
+                project_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                refreshed_at TEXT NOT NULL,
+                since_days REAL NOT NULL,
+                history TEXT NOT NULL,
+                PRIMARY KEY (project_id, path)
+            )
+        """)
+
+    def load(self, project_id: str, paths: Iterable[str], since_days: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        histories for the given paths (missing paths are left out)
+
+        a history recorded over a shorter window than since_days cannot be
+        extended backwards, so it is left out too
+        """
+        paths = list(dict.fromkeys(paths))
+        histories = {}
+
+        with self._lock:
+            # stay under sqlite's bound-parameter limit
+            for start in range(0, len(paths), 500):
+                batch = paths[start:start + 500]
+                rows = self._db.execute(
+                    f'SELECT path, since_days, history FROM file_history '
+                    f'WHERE project_id = ? AND path IN ({", ".join("?" * len(batch))})',
+                    [str(project_id)] + batch
+                ).fetchall()
+
+                for path, recorded_days, history in rows:
+                    if since_days is None or recorded_days >= since_days:
+                        histories[path] = json.loads(history)
+
+        return histories
+
+    def save(self, project_id: str, histories: Dict[str, Dict], since_days: float):
+        """store refreshed histories (one transaction)"""
+        rows = [
+            (str(project_id), path, history['refreshed_at'], since_days, json.dumps(history))
+            for path, history in histories.items()
+        ]
+
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany("""
+                    INSERT INTO file_history VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (project_id, path) DO UPDATE SET
+                        refreshed_at = excluded.refreshed_at,
+                        since_days = excluded.since_days,
+                        history = excluded.history
+                """, rows)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def close(self):
+        with self._lock:
+            self._db.close()
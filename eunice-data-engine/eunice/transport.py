@@ -0,0 +1,226 @@
+"""http transport for the gitlab clients - pooled keep-alive sessions, timeouts, jittered retries, optional http/2"""
+import random
+import time
+from datetime import timedelta
+from typing import Callable, Optional, Tuple, Union
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util import make_headers
+
+from .rate_limit import parse_retry_after
+
+try:
+    import httpx
+except ImportError:  # optional dependency: pip install eunice-data-engine[http2]
+    httpx = None
+
+
+DEFAULT_TIMEOUT = (5.0, 60.0)  # connect, read - seconds
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# every encoding urllib3 can decode here: gzip, deflate (+ br, zstd when installed)
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class Transport:
+    """
+    connection, timeout and retry settings shared by the sync and async clients
+
+    reality check: python-gitlab's default session has no timeout, so a
+    stalled response blocks a worker forever, and 5xx responses are not
+    retried at all - one flaky minute drops data from an audit. here every
+    request has a connect/read timeout, and 429s, 5xx and connection
+    errors are retried with full-jitter exponential backoff (never less
+    than Retry-After). only idempotent requests are retried, plus graphql
+    POSTs, which eunice only uses for queries.
+
+    pool_size bounds keep-alive connections per host - match it to the
+    threads sharing the client. http2=True multiplexes requests over one
+    connection through httpx (pip install eunice-data-engine[http2]);
+    gitlab only speaks it over https.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 16,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        retries: int = 5,
+        backoff: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_statuses=RETRY_STATUSES,
+        http2: bool = False,
+        seed: Optional[int] = None
+    ):
+        if http2 and httpx is None:
+            raise ImportError('http2=True needs httpx[http2]: pip install eunice-data-engine[http2]')
+
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.http2 = http2
+        self._rng = random.Random(seed)
+
+    @property
+    def connect_timeout(self) -> float:
+        return self.timeout[0] if isinstance(self.timeout, tuple) else self.timeout
+
+    @property
+    def read_timeout(self) -> float:
+        return self.timeout[1] if isinstance(self.timeout, tuple) else self.timeout
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """seconds to wait before retry number attempt+1 (full jitter, at least Retry-After)"""
+        ceiling = min(self.backoff_max, self.backoff * 2 ** attempt)
+        return max(self._rng.uniform(0, ceiling), retry_after or 0)
+
+    def retryable(self, method: str, url: str) -> bool:
+        return method in IDEMPOTENT_METHODS or (method == 'POST' and url.endswith('/api/graphql'))
+
+    def session(
+        self,
+        on_response: Optional[Callable] = None,
+        before_retry: Optional[Callable[[], object]] = None,
+        on_retry: Optional[Callable[[str, float], None]] = None
+    ) -> requests.Session:
+        """
+        a requests session using this transport
+
+        on_response sees every response that is retried away (the final one
+        goes through the session's response hooks as usual), before_retry
+        runs right before each resend (e.g. taking a rate limit token) and
+        on_retry(reason, delay) reports each retry.
+        """
+        adapter_class = Http2Adapter if self.http2 else PooledAdapter
+        adapter = adapter_class(self, on_response=on_response, before_retry=before_retry, on_retry=on_retry)
+
+        session = requests.Session()
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+class _RetryMixin:
+    """resend loop shared by the http/1.1 and http/2 adapters"""
+
+    def __init__(self, transport: Transport, on_response=None, before_retry=None, on_retry=None, **kwargs):
+        self.transport = transport
+        self.on_response = on_response
+        self.before_retry = before_retry
+        self.on_retry = on_retry
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        transport = self.transport
+        timeout = timeout if timeout is not None else transport.timeout
+        retryable = transport.retryable(request.method, request.url)
+        attempt = 0
+
+        while True:
+            retry_after = None
+            started = time.perf_counter()
+
+            try:
+                response = super().send(request, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not retryable or attempt >= transport.retries:
+                    raise
+                reason = type(e).__name__
+            else:
+                if (
+                    response.status_code not in transport.retry_statuses
+                    or not retryable
+                    or attempt >= transport.retries
+                ):
+                    return response
+
+                reason = str(response.status_code)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                response.content  # read it so the connection goes back to the pool
+                response.close()
+
+                if self.on_response is not None:
+                    response.elapsed = timedelta(seconds=time.perf_counter() - started)
+                    self.on_response(response)
+
+            delay = transport.delay(attempt, retry_after)
+            if self.on_retry is not None:
+                self.on_retry(reason, delay)
+            time.sleep(delay)
+
+            if self.before_retry is not None:
+                self.before_retry()
+            attempt += 1
+
+
+class PooledAdapter(_RetryMixin, HTTPAdapter):
+    """http/1.1 keep-alive pool sized by the transport, with the retry loop"""
+
+    def __init__(self, transport: Transport, **kwargs):
+        super().__init__(
+            transport,
+            pool_connections=transport.pool_size,
+            pool_maxsize=transport.pool_size,
+            max_retries=0,  # retries happen in _RetryMixin, where they are counted
+            **kwargs
+        )
+
+
+class _Http2Transport(BaseAdapter):
+    """requests adapter over an httpx http/2 client"""
+
+    def __init__(self, pool_size: int = 16):
+        super().__init__()
+        self._client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+        try:
+            # bodies are read whole: httpx decodes content-encoding, so the
+            # response below is already decompressed even for stream=True
+            reply = self._client.request(
+                request.method,
+                request.url,
+                headers=dict(request.headers),
+                content=request.body,
+                timeout=httpx.Timeout(read, connect=connect)
+            )
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.reason = reply.reason_phrase
+        response.headers = CaseInsensitiveDict(reply.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response._content = reply.content
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        self._client.close()
+
+
+class Http2Adapter(_RetryMixin, _Http2Transport):
+    """http/2 (falls back to 1.1 where the server does not offer it), with the retry loop"""
+
+    def __init__(self, transport: Transport, **kwargs):
+        super().__init__(transport, pool_size=transport.pool_size, **kwargs)
@@ -12,6 +12,17 @@ setup(
         "pyyaml>=6.0",
         "requests>=2.31.0",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.9"],
+        "numpy": ["numpy>=1.22"],
+        "http2": ["httpx[http2]>=0.24"],
+        "test": ["pytest>=7"],
+    },
+    entry_points={
+        "console_scripts": [
+            "eunice=eunice.cli:main",
+        ],
+    },
     python_requires=">=3.9",
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -0,0 +1,39 @@
+"""shared fixtures - a small synthetic project served by the GitLabSimulator"""
+import pytest
+
+from eunice.rate_limit import TokenBucket
+from eunice.simulator import GitLabSimulator, SyntheticRepo
+
+
+@pytest.fixture(scope='session')
+def repo() -> SyntheticRepo:
+    return SyntheticRepo(files=60, commits=600, issues=60, seed=0)
+
+
+@pytest.fixture(scope='session')
+def sample_paths(repo):
+    """every fourth file - enough shared commits and mrs to exercise the batching"""
+    return repo.paths[::4]
+
+
+@pytest.fixture
+def simulator(repo):
+    with GitLabSimulator(repo) as simulator:
+        yield simulator
+
+
+@pytest.fixture
+def make_client():
+    """create_client against a simulator url, with no rate limit in the way"""
+    from eunice.gitlab_client import create_client
+
+    def make(url: str, backend: str = 'rest', **kwargs):
+        return create_client(
+            url,
+            'test-token',
+            backend=backend,
+            rate_limiter=TokenBucket(rate_per_minute=10 ** 9, capacity=10 ** 6),
+            **kwargs
+        )
+
+    return make
@@ -0,0 +1,41 @@
+"""analyze_files survives injected 5xx answers and stalls, and 429s are retried by the Transport alone"""
+import pytest
+
+from eunice.simulator import GitLabSimulator
+from eunice.transport import Transport
+
+
+def _transport(retries: int) -> Transport:
+    return Transport(timeout=(1.0, 0.3), retries=retries, backoff=0.01, backoff_max=0.1, seed=0)
+
+
+def _strip(results):
+    return {path: {k: v for k, v in row.items() if k != 'dropped_lookups'} for path, row in results.items()}
+
+
+@pytest.fixture
+def clean_results(simulator, make_client, repo, sample_paths):
+    client = make_client(simulator.url, transport=_transport(0))
+    return _strip(client.analyze_files(repo.project_id, sample_paths, 30))
+
+
+def test_retrying_transport_matches_clean_run(repo, sample_paths, make_client, clean_results):
+    with GitLabSimulator(repo, error_rate=0.05, stall_rate=0.01, stall_ms=600, compress=True, seed=0) as simulator:
+        client = make_client(simulator.url, transport=_transport(5))
+        results = client.analyze_files(repo.project_id, sample_paths, 30)
+        injected = simulator.calls['errors'] + simulator.calls['stalled']
+
+    assert injected > 0
+    assert client.instrumentation.to_dict()['dropped'] == {}
+    assert _strip(results) == clean_results
+
+
+def test_throttled_request_is_sent_retries_plus_one_times(repo, make_client):
+    with GitLabSimulator(repo, throttle_rate=1.0, retry_after=0) as simulator:
+        client = make_client(simulator.url, transport=_transport(2))
+        project = client._get_project(repo.project_id)
+
+        with pytest.raises(Exception):
+            project.commits.list(per_page=10, get_all=False)
+
+        assert simulator.calls['throttled'] == 3
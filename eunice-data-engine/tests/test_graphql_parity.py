@@ -0,0 +1,72 @@
+"""rest and graphql backends answer every lookup with the same data"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from eunice.graphql_client import GraphQLComplexityError
+from eunice.records import IssueRecord, MergeRequestRecord, PipelineRecord
+
+
+def _mr_fields(client, mr):
+    head = getattr(mr, 'head_pipeline', None) or {}
+    return (
+        MergeRequestRecord.from_object(mr),
+        mr.title,
+        mr.web_url,
+        client.calculate_mr_review_time(mr),
+        tuple(head.get(k) for k in ('id', 'sha', 'status', 'duration'))
+    )
+
+
+def _issue_fields(issue):
+    return IssueRecord.from_object(issue), issue.state, issue.description, issue.created_at
+
+
+def _both(simulator, make_client, lookup):
+    answers = {}
+    for backend in ('rest', 'graphql'):
+        client = make_client(simulator.url, backend)
+        answers[backend] = lookup(client, client._get_project(simulator.repo.project_id))
+    return answers['rest'], answers['graphql']
+
+
+def test_merge_requests(simulator, make_client, repo):
+    rest, graphql = _both(simulator, make_client, lambda client, project: {
+        iid: _mr_fields(client, mr)
+        for iid, mr in client._get_mrs(project, repo.project_id, list(repo.merge_requests)).items()
+    })
+    assert len(rest) == len(repo.merge_requests)
+    assert rest == graphql
+
+
+def test_pipelines(simulator, make_client, repo, sample_paths):
+    shas = list(dict.fromkeys(
+        repo.commits[position]['id'] for path in sample_paths for position in repo.commits_by_path.get(path, [])
+    ))
+    rest, graphql = _both(simulator, make_client, lambda client, project: {
+        sha: sorted(PipelineRecord.from_object(p) for p in pipelines)
+        for sha, pipelines in client._pipelines_for_shas(project, repo.project_id, shas).items()
+    })
+    assert len(rest) == len(shas)
+    assert rest == graphql
+
+
+def test_bug_issues(simulator, make_client, repo, sample_paths):
+    since = datetime.now() - timedelta(days=30)
+    rest, graphql = _both(simulator, make_client, lambda client, project: {
+        path: sorted(_issue_fields(i) for i in client._fetch_bug_issues(project, repo.project_id, path, since))
+        for path in [None] + sample_paths
+    })
+    assert rest[None]
+    assert rest == graphql
+
+
+def test_complexity_error_is_raised(simulator, make_client, repo, monkeypatch):
+    import eunice.graphql_client
+
+    monkeypatch.setattr(eunice.graphql_client, 'PIPELINE_BATCH_SIZE', 100)
+    client = make_client(simulator.url, 'graphql')
+    shas = [commit['id'] for commit in repo.commits[:100]]
+
+    with pytest.raises(GraphQLComplexityError):
+        client._pipelines_for_shas(client._get_project(repo.project_id), repo.project_id, shas)
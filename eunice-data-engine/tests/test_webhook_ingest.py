@@ -0,0 +1,38 @@
+"""metrics built from webhook deliveries agree with the api for every file"""
+import pytest
+
+from eunice.ingest import WebhookIngestor
+from eunice.metrics_store import MetricsStore
+
+KEYS = ('commit_count', 'avg_review_minutes', 'bug_hours', 'ci_failure_count')
+
+
+@pytest.fixture(scope='module')
+def ingested(repo):
+    """the repo's history through WebhookIngestor.process, in batches"""
+    store = MetricsStore(':memory:')
+    ingestor = WebhookIngestor(store)
+    events = repo.webhook_events()
+    for start in range(0, len(events), 97):
+        ingestor.process(events[start:start + 97])
+
+    assert ingestor.stats['failed'] == 0
+    yield store
+    store.close()
+
+
+def test_webhook_metrics_match_api(repo, simulator, make_client, ingested):
+    # every event is older than the window start, so the run "covers" it
+    since_days = 31
+    from_store = ingested.file_metrics(repo.project_id, repo.paths, since_days, source='webhooks')
+    from_api = make_client(simulator.url).analyze_files(repo.project_id, repo.paths, since_days, build_index=True)
+
+    for path in repo.paths:
+        for key in KEYS:
+            # the store rounds averages and hours to 2 places
+            assert from_store[path][key] == pytest.approx(from_api[path][key], abs=0.005 + 1e-9), (path, key)
+
+
+def test_webhook_rows_stay_out_of_audit_rows(repo, ingested):
+    audit = ingested.file_metrics(repo.project_id, repo.paths, 31)
+    assert all(metrics['commit_count'] == 0 for metrics in audit.values())